@@ -0,0 +1,162 @@
+"""
+Local stand-in for the ElevenLabs realtime speech-to-text WebSocket.
+
+Speaks the same protocol the backend uses upstream (config, base64 audio
+and eos JSON frames in; transcript / utterance_end JSON frames out) and
+emits scripted transcripts paced by the audio it receives, so the relay
+can be load-tested without a microphone or API quota.
+
+Usage:
+    python fake_realtime_stt.py --port 8765 --latency-ms 150 --jitter-ms 50
+    ELEVENLABS_REALTIME_URL=ws://localhost:8765 python main.py
+
+Options:
+    --latency-ms    delay before each transcript event is sent
+    --jitter-ms     extra uniform random delay per event (order is kept)
+    --partial-ms    audio time between partials (one new word per partial)
+    --script FILE   one utterance per line (default: built-in Polish lines)
+"""
+
+import sys
+import json
+import time
+import base64
+import random
+import asyncio
+import argparse
+
+import websockets
+
+DEFAULT_SCRIPT = [
+    "Dzień dobry, poproszę dwa bilety do Krakowa",
+    "Ile kosztuje ten chleb",
+    "Gdzie jest najbliższa apteka",
+    "Dziękuję bardzo, do widzenia",
+]
+
+
+class FakeSession:
+    """Turns received audio into scripted partials and finals for one socket."""
+
+    def __init__(self, ws, args, script):
+        self.ws = ws
+        self.args = args
+        self.script = script
+        self.sample_rate = 16000
+
+        self.audio_seconds = 0.0
+        self.next_partial_at = args.partial_ms / 1000
+        self.line = 0
+        self.words_said = 0
+        self.utterance_start = 0.0
+
+        self.outbox: asyncio.Queue = asyncio.Queue()
+        self._last_due = 0.0
+
+    def emit(self, message):
+        """Queue a message after latency + jitter without reordering."""
+        delay = (self.args.latency_ms + random.uniform(0, self.args.jitter_ms)) / 1000
+        due = max(time.monotonic() + delay, self._last_due)
+        self._last_due = due
+        self.outbox.put_nowait((due, message))
+
+    async def sender(self):
+        while True:
+            due, message = await self.outbox.get()
+            if message is None:
+                return
+            await asyncio.sleep(max(0.0, due - time.monotonic()))
+            await self.ws.send(json.dumps(message))
+
+    def on_audio(self, size: int):
+        self.audio_seconds += size / (self.sample_rate * 2)
+        while self.audio_seconds >= self.next_partial_at:
+            self.next_partial_at += self.args.partial_ms / 1000
+            self.advance()
+
+    def advance(self):
+        words = self.script[self.line % len(self.script)].split()
+        self.words_said += 1
+        final = self.words_said >= len(words)
+        self.emit(self.transcript(words[:self.words_said], final))
+        if final:
+            self.emit({"type": "utterance_end"})
+            self.line += 1
+            self.words_said = 0
+            self.utterance_start = self.audio_seconds
+
+    def transcript(self, words, is_final: bool):
+        step = self.args.partial_ms / 1000
+        timed = [
+            {
+                "text": word,
+                "start": round(self.utterance_start + i * step, 3),
+                "end": round(self.utterance_start + (i + 1) * step, 3)
+            }
+            for i, word in enumerate(words)
+        ]
+        return {
+            "type": "transcript",
+            "text": " ".join(words),
+            "words": timed,
+            "language": "pl",
+            "is_final": is_final
+        }
+
+
+async def handle(ws, path=None, *, args, script):
+    session = FakeSession(ws, args, script)
+    sender = asyncio.create_task(session.sender())
+    try:
+        async for raw in ws:
+            message = json.loads(raw)
+            kind = message.get("type")
+            if kind == "config":
+                config = message.get("transcription_config") or {}
+                session.sample_rate = int(config.get("sample_rate") or 16000)
+            elif kind == "audio":
+                session.on_audio(len(base64.b64decode(message.get("audio", ""))))
+            elif kind == "eos":
+                if session.words_said:
+                    words = script[session.line % len(script)].split()[:session.words_said]
+                    session.emit(session.transcript(words, True))
+                break
+    except websockets.exceptions.ConnectionClosed:
+        pass
+    finally:
+        session.outbox.put_nowait((session._last_due, None))
+        try:
+            await sender
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Fake ElevenLabs realtime STT server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=150)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--partial-ms", type=float, default=300)
+    parser.add_argument("--script", help="file with one utterance per line")
+    args = parser.parse_args()
+
+    script = DEFAULT_SCRIPT
+    if args.script:
+        with open(args.script, encoding="utf-8") as f:
+            script = [line.strip() for line in f if line.strip()]
+
+    async def handler(ws, path=None):
+        await handle(ws, path, args=args, script=script)
+
+    async with websockets.serve(handler, args.host, args.port, max_size=None):
+        print(f"🧪 Fake realtime STT on ws://{args.host}:{args.port} "
+              f"(latency {args.latency_ms}±{args.jitter_ms} ms, partial every {args.partial_ms} ms)")
+        await asyncio.Future()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        sys.exit(0)
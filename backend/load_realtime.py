@@ -0,0 +1,231 @@
+"""
+Load generator for /api/transcribe/realtime.
+
+Opens N concurrent client sessions, streams PCM audio into each at real
+time (binary frames, 1024-frame chunks like the browser client), then
+reports relay throughput, client-side latency percentiles, server-side
+relay latency from /api/metrics, and server CPU per session.
+
+Usage:
+    # terminal 1: fake upstream
+    python fake_realtime_stt.py
+    # terminal 2: backend pointed at it
+    ELEVENLABS_REALTIME_URL=ws://localhost:8765 python main.py
+    # terminal 3
+    python load_realtime.py --sessions 50 --seconds 20 [--wav speech.wav]
+
+Without --wav, a synthetic speech-like signal (voiced bursts separated by
+pauses) is streamed so the server-side VAD behaves as it would for speech.
+CPU per session is only meaningful when nothing else is loading the server.
+"""
+
+import sys
+import json
+import time
+import wave
+import asyncio
+import argparse
+from typing import List, Optional, Dict, Any
+
+import httpx
+import numpy as np
+import websockets
+
+CHUNK_FRAMES = 1024
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# AUDIO
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def synthetic_speech(seconds: float, sample_rate: int = 16000) -> bytes:
+    """1.5 s voiced bursts (harmonics + noise) followed by 0.5 s pauses."""
+    rng = np.random.default_rng(7)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    voiced = sum(np.sin(2 * np.pi * f * t) / (i + 1) for i, f in enumerate([140, 280, 420, 700]))
+    signal = 0.25 * voiced + 0.05 * rng.standard_normal(len(t))
+    signal *= (t % 2.0) < 1.5
+    return (np.clip(signal, -1, 1) * 32767 * 0.5).astype("<i2").tobytes()
+
+
+def load_wav(path: str):
+    with wave.open(path, "rb") as reader:
+        if reader.getsampwidth() != 2:
+            raise SystemExit("Only 16-bit PCM WAV files are supported")
+        return reader.readframes(reader.getnframes()), reader.getframerate(), reader.getnchannels()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ONE CLIENT
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class ClientResult:
+    def __init__(self):
+        self.ok = False
+        self.error: Optional[str] = None
+        self.connect_ms: Optional[float] = None
+        self.first_partial_ms: Optional[float] = None
+        self.eos_to_close_ms: Optional[float] = None
+        self.partials = 0
+        self.finals = 0
+        self.audio_seconds = 0.0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+
+async def run_client(url: str, audio: bytes, sample_rate: int, channels: int, seconds: float) -> ClientResult:
+    result = ClientResult()
+    chunk_bytes = CHUNK_FRAMES * 2 * channels
+    chunk_seconds = CHUNK_FRAMES / sample_rate
+    first_audio_at = None
+    started = time.monotonic()
+
+    try:
+        async with websockets.connect(url, max_size=None) as ws:
+            await ws.send(json.dumps({"type": "config", "sample_rate": sample_rate, "channels": channels}))
+            while True:
+                message = json.loads(await ws.recv())
+                if message.get("type") == "error":
+                    raise RuntimeError(message.get("message"))
+                if message.get("type") == "busy":
+                    raise RuntimeError(f"busy (retry after {message.get('retry_after')} s)")
+                if message.get("type") in ("connected", "config_updated"):
+                    break
+            result.connect_ms = (time.monotonic() - started) * 1000
+
+            async def receive():
+                async for raw in ws:
+                    result.bytes_received += len(raw)
+                    message = json.loads(raw)
+                    kind = message.get("type")
+                    if kind in ("partial", "partial_delta", "final"):
+                        if result.first_partial_ms is None and first_audio_at is not None:
+                            result.first_partial_ms = (time.monotonic() - first_audio_at) * 1000
+                        if kind == "final":
+                            result.finals += 1
+                        else:
+                            result.partials += 1
+                    elif kind == "error":
+                        result.error = message.get("message")
+
+            receiver = asyncio.create_task(receive())
+
+            chunks = [audio[j:j + chunk_bytes] for j in range(0, len(audio) - chunk_bytes + 1, chunk_bytes)]
+            total_chunks = int(seconds / chunk_seconds)
+            stream_start = time.monotonic()
+            for i in range(total_chunks):
+                chunk = chunks[i % len(chunks)]
+                await asyncio.sleep(max(0.0, stream_start + i * chunk_seconds - time.monotonic()))
+                if first_audio_at is None:
+                    first_audio_at = time.monotonic()
+                await ws.send(chunk)
+                result.bytes_sent += len(chunk)
+            result.audio_seconds = total_chunks * chunk_seconds
+
+            eos_at = time.monotonic()
+            await ws.send(json.dumps({"type": "eos"}))
+            try:
+                await asyncio.wait_for(receiver, timeout=10)
+            except asyncio.TimeoutError:
+                receiver.cancel()
+            result.eos_to_close_ms = (time.monotonic() - eos_at) * 1000
+            result.ok = result.error is None
+    except websockets.exceptions.ConnectionClosed as e:
+        close = getattr(e, "rcvd", None)
+        if close is not None and close.code == 1013:
+            result.error = result.error or "busy (close 1013)"
+        result.ok = result.error is None and result.audio_seconds > 0
+    except Exception as e:
+        result.error = str(e) or type(e).__name__
+    return result
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# REPORT
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def percentiles(values: List[float]) -> str:
+    if not values:
+        return "n/a"
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return f"p50 {p50:7.1f}  p95 {p95:7.1f}  p99 {p99:7.1f}  (n={len(values)})"
+
+
+def fetch_metrics(url: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not url:
+        return None
+    try:
+        return httpx.get(url, timeout=5).json()
+    except Exception as e:
+        print(f"⚠️  Could not read {url}: {e}")
+        return None
+
+
+def report(results: List[ClientResult], wall_seconds: float, before, after):
+    ok = [r for r in results if r.ok]
+    failed = [r for r in results if not r.ok]
+    audio_seconds = sum(r.audio_seconds for r in ok)
+
+    print("\n" + "═" * 60)
+    print(f"Sessions:        {len(ok)} ok, {len(failed)} failed")
+    for error in sorted({r.error or 'closed early' for r in failed})[:5]:
+        print(f"   ✗ {error}")
+    print(f"Wall time:       {wall_seconds:.1f} s")
+    print(f"Audio relayed:   {audio_seconds:.1f} s ({audio_seconds / wall_seconds:.1f}x realtime)")
+    print(f"Client bytes:    {sum(r.bytes_sent for r in results) / 1e6:.2f} MB sent, "
+          f"{sum(r.bytes_received for r in results) / 1e6:.2f} MB received")
+    print(f"Transcripts:     {sum(r.partials for r in results)} partials, {sum(r.finals for r in results)} finals")
+    print("\nClient-side latency (ms)")
+    print(f"   connect       {percentiles([r.connect_ms for r in ok if r.connect_ms is not None])}")
+    print(f"   first partial {percentiles([r.first_partial_ms for r in ok if r.first_partial_ms is not None])}")
+    print(f"   eos → close   {percentiles([r.eos_to_close_ms for r in ok if r.eos_to_close_ms is not None])}")
+
+    if after:
+        summaries = after.get("summaries", {})
+        print("\nServer-side relay latency (ms, whole process lifetime)")
+        for name in ["realtime.lease_ms", "realtime.first_partial_ms", "realtime.partial_lag_ms",
+                     "realtime.partial_to_final_ms", "realtime.client_queue_depth"]:
+            s = summaries.get(name)
+            if s:
+                print(f"   {name[9:]:<20} p50 {s['p50']:7.1f}  p95 {s['p95']:7.1f}  p99 {s['p99']:7.1f}  (n={s['count']})")
+
+    if before and after and ok:
+        cpu = after["process"]["cpu_seconds"] - before["process"]["cpu_seconds"]
+        print(f"\nServer CPU:      {cpu:.2f} s total, {cpu / len(ok) * 1000:.0f} ms per session, "
+              f"{cpu / max(audio_seconds, 1e-9) * 100:.2f}% of one core per concurrent stream")
+    print("═" * 60)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load test /api/transcribe/realtime")
+    parser.add_argument("--url", default="ws://localhost:8000/api/transcribe/realtime")
+    parser.add_argument("--metrics-url", default="http://localhost:8000/api/metrics",
+                        help="empty to skip server-side metrics")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--seconds", type=float, default=15, help="audio streamed per session")
+    parser.add_argument("--ramp", type=float, default=2.0, help="spread session starts over this many seconds")
+    parser.add_argument("--wav", help="16-bit PCM WAV to stream (looped)")
+    args = parser.parse_args()
+
+    if args.wav:
+        audio, sample_rate, channels = load_wav(args.wav)
+    else:
+        audio, sample_rate, channels = synthetic_speech(10.0), 16000, 1
+
+    print(f"🚀 {args.sessions} sessions × {args.seconds:.0f} s of {sample_rate} Hz/{channels}ch audio → {args.url}")
+    before = fetch_metrics(args.metrics_url)
+
+    async def delayed(i):
+        await asyncio.sleep(args.ramp * i / max(1, args.sessions))
+        return await run_client(args.url, audio, sample_rate, channels, args.seconds)
+
+    started = time.monotonic()
+    results = await asyncio.gather(*(delayed(i) for i in range(args.sessions)))
+    wall_seconds = time.monotonic() - started
+
+    report(results, wall_seconds, before, fetch_metrics(args.metrics_url))
+    return 0 if all(r.ok for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -6,17 +6,25 @@ Unified API for immersive language learning
 Endpoints:
 - /api/speak, /api/transcribe - Voice (ElevenLabs)
 - /api/transcribe/realtime - Real-time WebSocket transcription
-- /api/conversation/respond - Multi-turn AI conversations
+- /api/conversation/respond - Multi-turn AI conversations (/respond/stream for SSE)
+- /api/conversation/voice - Full-duplex spoken conversation WebSocket
 - /api/scenario/generate - Dynamic scenario generation
 ═══════════════════════════════════════════════════════════════════════════════
 """
 
+import os
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 # Import routers
-from routers import conversation, voice, scenario
+from routers import conversation, voice, scenario, metrics
+from services.elevenlabs_service import elevenlabs_service
+from services.greeting_service import greeting_service
+from services.audio_upload import UploadSizeLimitMiddleware
+from services.realtime_admission import realtime_admission
+from services.npc_service import npc_service
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # APP INITIALIZATION
@@ -30,6 +38,10 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# Reject oversize audio uploads before the multipart body is buffered.
+# Added before CORS so CORS wraps it and its 413 still carries CORS headers.
+app.add_middleware(UploadSizeLimitMiddleware, paths=["/api/transcribe"])
+
 # CORS - Allow all origins for development
 app.add_middleware(
     CORSMiddleware,
@@ -37,7 +49,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["X-Session-Id", "X-Transcription", "X-Response-Text", "X-Turn-Count"]
+    expose_headers=[
+        "X-Session-Id", "X-Transcription", "X-Response-Text", "X-Turn-Count",
+        "ETag", "Content-Range", "Accept-Ranges"
+    ]
 )
 
 
@@ -54,6 +69,9 @@ app.include_router(conversation.router)
 # Scenario API - Dynamic generation
 app.include_router(scenario.router)
 
+# Metrics API - Runtime counters and latencies
+app.include_router(metrics.router)
+
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # ROOT & HEALTH ENDPOINTS
@@ -70,6 +88,8 @@ async def root():
             "voice": "/api/speak, /api/transcribe",
             "realtime_transcription": "ws://host/api/transcribe/realtime",
             "conversation": "/api/conversation/respond",
+            "conversation_stream": "/api/conversation/respond/stream",
+            "voice_conversation": "ws://host/api/conversation/voice",
             "scenario": "/api/scenario/generate",
             "docs": "/docs"
         },
@@ -109,6 +129,27 @@ async def server_error_handler(request, exc):
     )
 
 
+# ═══════════════════════════════════════════════════════════════════════════════
+# LIFECYCLE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@app.on_event("startup")
+async def startup():
+    """Warm the NPC greeting audio store and realtime STT sessions in the background."""
+    if os.getenv("PRERENDER_GREETINGS", "1") == "1":
+        asyncio.create_task(greeting_service.prerender())
+    elevenlabs_service.realtime_pool.start()
+    realtime_admission.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Release pooled upstream connections, realtime sessions and the Claude client."""
+    await realtime_admission.close()
+    await elevenlabs_service.aclose()
+    await npc_service.aclose()
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # STARTUP
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -122,6 +163,7 @@ if __name__ == "__main__":
     print("   Voice:        /api/speak, /api/transcribe")
     print("   Realtime STT: ws://localhost:8000/api/transcribe/realtime")
     print("   Conversation: /api/conversation/respond")
+    print("   Voice chat:   ws://localhost:8000/api/conversation/voice")
     print("   Scenario:     /api/scenario/generate")
     print("   Docs:         /docs")
     print("═" * 60)
@@ -0,0 +1,31 @@
+"""
+Pre-render every NPC greeting into the local greeting audio store.
+
+Usage:
+    python prerender_greetings.py
+
+The server also does this in the background at startup unless
+PRERENDER_GREETINGS=0.
+"""
+
+import os
+import sys
+import asyncio
+
+# Add current directory to path so imports work
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.elevenlabs_service import elevenlabs_service
+from services.greeting_service import greeting_service
+
+
+async def main():
+    try:
+        summary = await greeting_service.prerender()
+    finally:
+        await elevenlabs_service.aclose()
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
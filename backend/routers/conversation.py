@@ -5,27 +5,53 @@ Multi-turn dialogues with Claude
 ═══════════════════════════════════════════════════════════════════════════════
 """
 
-from fastapi import APIRouter
-from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from fastapi import APIRouter, HTTPException, Request, WebSocket
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict
+from pydantic.alias_generators import to_camel
+from typing import Optional, List, Dict, Any, AsyncIterator
+import os
+import json
+import time
 import uuid
 
-from services.npc_service import npc_service
+from services.npc_service import npc_service, parse_reply
+from services.metrics_service import metrics
+from services.elevenlabs_service import elevenlabs_service
+from services.greeting_service import NPC_VOICE_CHARACTER
+from services.voice_turn import VoiceTurnPipeline
+from routers.voice import serve_realtime
 from services.lesson_service import lesson_service
+from services.greeting_service import greeting_service
+from services.audio_formats import negotiate_audio_format
+from services.audio_response import audio_response
 
 router = APIRouter(prefix="/api/conversation", tags=["Conversation"])
 
+# NPC audio on the voice socket (raw PCM needs no decoder on the client)
+VOICE_AUDIO_FORMAT = os.getenv("VOICE_AUDIO_FORMAT", "pcm_24000")
+
+# After the client's eos, how long the last turn may keep speaking
+VOICE_FINISH_SECONDS = 30
+
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # REQUEST/RESPONSE MODELS
 # ═══════════════════════════════════════════════════════════════════════════════
 
+class StartRequest(BaseModel):
+    """Start a conversation with an NPC"""
+    npc_id: str
+
+
 class RespondRequest(BaseModel):
-    """Send a message in a conversation"""
+    """Send a message in a conversation (snake_case or camelCase fields)"""
+    model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
+    
     language: str
     language_name: Optional[str] = None
     user_input: str
-    conversation_history: List[Dict[str, str]] = []
+    conversation_history: List[Dict[str, Any]] = []
     character: Optional[Dict[str, Any]] = None
     scenario: Optional[Dict[str, Any]] = None
     difficulty: Optional[Dict[str, Any]] = None
@@ -65,21 +91,66 @@ def get_or_create_session(session_id: Optional[str] = None) -> tuple[str, Dict]:
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
-# CONVERSATION ENDPOINT
+# CONVERSATION ENDPOINTS
 # ═══════════════════════════════════════════════════════════════════════════════
 
-@router.post("/respond")
-async def respond_to_message(request: RespondRequest):
+@router.post("/start")
+async def start_conversation(request: StartRequest):
     """
-    Process user message and generate NPC response.
+    Start a conversation with an NPC.
     
-    This is the main conversation endpoint that:
-    1. Takes user input (text)
-    2. Generates NPC response via Claude
-    3. Returns response with teaching elements
+    Returns the NPC's greeting and an audio_url pointing at its
+    pre-rendered clip.
     """
-    session_id, session = get_or_create_session(request.session_id)
+    greeting, clip_id = greeting_service.get_greeting(request.npc_id)
+    
+    return {
+        "message": f"Conversation started with {request.npc_id}",
+        "npc_id": request.npc_id,
+        "greeting": greeting,
+        "audio_url": greeting_service.audio_url(clip_id) if clip_id else None,
+        "voice_id": npc_service.get_voice_id(request.npc_id)
+    }
+
+
+@router.get("/audio/{audio_id}")
+async def get_audio(audio_id: str, request: Request):
+    """
+    Serve a content-addressed audio clip.
+    
+    Pre-rendered clips come straight from the local store; a known
+    greeting that has not been warmed yet is rendered once on demand.
+    The id may carry a file extension (e.g. "<clip>.mp3"), which must
+    match the format the clip is stored in, since responses are marked
+    immutable. They carry a strong ETag and support If-None-Match and
+    byte ranges.
+    """
+    audio_id, _, extension = audio_id.partition(".")
+    audio_format = greeting_service.clip_format(audio_id)
+    if audio_format is None or extension not in ("", audio_format.extension):
+        raise HTTPException(status_code=404, detail="Audio not found")
+    
+    audio = greeting_service.get_audio(audio_id)
+    
+    if audio is None:
+        try:
+            audio = await greeting_service.render(audio_id)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"TTS Error: {str(e)}")
+    
+    if audio is None:
+        raise HTTPException(status_code=404, detail="Audio not found")
     
+    return audio_response(
+        request,
+        audio,
+        media_type=audio_format.media_type,
+        filename=f"{audio_id}.{audio_format.extension}"
+    )
+
+
+def _npc_request(request: RespondRequest, session: Dict[str, Any]) -> Dict[str, Any]:
+    """Arguments for npc_service from a respond request."""
     # Build conversation history
     history = request.conversation_history or session.get("history", [])
     
@@ -93,58 +164,244 @@ async def respond_to_message(request: RespondRequest):
     if request.difficulty:
         difficulty_level = request.difficulty.get("level", 1)
     
+    return {
+        "player_input": request.user_input,
+        "npc_name": character_name.lower(),
+        "conversation_history": history[-10:],  # Last 10 messages
+        "quest_state": {
+            "step": game_state.get("quest_step", 1),
+            "scenario": request.scenario.get("id") if request.scenario else None
+        },
+        "difficulty": difficulty_level
+    }
+
+
+def _record_turn(
+    request: RespondRequest,
+    session_id: str,
+    session: Dict[str, Any],
+    npc_response: Dict[str, Any],
+    difficulty_level: int
+) -> Dict[str, Any]:
+    """Store a finished turn and build the response payload."""
+    response_text = npc_response.get("response", "I understand. Please continue.")
+    
+    # Update session history
+    session["history"].append({"role": "user", "content": request.user_input})
+    session["history"].append({"role": "assistant", "content": response_text})
+    session["turn_count"] += 1
+    
+    # Track vocabulary if mentioned
+    if npc_response.get("vocabulary"):
+        session["vocabulary_learned"].extend(npc_response["vocabulary"])
+        # Update user glossary
+        for word in npc_response["vocabulary"]:
+            lesson_service.add_vocabulary_word(
+                request.user_id,
+                request.language,
+                word
+            )
+    
+    # Update game state
+    game_state["conversation_count"] += 1
+    
+    return {
+        "session_id": session_id,
+        "response": response_text,
+        "text": response_text,  # Alias for compatibility
+        "translation": npc_response.get("translation"),
+        "correction": npc_response.get("correction"),
+        "encouragement": npc_response.get("encouragement"),
+        "new_vocabulary": npc_response.get("vocabulary", []),
+        "newVocabulary": npc_response.get("vocabulary", []),  # Alias
+        "turn_count": session["turn_count"],
+        "difficulty_level": difficulty_level
+    }
+
+
+def _fallback(session_id: str, error: Exception) -> Dict[str, Any]:
+    return {
+        "session_id": session_id,
+        "response": "That's great! Keep practicing.",
+        "text": "That's great! Keep practicing.",
+        "error": str(error)
+    }
+
+
+@router.post("/respond")
+async def respond_to_message(request: RespondRequest):
+    """
+    Process user message and generate NPC response.
+    
+    This is the main conversation endpoint that:
+    1. Takes user input (text)
+    2. Generates NPC response via Claude
+    3. Returns response with teaching elements
+    """
+    session_id, session = get_or_create_session(request.session_id)
+    npc_request = _npc_request(request, session)
+    
     try:
         # Get NPC response from Claude
-        npc_response = npc_service.get_npc_response(
-            player_input=request.user_input,
-            npc_name=character_name.lower(),
-            conversation_history=history[-10:],  # Last 10 messages
-            quest_state={
-                "step": game_state.get("quest_step", 1),
-                "scenario": request.scenario.get("id") if request.scenario else None
-            },
-            difficulty=difficulty_level
-        )
-        
-        response_text = npc_response.get("response", "I understand. Please continue.")
-        
-        # Update session history
-        session["history"].append({"role": "user", "content": request.user_input})
-        session["history"].append({"role": "assistant", "content": response_text})
-        session["turn_count"] += 1
-        
-        # Track vocabulary if mentioned
-        if npc_response.get("vocabulary"):
-            session["vocabulary_learned"].extend(npc_response["vocabulary"])
-            # Update user glossary
-            for word in npc_response["vocabulary"]:
-                lesson_service.add_vocabulary_word(
-                    request.user_id,
-                    request.language,
-                    word
-                )
-        
-        # Update game state
-        game_state["conversation_count"] += 1
-        
-        return {
-            "session_id": session_id,
-            "response": response_text,
-            "text": response_text,  # Alias for compatibility
-            "translation": npc_response.get("translation"),
-            "correction": npc_response.get("correction"),
-            "encouragement": npc_response.get("encouragement"),
-            "new_vocabulary": npc_response.get("vocabulary", []),
-            "newVocabulary": npc_response.get("vocabulary", []),  # Alias
-            "turn_count": session["turn_count"],
-            "difficulty_level": difficulty_level
-        }
+        npc_response = await npc_service.get_npc_response(**npc_request)
+        return _record_turn(request, session_id, session, npc_response, npc_request["difficulty"])
         
     except Exception as e:
         # Fallback response
-        return {
-            "session_id": session_id,
-            "response": "That's great! Keep practicing.",
-            "text": "That's great! Keep practicing.",
-            "error": str(e)
-        }
+        return _fallback(session_id, e)
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/respond/stream")
+async def respond_to_message_stream(request: RespondRequest):
+    """
+    Streaming variant of /respond over Server-Sent Events.
+    
+    Emits `token` events ({"text": ...}) as Claude generates the reply,
+    then one `done` event with the same payload /respond returns
+    (translation, correction, vocabulary, turn_count, ...). An upstream
+    failure ends the stream with an `error` event carrying the fallback
+    reply. The turn is only recorded once the reply is complete.
+    """
+    session_id, session = get_or_create_session(request.session_id)
+    npc_request = _npc_request(request, session)
+    
+    async def events() -> AsyncIterator[str]:
+        started = time.monotonic()
+        parts: List[str] = []
+        try:
+            async for text in npc_service.stream_npc_response(**npc_request):
+                if not parts:
+                    metrics.observe("conversation.first_token_ms", (time.monotonic() - started) * 1000)
+                parts.append(text)
+                yield _sse("token", {"text": text})
+        except Exception as e:
+            print(f"Conversation stream error: {e}")
+            metrics.inc("conversation.stream_errors")
+            yield _sse("error", _fallback(session_id, e))
+            return
+        
+        metrics.observe("conversation.reply_ms", (time.monotonic() - started) * 1000)
+        text = "".join(parts)
+        npc_response = {"response": text, **parse_reply(text)}
+        yield _sse("done", _record_turn(request, session_id, session, npc_response, npc_request["difficulty"]))
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# VOICE CONVERSATION (full duplex)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@router.websocket("/voice")
+async def voice_conversation(websocket: WebSocket):
+    """
+    One socket for a whole spoken conversation: mic audio in, NPC voice out.
+    
+    Replaces the /api/transcribe → /respond → /api/speak round trips. The
+    input side is the /api/transcribe/realtime protocol (binary PCM frames,
+    partial/final transcripts, eos, ping, capacity handling); config also
+    accepts the conversation fields:
+       {"type": "config", "sample_rate": 48000, "npc_id": "mati",
+        "language": "pl", "difficulty": {"level": 2}, "session_id": "...",
+        "output_format": "pcm_24000"}
+    
+    Every final transcript starts an NPC turn, overlapping the stages:
+       - {"type": "turn_start", "turn": n, "transcript": "..."}
+       - {"type": "npc_token", "turn": n, "text": "..."} as Claude writes
+       - binary frames of NPC audio (output_format, default pcm_24000),
+         starting as soon as the first sentence's TTS streams back
+       - {"type": "npc_reply", "turn": n, ...} with the /respond payload
+       - {"type": "turn_end", "turn": n} once all audio has been sent
+    Speaking again mid-turn interrupts it: the next turn_start means
+    "stop playing the previous turn".
+    """
+    await websocket.accept()
+    
+    settings: Dict[str, Any] = {
+        "npc_id": "amélie",
+        "language": "pl",
+        "output_format": VOICE_AUDIO_FORMAT,
+        "session_id": websocket.query_params.get("session_id")
+    }
+    def on_config(data: Dict[str, Any]):
+        for key in ("npc_id", "language", "character", "scenario", "difficulty", "session_id", "user_id"):
+            if data.get(key):
+                settings[key] = data[key]
+        if data.get("output_format"):
+            try:
+                settings["output_format"] = negotiate_audio_format(data["output_format"]).name
+            except ValueError as e:
+                print(f"Voice conversation config error: {e}")
+    
+    def turn_request(text: str) -> RespondRequest:
+        return RespondRequest(
+            language=settings["language"],
+            user_input=text,
+            character=settings.get("character") or {"name": settings["npc_id"]},
+            scenario=settings.get("scenario"),
+            difficulty=settings.get("difficulty"),
+            session_id=settings.get("session_id"),
+            user_id=settings.get("user_id") or "default_user"
+        )
+    
+    def current_session():
+        session_id, session = get_or_create_session(settings.get("session_id"))
+        settings["session_id"] = session_id
+        return session_id, session
+    
+    def reply_stream(text: str):
+        _, session = current_session()
+        return npc_service.stream_npc_response(**_npc_request(turn_request(text), session))
+    
+    def on_reply(text: str, reply: str) -> Dict[str, Any]:
+        request = turn_request(text)
+        session_id, session = current_session()
+        npc_response = {"response": reply, **parse_reply(reply)}
+        return _record_turn(request, session_id, session, npc_response, (request.difficulty or {}).get("level", 1))
+    
+    def synthesize(segment: str):
+        npc_id = ((settings.get("character") or {}).get("name") or settings["npc_id"]).lower()
+        if npc_id in npc_service.voice_ids:
+            return elevenlabs_service.text_to_speech_stream_async(
+                text=segment,
+                character_id=NPC_VOICE_CHARACTER,
+                audio_format=settings["output_format"],
+                voice_id=npc_service.get_voice_id(npc_id)
+            )
+        return elevenlabs_service.text_to_speech_stream_async(
+            text=segment,
+            character_id=npc_id,
+            audio_format=settings["output_format"]
+        )
+    
+    pipeline = VoiceTurnPipeline(
+        websocket.send_text,
+        websocket.send_bytes,
+        reply_stream=reply_stream,
+        synthesize=synthesize,
+        on_reply=on_reply
+    )
+    
+    try:
+        await serve_realtime(
+            websocket,
+            send_text=pipeline.send_text,
+            on_transcript=pipeline.on_transcript,
+            on_config=on_config
+        )
+        # After eos the last reply still gets spoken
+        await pipeline.wait(VOICE_FINISH_SECONDS)
+    finally:
+        await pipeline.close()
+        try:
+            await websocket.close()
+        except Exception:
+            pass
@@ -0,0 +1,43 @@
+"""
+═══════════════════════════════════════════════════════════════════════════════
+METRICS ROUTER - Runtime Metrics
+Process-local counters, gauges and latency summaries
+═══════════════════════════════════════════════════════════════════════════════
+"""
+
+import time
+from fastapi import APIRouter
+
+from services.metrics_service import metrics
+from services.elevenlabs_service import elevenlabs_service
+from services.realtime_admission import realtime_admission
+from services.npc_service import npc_service
+
+router = APIRouter(prefix="/api/metrics", tags=["Metrics"])
+
+STARTED_AT = time.monotonic()
+
+
+@router.get("")
+async def get_metrics():
+    """
+    Snapshot of this worker's metrics.
+    
+    Includes VAD savings, realtime relay counters, the TTS and NPC reply
+    caches and this process's CPU time (load_realtime.py diffs it to get CPU per session).
+    """
+    return {
+        **metrics.snapshot(),
+        "process": {
+            "cpu_seconds": round(time.process_time(), 3),
+            "uptime_seconds": round(time.monotonic() - STARTED_AT, 1)
+        },
+        "tts_cache": elevenlabs_service.get_tts_cache_stats(),
+        "realtime_pool": elevenlabs_service.realtime_pool.stats(),
+        "realtime_admission": realtime_admission.stats(),
+        "reply_cache": {
+            **npc_service.reply_cache.stats(),
+            "flight": npc_service.reply_flight.stats(),
+            "near_duplicates": npc_service.reply_index.stats()
+        }
+    }
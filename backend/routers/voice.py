@@ -5,18 +5,41 @@ Handles TTS, STT, and Real-time Transcription
 ═══════════════════════════════════════════════════════════════════════════════
 """
 
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, WebSocket, WebSocketDisconnect
-from fastapi.responses import Response
+from fastapi import APIRouter, HTTPException, Request, UploadFile, File, Form, Query, Header, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List, Dict, Any, Callable, Awaitable
+import os
+import io
 import json
+import time
 import asyncio
-import base64
+import zipfile
+from collections import deque
 
 from services.elevenlabs_service import elevenlabs_service, RealtimeTranscriptionSession
+from services.tts_pipeline import TAG_PATTERN, split_reply, synthesize_segments
+from services.audio_formats import AudioFormat, negotiate_audio_format
+from services.audio_response import audio_response, PRIVATE_CACHE_CONTROL
+from services.audio_upload import read_audio_upload
+from services.audio_processing import (
+    VAD_ENABLED, STT_SAMPLE_RATE, StreamingVAD, StreamingResampler, parse_input_format, prepare_wav_for_stt
+)
+from services.realtime_protocol import parse_client_frame
+from services.realtime_relay import RealtimeRelay
+from services.realtime_stats import RealtimeSessionStats
+from services.realtime_admission import AdmissionTicket, realtime_admission
+from services.metrics_service import metrics
 
 router = APIRouter(prefix="/api", tags=["Voice"])
 
+# Max concurrent upstream calls when synthesizing a multi-sentence reply
+TTS_PIPELINE_CONCURRENCY = int(os.getenv("TTS_PIPELINE_CONCURRENCY", "3"))
+
+# Batch TTS limits
+TTS_BATCH_CONCURRENCY = int(os.getenv("TTS_BATCH_CONCURRENCY", "4"))
+TTS_BATCH_MAX_ITEMS = int(os.getenv("TTS_BATCH_MAX_ITEMS", "200"))
+
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # REQUEST MODELS
@@ -34,36 +57,231 @@ class SpeakRequest(BaseModel):
     similarity_boost: Optional[float] = 0.8
 
 
+class BatchSpeakItem(BaseModel):
+    """A single entry in a batch TTS request"""
+    text: str
+    character_id: Optional[str] = None
+    expression: Optional[str] = None
+
+
+class BatchSpeakRequest(BaseModel):
+    """Request model for batch text-to-speech (e.g. lesson vocabulary)"""
+    items: List[BatchSpeakItem]
+    character_id: Optional[str] = "amelie"
+    expression: Optional[str] = None
+    format: Optional[str] = None
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # TEXT-TO-SPEECH ENDPOINTS
 # ═══════════════════════════════════════════════════════════════════════════════
 
 @router.post("/speak")
-async def text_to_speech(request: SpeakRequest):
+async def text_to_speech(
+    request: SpeakRequest,
+    http_request: Request,
+    stream: bool = Query(False, description="Stream audio chunks as they arrive from upstream"),
+    audio_format: Optional[str] = Query(None, alias="format", description="Output format, e.g. mp3_64, opus_32, pcm_16000"),
+    accept: Optional[str] = Header(None)
+):
     """
     Convert text to speech using ElevenLabs.
     
-    Returns audio as MP3 bytes for direct playback.
+    Returns audio as MP3 bytes for direct playback. The output format is
+    taken from `?format=` or negotiated from the Accept header
+    (audio/mpeg, audio/ogg, audio/pcm;rate=16000|24000). With `?stream=true`
+    the response uses chunked transfer and each upstream chunk is
+    forwarded as soon as it arrives, so playback can start before
+    synthesis finishes. Multi-sentence text (e.g. NPC replies with
+    several voice tags) is split into segments that are synthesized
+    concurrently and streamed back in order (MP3 and PCM only; Ogg
+    output is rendered as one clip).
+    
+    Non-streamed responses carry a strong ETag and honour If-None-Match
+    and Range.
     """
+    output = _negotiate_format(audio_format, accept)
+    
+    if stream:
+        return await _stream_speech(request, output)
+    
     try:
-        audio_bytes = elevenlabs_service.text_to_speech(
+        audio_bytes = await elevenlabs_service.text_to_speech_async(
             text=request.text,
             character_id=request.character_id,
-            expression=request.expression
+            expression=request.expression,
+            audio_format=output.name
         )
         
-        return Response(
-            content=audio_bytes,
-            media_type="audio/mpeg",
-            headers={
-                "Content-Disposition": "inline; filename=speech.mp3"
-            }
+        return audio_response(
+            http_request,
+            audio_bytes,
+            media_type=output.media_type,
+            filename=f"speech.{output.extension}",
+            cache_control=PRIVATE_CACHE_CONTROL
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"TTS Error: {str(e)}")
 
 
+def _negotiate_format(audio_format: Optional[str], accept: Optional[str]) -> AudioFormat:
+    """Resolve the requested output format or fail with a 400."""
+    try:
+        return negotiate_audio_format(audio_format, accept)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _segment_expression(segment: str, expression: Optional[str]) -> Optional[str]:
+    """A segment that already starts with a voice tag must not get a second one."""
+    return None if TAG_PATTERN.match(segment) else expression
+
+
+async def _stream_speech(request: SpeakRequest, output: AudioFormat) -> StreamingResponse:
+    """Build a chunked audio response backed by the upstream TTS stream."""
+    segments = split_reply(request.text)
+    
+    if len(segments) > 1 and output.concatenable:
+        audio_stream = synthesize_segments(
+            segments,
+            lambda segment: elevenlabs_service.text_to_speech_async(
+                text=segment,
+                character_id=request.character_id,
+                expression=_segment_expression(segment, request.expression),
+                audio_format=output.name
+            ),
+            max_concurrency=TTS_PIPELINE_CONCURRENCY
+        )
+    else:
+        # One segment, or Ogg output that must stay a single clip
+        text = segments[0] if len(segments) == 1 else request.text
+        audio_stream = elevenlabs_service.text_to_speech_stream_async(
+            text=text,
+            character_id=request.character_id,
+            expression=_segment_expression(text, request.expression),
+            audio_format=output.name
+        )
+    
+    # Pull the first chunk before committing to a 200 so upstream
+    # failures still surface as a proper error response.
+    try:
+        first_chunk = await audio_stream.__anext__()
+    except StopAsyncIteration:
+        first_chunk = b""
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"TTS Error: {str(e)}")
+    
+    async def relay():
+        yield first_chunk
+        async for chunk in audio_stream:
+            yield chunk
+    
+    return StreamingResponse(
+        relay(),
+        media_type=output.media_type,
+        headers={
+            "Content-Disposition": f"inline; filename=speech.{output.extension}"
+        }
+    )
+
+
+@router.post("/speak/batch")
+async def text_to_speech_batch(request: BatchSpeakRequest):
+    """
+    Convert a list of texts to speech in a single round trip.
+    
+    Items fall back to the request-level character_id/expression.
+    Identical items are synthesized once, and upstream calls run
+    concurrently (TTS_BATCH_CONCURRENCY).
+    
+    Returns a ZIP archive with one clip per unique item (in the
+    request's `format`, MP3 by default) and an index.json mapping each
+    input item to its file.
+    """
+    output = _negotiate_format(request.format, None)
+    
+    if len(request.items) > TTS_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(request.items)} items (max {TTS_BATCH_MAX_ITEMS})"
+        )
+    
+    # Deduplicate on the resolved request so equivalent items share a clip
+    clip_ids: List[str] = []
+    unique: Dict[str, BatchSpeakItem] = {}
+    for item in request.items:
+        character_id = item.character_id or request.character_id
+        expression = item.expression or request.expression
+        resolved = elevenlabs_service.resolve_tts_request(
+            item.text, character_id, expression, audio_format=output.name
+        )
+        clip_id = elevenlabs_service.tts_cache_key(resolved)
+        clip_ids.append(clip_id)
+        unique.setdefault(clip_id, BatchSpeakItem(text=item.text, character_id=character_id, expression=expression))
+    
+    semaphore = asyncio.Semaphore(max(1, TTS_BATCH_CONCURRENCY))
+    
+    async def render(item: BatchSpeakItem):
+        async with semaphore:
+            return await elevenlabs_service.text_to_speech_async(
+                text=item.text,
+                character_id=item.character_id,
+                expression=item.expression,
+                audio_format=output.name
+            )
+    
+    results = await asyncio.gather(
+        *(render(item) for item in unique.values()),
+        return_exceptions=True
+    )
+    clips: Dict[str, Any] = dict(zip(unique.keys(), results))
+    
+    index = []
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_STORED) as zf:
+        for clip_id, result in clips.items():
+            if not isinstance(result, Exception):
+                zf.writestr(f"{clip_id}.{output.extension}", result)
+        
+        for position, (item, clip_id) in enumerate(zip(request.items, clip_ids)):
+            result = clips[clip_id]
+            entry = {"index": position, "text": item.text, "clip_id": clip_id}
+            if isinstance(result, Exception):
+                entry["error"] = str(result)
+            else:
+                entry["file"] = f"{clip_id}.{output.extension}"
+            index.append(entry)
+        
+        zf.writestr("index.json", json.dumps({
+            "items": index,
+            "format": output.name,
+            "media_type": output.media_type,
+            "unique_clips": len(clips),
+            "failed": sum(1 for r in results if isinstance(r, Exception))
+        }, ensure_ascii=False))
+    
+    return Response(
+        content=archive.getvalue(),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": "attachment; filename=speech_batch.zip"
+        }
+    )
+
+
+@router.get("/speak/cache/stats")
+async def tts_cache_stats():
+    """
+    Audio cache statistics.
+    
+    Returns hit/miss/eviction counters, tier occupancy, how many
+    upstream characters were billed vs. served from cache, and how many
+    TTS/STT requests were coalesced onto an in-flight call.
+    """
+    return elevenlabs_service.get_tts_cache_stats()
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # SPEECH-TO-TEXT ENDPOINTS
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -76,16 +294,38 @@ async def speech_to_text(
     """
     Transcribe audio to text using ElevenLabs Scribe.
     
-    Accepts audio file upload and returns transcription.
+    Accepts audio file upload and returns transcription. Uploads are
+    capped at STT_MAX_UPLOAD_MB, must start with a recognised audio
+    header, and are streamed upstream from the spooled upload file.
+    PCM WAV uploads are downmixed to mono, resampled to 16 kHz and
+    have leading/trailing silence trimmed first.
     """
     try:
-        # Read audio content
-        audio_content = await audio.read()
+        # Validate without reading the whole upload into memory
+        upload = await read_audio_upload(audio)
+        audio_content = upload.file
+        content_hash = upload.sha256
+        
+        # Normalize where we can decode locally (compressed formats pass through)
+        if upload.format == "wav":
+            # Reads the spooled file in chunks; only the 16 kHz result is kept.
+            # Decode, resample and VAD run off the event loop.
+            prepared, info = await asyncio.to_thread(prepare_wav_for_stt, upload.file, trim=VAD_ENABLED)
+            if prepared is not upload.file:
+                metrics.inc("vad.upload_bytes_saved", info["bytes_trimmed"])
+                metrics.inc("vad.upload_seconds_saved", info["seconds_trimmed"])
+                if info["resampled"] or info["downmixed"]:
+                    metrics.inc("stt.uploads_normalized")
+                audio_content, content_hash = prepared, None
+            else:
+                await audio.seek(0)
         
         # Transcribe
-        result = elevenlabs_service.speech_to_text(
+        result = await elevenlabs_service.speech_to_text_async(
             audio_content=audio_content,
-            language_hint=language
+            language_hint=language,
+            content_hash=content_hash,
+            content_type=upload.content_type
         )
         
         if "error" in result:
@@ -114,8 +354,10 @@ async def realtime_transcription(websocket: WebSocket):
     WebSocket endpoint for real-time speech-to-text transcription.
     
     Protocol:
-    1. Client connects and optionally sends config: {"type": "config", "language": "fr", "sample_rate": 16000}
-    2. Client sends audio chunks: {"type": "audio", "data": "<base64_encoded_pcm_audio>"}
+    1. Client connects and optionally sends config:
+       {"type": "config", "language": "fr", "sample_rate": 48000, "channels": 2}
+    2. Client sends audio chunks as binary frames of raw PCM
+       (the legacy text frame {"type": "audio", "data": "<base64>"} still works)
     3. Server responds with transcription updates:
        - Partial: {"type": "partial", "text": "hello wor", "words": [...]}
        - Final: {"type": "final", "text": "hello world", "words": [...], "is_final": true}
@@ -123,28 +365,92 @@ async def realtime_transcription(websocket: WebSocket):
     5. Connection closes gracefully
     
     Audio Format:
-    - PCM 16-bit signed little-endian (pcm_s16le)
-    - Default sample rate: 16000 Hz
-    - Mono channel
+    - PCM 16-bit signed little-endian (pcm_s16le), interleaved if multi-channel
+    - Any sample rate / channel count (default 16000 Hz mono); audio is
+      downmixed and resampled to 16 kHz mono server-side, so changing
+      them never reconnects upstream (only a language change does)
+    
+    Capacity: when the server is full the client first gets
+    {"type": "queued", "position": n} updates, and if no slot frees up,
+    {"type": "busy", "retry_after": seconds} and close code 1013. Sessions
+    that stop sending frames, or stay silent too long (sooner when others
+    are waiting), get {"type": "session_reclaimed", "reason": ...} and are
+    closed. Send {"type": "ping"} to keep an idle socket alive.
+    
+    A language change or an upstream drop switches sessions without losing
+    audio; after an automatic reconnect the client gets {"type": "reconnected"}.
+    
+    Delta partials (opt-in with "partials": "delta" in config): partials
+    after the first of each utterance arrive as
+    {"type": "partial_delta", "keep_words": k, "words": [...], "keep_chars": c, "text": "..."}
+    i.e. keep the first k words / c characters of the previous partial and
+    append the rest. A full "partial" is resent periodically; finals are
+    always full.
     """
     await websocket.accept()
+    try:
+        await serve_realtime(websocket)
+    finally:
+        try:
+            await websocket.close()
+        except:
+            pass
+
+
+async def serve_realtime(
+    websocket: WebSocket,
+    send_text: Optional[Callable[[str], Awaitable[None]]] = None,
+    on_transcript: Optional[Callable[[Dict[str, Any]], None]] = None,
+    on_config: Optional[Callable[[Dict[str, Any]], None]] = None
+):
+    """
+    Run the realtime transcription protocol on an accepted socket.
+    
+    Shared by /transcribe/realtime and the voice conversation socket:
+    send_text replaces websocket.send_text for relayed messages (so the
+    caller can serialize its own writes with them), on_transcript sees
+    every transcript message and on_config every config message. Returns
+    once the client sends eos or goes away; the caller closes the socket.
+    """
+    # Admission: admit, queue (with position updates) or turn away
+    early_frames: deque = deque()
+    try:
+        ticket = await _admit_while_listening(websocket, early_frames)
+    except WebSocketDisconnect:
+        metrics.inc("realtime.admission_abandoned")
+        return
+    if ticket is None:
+        await websocket.send_json({
+            "type": "busy",
+            "message": "Real-time transcription is at capacity",
+            "retry_after": realtime_admission.retry_after
+        })
+        await websocket.close(code=1013)  # Try Again Later
+        return
     
-    session = None
-    receive_task = None
+    relay = None
+    reclaim_task = None
+    vad = None
     
     try:
         # Default config
         language = None
-        sample_rate = 16000
+        sample_rate = STT_SAMPLE_RATE
+        channels = 1
         
-        # Create transcription session
-        session = await elevenlabs_service.create_realtime_transcription_session(
+        # Normalize client audio to 16 kHz mono, then gate silent chunks
+        resampler = StreamingResampler(sample_rate, STT_SAMPLE_RATE, channels)
+        vad = StreamingVAD(STT_SAMPLE_RATE) if VAD_ENABLED else None
+        
+        # Lease a pre-warmed upstream session (always 16 kHz upstream)
+        session_stats = RealtimeSessionStats()
+        lease_started = time.monotonic()
+        session = await elevenlabs_service.lease_realtime_session(
             language_hint=language,
-            sample_rate=sample_rate
+            sample_rate=STT_SAMPLE_RATE
         )
         
-        connected = await session.connect()
-        if not connected:
+        if session is None:
             await websocket.send_json({
                 "type": "error",
                 "message": "Failed to connect to transcription service"
@@ -152,110 +458,116 @@ async def realtime_transcription(websocket: WebSocket):
             await websocket.close()
             return
         
+        # Bounded queues both ways: a slow upstream or slow client
+        # never stalls the other side
+        session_stats.on_lease(time.monotonic() - lease_started, session)
+        relay = RealtimeRelay(
+            session,
+            send_text or websocket.send_text,
+            connect=lambda lang: elevenlabs_service.lease_realtime_session(
+                language_hint=lang,
+                sample_rate=STT_SAMPLE_RATE
+            ),
+            language=language,
+            session_stats=session_stats,
+            on_transcript=on_transcript
+        )
+        relay.start()
+        
+        # Hand the slot back when the session goes silent or the client dies
+        async def close_when_reclaimed():
+            reason = await ticket.wait_reclaimed()
+            await relay.notify({"type": "session_reclaimed", "reason": reason})
+            await relay.close()
+            await websocket.close(code=1000)
+        
+        reclaim_task = asyncio.create_task(close_when_reclaimed())
+        
         # Notify client of successful connection
-        await websocket.send_json({
+        await relay.notify({
             "type": "connected",
             "message": "Real-time transcription ready"
         })
         
-        # Task to receive transcripts from ElevenLabs and forward to client
-        async def forward_transcripts():
-            try:
-                while session.is_connected:
-                    transcript = await session.receive_transcript()
-                    if transcript is None:
-                        break
-                    
-                    # Parse and forward transcript
-                    msg_type = transcript.get("type", "unknown")
-                    
-                    if msg_type == "transcript":
-                        # Word-level transcription update
-                        await websocket.send_json({
-                            "type": "partial" if not transcript.get("is_final") else "final",
-                            "text": transcript.get("text", ""),
-                            "words": transcript.get("words", []),
-                            "language": transcript.get("language"),
-                            "is_final": transcript.get("is_final", False)
-                        })
-                    elif msg_type == "utterance_end":
-                        # End of an utterance
-                        await websocket.send_json({
-                            "type": "utterance_end"
-                        })
-                    elif msg_type == "error":
-                        await websocket.send_json({
-                            "type": "error",
-                            "message": transcript.get("message", "Unknown error")
-                        })
-                        break
-            except Exception as e:
-                print(f"Forward transcripts error: {e}")
-        
-        # Start forwarding task
-        receive_task = asyncio.create_task(forward_transcripts())
-        
-        # Main loop: receive audio from client and send to ElevenLabs
+        # Main loop: receive audio from client and queue it for ElevenLabs
         while True:
             try:
-                message = await websocket.receive_text()
-                data = json.loads(message)
+                message = early_frames.popleft() if early_frames else await websocket.receive()
+                if message["type"] == "websocket.disconnect" or relay.failed or relay.closed:
+                    break
+                
+                ticket.touch()
+                kind, data = parse_client_frame(message)
+                if kind == "audio":
+                    session_stats.on_audio_in(len(data))
+                    if data:
+                        audio_bytes = resampler.process(data)
+                        if audio_bytes:
+                            for chunk in (vad.process(audio_bytes) if vad else [audio_bytes]):
+                                ticket.spoke()
+                                await relay.send_audio(chunk)
+                    continue
+                
                 msg_type = data.get("type", "")
                 
-                if msg_type == "config":
-                    # Reconfigure (only at start, before audio)
+                if msg_type == "ping":
+                    # Keeps a silent but live client from being reclaimed as dead
+                    await relay.notify({"type": "pong"})
+                
+                elif msg_type == "config":
+                    try:
+                        new_sample_rate, new_channels = parse_input_format(
+                            data.get("sample_rate", STT_SAMPLE_RATE), data.get("channels", 1)
+                        )
+                    except ValueError as e:
+                        # Reject the whole config; the session keeps its current format
+                        await relay.notify({"type": "error", "message": str(e)})
+                        continue
+                    if on_config is not None:
+                        on_config(data)
                     new_language = data.get("language")
-                    new_sample_rate = data.get("sample_rate", 16000)
                     
-                    # If config changed, reconnect
-                    if new_language != language or new_sample_rate != sample_rate:
-                        language = new_language
+                    # Input format changes only swap the local resampler
+                    if new_sample_rate != sample_rate or new_channels != channels:
+                        tail = resampler.flush()
+                        if tail:
+                            await relay.send_audio(tail)
                         sample_rate = new_sample_rate
-                        
-                        # Close old session and create new one
-                        await session.close()
-                        if receive_task:
-                            receive_task.cancel()
-                        
-                        session = await elevenlabs_service.create_realtime_transcription_session(
-                            language_hint=language,
-                            sample_rate=sample_rate
-                        )
-                        await session.connect()
-                        receive_task = asyncio.create_task(forward_transcripts())
-                        
-                        await websocket.send_json({
-                            "type": "config_updated",
-                            "language": language,
-                            "sample_rate": sample_rate
-                        })
-                
-                elif msg_type == "audio":
-                    # Decode and forward audio
-                    audio_data = data.get("data", "")
-                    if audio_data:
-                        audio_bytes = base64.b64decode(audio_data)
-                        await session.send_audio(audio_bytes)
+                        channels = new_channels
+                        resampler = StreamingResampler(sample_rate, STT_SAMPLE_RATE, channels)
+                    
+                    if "partials" in data:
+                        relay.set_partials_mode(data["partials"])
+                    
+                    # A language change needs a new upstream session; it
+                    # connects in the background while audio keeps queueing
+                    if new_language != language:
+                        language = new_language
+                        relay.reconfigure(language)
+                    
+                    await relay.notify({
+                        "type": "config_updated",
+                        "language": language,
+                        "sample_rate": sample_rate,
+                        "channels": channels,
+                        "partials": "delta" if relay.partial_encoder else "full"
+                    })
                 
                 elif msg_type == "eos":
-                    # End of stream
-                    await session.end_stream()
-                    await websocket.send_json({
-                        "type": "eos_received"
-                    })
-                    # Wait briefly for final transcripts
-                    await asyncio.sleep(0.5)
+                    # Flush queued audio, end the stream and wait briefly for finals
+                    await relay.finish()
                     break
                     
             except WebSocketDisconnect:
                 break
-            except json.JSONDecodeError:
-                await websocket.send_json({
+            except ValueError:
+                # Bad JSON, non-object control frame or bad legacy base64
+                await relay.notify({
                     "type": "error",
                     "message": "Invalid JSON format"
                 })
             except Exception as e:
-                await websocket.send_json({
+                await relay.notify({
                     "type": "error", 
                     "message": str(e)
                 })
@@ -274,16 +586,66 @@ async def realtime_transcription(websocket: WebSocket):
             pass
     finally:
         # Cleanup
-        if receive_task:
-            receive_task.cancel()
-            try:
-                await receive_task
-            except asyncio.CancelledError:
-                pass
-        if session:
-            await session.close()
-        try:
-            await websocket.close()
-        except:
-            pass
+        if reclaim_task:
+            if ticket.is_reclaimed:
+                # Let the reclaim finish closing the relay and socket
+                await asyncio.gather(reclaim_task, return_exceptions=True)
+            else:
+                reclaim_task.cancel()
+        if relay:
+            await relay.close()
+        realtime_admission.release(ticket)
+        if vad:
+            _record_vad_savings(vad)
+
+
+async def _admit_while_listening(websocket: WebSocket, early_frames: deque) -> Optional[AdmissionTicket]:
+    """
+    Wait for admission while still reading the socket.
+
+    A client that disconnects while queued is dropped from the queue (and
+    its slot released if admission won the race) instead of being admitted
+    and holding a slot until the next receive. Frames that arrive while
+    waiting (e.g. an early config) are kept in early_frames, in order.
+
+    Raises:
+        WebSocketDisconnect if the client went away before admission.
+    """
+    admit = asyncio.create_task(realtime_admission.admit(websocket.send_json))
+    receive = None
+    try:
+        while True:
+            if receive is None:
+                receive = asyncio.create_task(websocket.receive())
+            await asyncio.wait({admit, receive}, return_when=asyncio.FIRST_COMPLETED)
+
+            if receive.done():
+                message = receive.result()
+                receive = None
+                if message["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(message.get("code", 1000))
+                early_frames.append(message)
+                continue
+
+            if admit.done():
+                return admit.result()
+    except BaseException:
+        # No awaits here: this also runs when the handler itself is cancelled
+        if admit.done() and not admit.cancelled() and admit.exception() is None:
+            if admit.result() is not None:
+                realtime_admission.release(admit.result())
+        else:
+            admit.cancel()
+        raise
+    finally:
+        if receive is not None:
+            receive.cancel()
+
+
+def _record_vad_savings(vad: StreamingVAD):
+    """Report audio the VAD kept from going upstream."""
+    vad.finish()
+    metrics.inc("vad.realtime_bytes_in", vad.bytes_in)
+    metrics.inc("vad.realtime_bytes_saved", vad.bytes_suppressed)
+    metrics.inc("vad.realtime_seconds_saved", vad.seconds_suppressed)
 
@@ -0,0 +1,253 @@
+"""
+═══════════════════════════════════════════════════════════════════════════════
+LINGUAVERSE - Content-Addressed Audio Cache
+Two-tier (memory LRU + size-capped disk) store for synthesized audio
+═══════════════════════════════════════════════════════════════════════════════
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".tts_cache")
+
+
+class AudioCache:
+    """
+    Content-addressed cache for generated audio clips.
+
+    Clips are keyed by a hash of the fully-resolved upstream request, so two
+    requests that would produce identical audio share one entry.
+
+    Tiers:
+    - Memory: bounded LRU (item count and total bytes)
+    - Disk: one file per clip, evicted least-recently-used past a byte cap
+    """
+
+    FILE_SUFFIX = ".bin"
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        max_memory_items: int = 512,
+        max_memory_bytes: int = 64 * 1024 * 1024,
+        max_disk_bytes: int = 1024 * 1024 * 1024
+    ):
+        self.cache_dir = cache_dir
+        self.max_memory_items = max_memory_items
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+
+        # key -> size, ordered oldest access first
+        self._disk_index: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+            "bytes_served": 0
+        }
+
+        self._load_disk_index()
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # KEYS
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    @staticmethod
+    def make_key(payload: Dict[str, Any]) -> str:
+        """Hash a resolved request payload into a stable cache key."""
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # PUBLIC API
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return cached audio for key, promoting disk hits into memory."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                self._counters["bytes_served"] += len(data)
+                return data
+
+            if key not in self._disk_index:
+                self._counters["misses"] += 1
+                return None
+
+        data = self._read_disk(key)
+
+        with self._lock:
+            if data is None:
+                self._forget_disk_entry(key)
+                self._counters["misses"] += 1
+                return None
+
+            if key in self._disk_index:
+                self._disk_index.move_to_end(key)
+            self._store_memory(key, data)
+            self._counters["disk_hits"] += 1
+            self._counters["bytes_served"] += len(data)
+            return data
+
+    def put(self, key: str, data: bytes):
+        """Store audio in both tiers."""
+        if not data:
+            return
+
+        with self._lock:
+            self._store_memory(key, data)
+            self._counters["writes"] += 1
+            already_on_disk = key in self._disk_index
+
+        if already_on_disk or len(data) > self.max_disk_bytes:
+            return
+
+        if self._write_disk(key, data):
+            with self._lock:
+                self._disk_index[key] = len(data)
+                self._disk_bytes += len(data)
+                self._evict_disk()
+
+    def contains(self, key: str) -> bool:
+        """Check presence in either tier without touching counters."""
+        with self._lock:
+            return key in self._memory or key in self._disk_index
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of cache counters and occupancy."""
+        with self._lock:
+            lookups = self._counters["memory_hits"] + self._counters["disk_hits"] + self._counters["misses"]
+            hits = self._counters["memory_hits"] + self._counters["disk_hits"]
+            return {
+                **self._counters,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_items": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_items": len(self._disk_index),
+                "disk_bytes": self._disk_bytes,
+                "max_memory_items": self.max_memory_items,
+                "max_memory_bytes": self.max_memory_bytes,
+                "max_disk_bytes": self.max_disk_bytes
+            }
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # MEMORY TIER
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def _store_memory(self, key: str, data: bytes):
+        """Insert into the memory LRU. Caller must hold the lock."""
+        if len(data) > self.max_memory_bytes:
+            return
+
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+
+        while self._memory and (
+            len(self._memory) > self.max_memory_items or self._memory_bytes > self.max_memory_bytes
+        ):
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self._counters["memory_evictions"] += 1
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # DISK TIER
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def _path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + self.FILE_SUFFIX)
+
+    def _load_disk_index(self):
+        """Rebuild the disk index from files left by a previous run."""
+        if not os.path.isdir(self.cache_dir):
+            return
+
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(self.FILE_SUFFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name[:-len(self.FILE_SUFFIX)], stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self._disk_index[key] = size
+            self._disk_bytes += size
+
+        with self._lock:
+            self._evict_disk()
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        path = self._path_for(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # Touch so LRU order survives restarts
+            os.utime(path, None)
+            return data
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, data: bytes) -> bool:
+        """Write atomically so readers never see a partial clip."""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path_for(key))
+            return True
+        except OSError as e:
+            print(f"Audio cache write error: {e}")
+            return False
+
+    def _forget_disk_entry(self, key: str):
+        """Drop a key from the disk index. Caller must hold the lock."""
+        size = self._disk_index.pop(key, None)
+        if size is not None:
+            self._disk_bytes -= size
+
+    def _evict_disk(self):
+        """Remove least-recently-used files past the byte cap. Caller must hold the lock."""
+        while self._disk_index and self._disk_bytes > self.max_disk_bytes:
+            key, size = self._disk_index.popitem(last=False)
+            self._disk_bytes -= size
+            self._counters["disk_evictions"] += 1
+            try:
+                os.remove(self._path_for(key))
+            except OSError:
+                pass
+
+
+# Singleton instance
+audio_cache = AudioCache(
+    cache_dir=os.getenv("TTS_CACHE_DIR", DEFAULT_CACHE_DIR),
+    max_memory_items=int(os.getenv("TTS_CACHE_MEMORY_ITEMS", "512")),
+    max_memory_bytes=int(os.getenv("TTS_CACHE_MEMORY_MB", "64")) * 1024 * 1024,
+    max_disk_bytes=int(os.getenv("TTS_CACHE_DISK_MB", "1024")) * 1024 * 1024
+)
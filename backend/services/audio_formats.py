@@ -0,0 +1,101 @@
+"""
+═══════════════════════════════════════════════════════════════════════════════
+LINGUAVERSE - Audio Output Formats
+Registry of TTS output formats and Accept-header negotiation
+═══════════════════════════════════════════════════════════════════════════════
+"""
+
+from dataclasses import dataclass
+from typing import Optional, Dict
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    """An output format we can ask ElevenLabs to render"""
+    name: str
+    upstream: str  # ElevenLabs output_format value
+    media_type: str
+    extension: str
+    # Separately rendered clips can be joined byte-for-byte into one stream
+    # (MP3 frames, raw PCM); Ogg clips would form a chained stream instead
+    concatenable: bool = True
+
+
+AUDIO_FORMATS: Dict[str, AudioFormat] = {
+    fmt.name: fmt for fmt in [
+        AudioFormat("mp3_128", "mp3_44100_128", "audio/mpeg", "mp3"),
+        AudioFormat("mp3_64", "mp3_44100_64", "audio/mpeg", "mp3"),
+        AudioFormat("mp3_32", "mp3_22050_32", "audio/mpeg", "mp3"),
+        AudioFormat("opus_64", "opus_48000_64", "audio/ogg", "ogg", concatenable=False),
+        AudioFormat("opus_32", "opus_48000_32", "audio/ogg", "ogg", concatenable=False),
+        AudioFormat("pcm_16000", "pcm_16000", "audio/pcm;rate=16000;channels=1;encoding=s16le", "pcm"),
+        AudioFormat("pcm_24000", "pcm_24000", "audio/pcm;rate=24000;channels=1;encoding=s16le", "pcm"),
+    ]
+}
+
+DEFAULT_AUDIO_FORMAT = "mp3_128"
+
+# Preferred format for each media type a client may list in Accept
+ACCEPT_MEDIA_TYPES = {
+    "audio/mpeg": "mp3_128",
+    "audio/mp3": "mp3_128",
+    "audio/ogg": "opus_64",
+    "audio/opus": "opus_64",
+    "audio/pcm": "pcm_24000",
+    "audio/l16": "pcm_24000",
+}
+
+
+def format_for_upstream(upstream: str) -> Optional[AudioFormat]:
+    """The format a resolved TTS request (its output_format) renders to."""
+    for fmt in AUDIO_FORMATS.values():
+        if fmt.upstream == upstream:
+            return fmt
+    return None
+
+
+def get_audio_format(name: Optional[str] = None) -> AudioFormat:
+    """Look up a format by name, defaulting to 128 kbps MP3."""
+    return AUDIO_FORMATS[name or DEFAULT_AUDIO_FORMAT]
+
+
+def negotiate_audio_format(requested: Optional[str] = None, accept: Optional[str] = None) -> AudioFormat:
+    """
+    Pick an output format from an explicit name or an Accept header.
+
+    An explicit name wins and must be known (raises ValueError otherwise).
+    Accept entries are tried in q-value order; a "rate" parameter on PCM
+    types selects the 16 kHz variant. Anything unrecognised falls back to
+    the default MP3.
+    """
+    if requested:
+        if requested not in AUDIO_FORMATS:
+            raise ValueError(
+                f"Unknown audio format '{requested}'. Available: {', '.join(AUDIO_FORMATS)}"
+            )
+        return AUDIO_FORMATS[requested]
+
+    if not accept:
+        return get_audio_format()
+
+    candidates = []
+    for position, entry in enumerate(accept.split(",")):
+        parts = [p.strip() for p in entry.split(";")]
+        media_type = parts[0].lower()
+        params = dict(p.split("=", 1) for p in parts[1:] if "=" in p)
+        try:
+            quality = float(params.get("q", "1"))
+        except ValueError:
+            quality = 0.0
+        if quality > 0:
+            candidates.append((-quality, position, media_type, params))
+
+    for _, _, media_type, params in sorted(candidates):
+        name = ACCEPT_MEDIA_TYPES.get(media_type)
+        if not name:
+            continue
+        if name.startswith("pcm") and params.get("rate") == "16000":
+            name = "pcm_16000"
+        return AUDIO_FORMATS[name]
+
+    return get_audio_format()
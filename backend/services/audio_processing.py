@@ -0,0 +1,358 @@
+"""
+═══════════════════════════════════════════════════════════════════════════════
+LINGUAVERSE - Audio Preprocessing for STT
+Vectorized voice-activity detection, silence trimming, downmix and resampling
+═══════════════════════════════════════════════════════════════════════════════
+"""
+
+import io
+import os
+import wave
+from collections import deque
+from typing import List, Tuple, Dict, Any, BinaryIO, Union
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+VAD_ENABLED = os.getenv("STT_VAD_ENABLED", "1") == "1"
+VAD_ENERGY_THRESHOLD_DB = float(os.getenv("STT_VAD_THRESHOLD_DB", "-45"))
+VAD_HANGOVER_MS = int(os.getenv("STT_VAD_HANGOVER_MS", "600"))
+
+BYTES_PER_SAMPLE = 2  # pcm_s16le
+
+# Everything sent upstream is 16 kHz mono pcm_s16le
+STT_SAMPLE_RATE = 16000
+
+# Frames read per chunk when normalizing a WAV upload
+WAV_READ_FRAMES = 16384
+
+# Input formats a client may declare for streamed pcm_s16le
+MIN_INPUT_SAMPLE_RATE = 8000
+MAX_INPUT_SAMPLE_RATE = 192000
+MAX_INPUT_CHANNELS = 8
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# FRAME FEATURES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def pcm16_to_array(audio: bytes) -> np.ndarray:
+    """Interpret little-endian 16-bit PCM bytes as an int16 array."""
+    usable = len(audio) - (len(audio) % BYTES_PER_SAMPLE)
+    return np.frombuffer(audio[:usable], dtype="<i2")
+
+
+def frame_speech_mask(
+    samples: np.ndarray,
+    sample_rate: int,
+    frame_ms: int = 20,
+    threshold_db: float = VAD_ENERGY_THRESHOLD_DB,
+    zcr_threshold: float = 0.25
+) -> np.ndarray:
+    """
+    Classify fixed-size frames of mono int16 audio as speech (True) or silence.
+
+    A frame is speech when its RMS level is above threshold_db (dBFS), or
+    when it is within 10 dB of it with a high zero-crossing rate, which
+    catches quiet unvoiced consonants ("s", "sz", "f"). Trailing samples
+    that do not fill a frame are ignored.
+    """
+    frame_len = max(1, sample_rate * frame_ms // 1000)
+    n_frames = len(samples) // frame_len
+    if n_frames == 0:
+        return np.zeros(0, dtype=bool)
+
+    frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len).astype(np.float32) / 32768.0
+
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    energy_db = 20.0 * np.log10(np.maximum(rms, 1e-10))
+
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_len - 1 or 1)
+
+    return (energy_db > threshold_db) | ((energy_db > threshold_db - 10.0) & (zcr > zcr_threshold))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# UPLOAD TRIMMING
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def trim_silence(
+    samples: np.ndarray,
+    sample_rate: int,
+    frame_ms: int = 20,
+    padding_ms: int = 200
+) -> Tuple[int, int]:
+    """
+    Find the [start, end) sample range holding speech in mono int16 audio.
+
+    Keeps padding_ms of context on each side. Returns the full range when
+    no speech is detected, so a quiet recording is never emptied.
+    """
+    mask = frame_speech_mask(samples, sample_rate, frame_ms)
+    voiced = np.flatnonzero(mask)
+    if voiced.size == 0:
+        return 0, len(samples)
+
+    frame_len = max(1, sample_rate * frame_ms // 1000)
+    padding = sample_rate * padding_ms // 1000
+    start = max(0, int(voiced[0]) * frame_len - padding)
+    end = min(len(samples), (int(voiced[-1]) + 1) * frame_len + padding)
+    return start, end
+
+
+def prepare_wav_for_stt(
+    source: Union[bytes, BinaryIO],
+    trim: bool = True
+) -> Tuple[Union[bytes, BinaryIO], Dict[str, Any]]:
+    """
+    Normalize a 16-bit PCM WAV upload for STT.
+
+    Downmixes to mono, resamples to 16 kHz and (optionally) trims leading
+    and trailing silence. Returns the new WAV bytes plus what changed;
+    non-PCM16, unreadable or already-minimal files are returned untouched
+    (the same object that was passed in).
+
+    source may be the WAV bytes or a file object such as the spooled
+    upload; a file is read WAV_READ_FRAMES at a time, so only the 16 kHz
+    mono result is ever held in memory.
+    """
+    info = {"resampled": False, "downmixed": False, "seconds_trimmed": 0.0, "bytes_trimmed": 0}
+    stream = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+    try:
+        with wave.open(stream, "rb") as reader:
+            params = reader.getparams()
+            if params.sampwidth != BYTES_PER_SAMPLE or params.nframes == 0:
+                return source, info
+
+            resampler = StreamingResampler(params.framerate, STT_SAMPLE_RATE, params.nchannels)
+            pieces = []
+            while True:
+                frames = reader.readframes(WAV_READ_FRAMES)
+                if not frames:
+                    break
+                pieces.append(resampler.process(frames))
+            pieces.append(resampler.flush())
+    except (wave.Error, EOFError):
+        return source, info
+
+    mono = pcm16_to_array(b"".join(pieces))
+    del pieces
+    info["resampled"] = params.framerate != STT_SAMPLE_RATE
+    info["downmixed"] = params.nchannels > 1
+
+    start, end = trim_silence(mono, STT_SAMPLE_RATE) if trim else (0, len(mono))
+    info["seconds_trimmed"] = (len(mono) - (end - start)) / STT_SAMPLE_RATE
+    # Measured at the output rate, so resampling never counts as a saving (or a loss)
+    info["bytes_trimmed"] = (len(mono) - (end - start)) * BYTES_PER_SAMPLE
+
+    if not (info["resampled"] or info["downmixed"] or info["seconds_trimmed"] > 0):
+        return source, info
+
+    out = io.BytesIO()
+    with wave.open(out, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(BYTES_PER_SAMPLE)
+        writer.setframerate(STT_SAMPLE_RATE)
+        writer.writeframes(mono[start:end].tobytes())
+    return out.getvalue(), info
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# DOWNMIX & RESAMPLING
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def lowpass_taps(cutoff: float, num_taps: int = 31) -> np.ndarray:
+    """Hann-windowed sinc low-pass; cutoff is a fraction of the input Nyquist."""
+    n = np.arange(num_taps) - (num_taps - 1) / 2
+    taps = cutoff * np.sinc(cutoff * n) * np.hanning(num_taps)
+    return (taps / taps.sum()).astype(np.float32)
+
+
+def parse_input_format(sample_rate: Any, channels: Any) -> Tuple[int, int]:
+    """
+    Validated (sample_rate, channels) from a client config message.
+
+    Raises ValueError for anything that is not a whole number in
+    MIN_INPUT_SAMPLE_RATE..MAX_INPUT_SAMPLE_RATE Hz and 1..MAX_INPUT_CHANNELS.
+    """
+    rate, count = _whole_number(sample_rate, "sample_rate"), _whole_number(channels, "channels")
+    if not MIN_INPUT_SAMPLE_RATE <= rate <= MAX_INPUT_SAMPLE_RATE:
+        raise ValueError(f"sample_rate must be {MIN_INPUT_SAMPLE_RATE}-{MAX_INPUT_SAMPLE_RATE} Hz, got {rate}")
+    if not 1 <= count <= MAX_INPUT_CHANNELS:
+        raise ValueError(f"channels must be 1-{MAX_INPUT_CHANNELS}, got {count}")
+    return rate, count
+
+
+def _whole_number(value: Any, name: str) -> int:
+    # bool is an int subclass, but "sample_rate": true is not a rate
+    if isinstance(value, (int, float, str)) and not isinstance(value, bool):
+        try:
+            number = float(value)
+        except ValueError:
+            number = None
+        if number is not None and number.is_integer():
+            return int(number)
+    raise ValueError(f"{name} must be a whole number, got {value!r}")
+
+
+class StreamingResampler:
+    """
+    Chunk-boundary-safe downmix + resampler to mono pcm_s16le.
+
+    Keeps the anti-alias filter history, the last input sample and the
+    fractional read position between calls, so feeding a stream in any
+    chunking produces the same output as feeding it in one piece (minus
+    the final partial sample, which flush() emits). Interpolation is
+    linear; when downsampling, a windowed-sinc low-pass runs first.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int = STT_SAMPLE_RATE, channels: int = 1):
+        self.in_rate = int(in_rate)
+        self.out_rate = int(out_rate)
+        if self.in_rate <= 0 or self.out_rate <= 0:
+            raise ValueError(f"Sample rates must be positive, got {self.in_rate} -> {self.out_rate}")
+        self.channels = max(1, int(channels))
+        self.step = self.in_rate / self.out_rate
+
+        self._taps = lowpass_taps(0.9 / self.step) if self.in_rate > self.out_rate else None
+        self._history = np.zeros(len(self._taps) - 1 if self._taps is not None else 0, dtype=np.float32)
+        self._carry = np.zeros(0, dtype=np.float32)
+        self._pos = 0.0
+        self._remainder = b""
+
+    @property
+    def passthrough(self) -> bool:
+        return self.in_rate == self.out_rate and self.channels == 1
+
+    def process(self, chunk: bytes) -> bytes:
+        """Convert one chunk of interleaved int16 input to mono output."""
+        if self.passthrough:
+            return chunk
+
+        data = self._remainder + chunk
+        frame_bytes = BYTES_PER_SAMPLE * self.channels
+        usable = len(data) - (len(data) % frame_bytes)
+        self._remainder = data[usable:]
+        if usable == 0:
+            return b""
+
+        samples = np.frombuffer(data[:usable], dtype="<i2").astype(np.float32)
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1)
+
+        if self.in_rate == self.out_rate:
+            return self._to_pcm16(samples)
+
+        if self._taps is not None:
+            padded = np.concatenate([self._history, samples])
+            self._history = padded[len(padded) - len(self._history):]
+            samples = np.convolve(padded, self._taps, mode="valid")
+
+        return self._to_pcm16(self._interpolate(samples))
+
+    def flush(self) -> bytes:
+        """Emit the held final sample at end of stream."""
+        if self.passthrough or len(self._carry) == 0 or self._pos > 0:
+            return b""
+        tail, self._carry = self._carry, np.zeros(0, dtype=np.float32)
+        self._pos = 0.0
+        return self._to_pcm16(tail)
+
+    def _interpolate(self, samples: np.ndarray) -> np.ndarray:
+        buffer = np.concatenate([self._carry, samples])
+        if len(buffer) == 0:
+            return buffer
+        last = len(buffer) - 1
+
+        # Output positions strictly before the last sample need no lookahead
+        count = max(0, int(np.ceil((last - self._pos) / self.step)))
+        positions = self._pos + self.step * np.arange(count)
+        out = np.interp(positions, np.arange(len(buffer)), buffer)
+
+        self._pos = self._pos + count * self.step - last
+        self._carry = buffer[last:]
+        return out
+
+    @staticmethod
+    def _to_pcm16(samples: np.ndarray) -> bytes:
+        return np.clip(np.round(samples), -32768, 32767).astype("<i2").tobytes()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# STREAMING VAD (realtime socket)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class StreamingVAD:
+    """
+    Gate a realtime PCM stream so silent chunks are not sent upstream.
+
+    Each chunk is classified by its frames. After speech ends, chunks keep
+    flowing for hangover_ms so the upstream model sees the pause it needs
+    to finalize; before speech starts, the last preroll_ms of silence is
+    held back and released with the first voiced chunk so onsets are not
+    clipped.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        hangover_ms: int = VAD_HANGOVER_MS,
+        preroll_ms: int = 200,
+        threshold_db: float = VAD_ENERGY_THRESHOLD_DB
+    ):
+        self.sample_rate = sample_rate
+        self.hangover_samples = sample_rate * hangover_ms // 1000
+        self.preroll_samples = sample_rate * preroll_ms // 1000
+        self.threshold_db = threshold_db
+
+        self._since_speech = self.hangover_samples + 1  # start in the silent state
+        self._preroll: deque = deque()
+        self._preroll_len = 0
+
+        self.bytes_in = 0
+        self.bytes_suppressed = 0
+
+    @property
+    def seconds_suppressed(self) -> float:
+        return self.bytes_suppressed / BYTES_PER_SAMPLE / self.sample_rate
+
+    @property
+    def in_speech(self) -> bool:
+        """True while speech (or its hangover) is being forwarded."""
+        return self._since_speech <= self.hangover_samples
+
+    def process(self, chunk: bytes) -> List[bytes]:
+        """Return the chunks to forward upstream for this input chunk."""
+        self.bytes_in += len(chunk)
+        samples = pcm16_to_array(chunk)
+        is_speech = bool(frame_speech_mask(samples, self.sample_rate, threshold_db=self.threshold_db).any())
+
+        if is_speech:
+            self._since_speech = 0
+            released = list(self._preroll) + [chunk]
+            self._preroll.clear()
+            self._preroll_len = 0
+            return released
+
+        self._since_speech += len(samples)
+        if self.in_speech:
+            return [chunk]
+
+        # Silent: hold as pre-roll, dropping the oldest beyond the window
+        self._preroll.append(chunk)
+        self._preroll_len += len(samples)
+        while self._preroll and self._preroll_len - len(self._preroll[0]) // BYTES_PER_SAMPLE >= self.preroll_samples:
+            dropped = self._preroll.popleft()
+            self._preroll_len -= len(dropped) // BYTES_PER_SAMPLE
+            self.bytes_suppressed += len(dropped)
+        return []
+
+    def finish(self):
+        """Discard any held pre-roll at end of stream (it is silence)."""
+        for dropped in self._preroll:
+            self.bytes_suppressed += len(dropped)
+        self._preroll.clear()
+        self._preroll_len = 0
@@ -0,0 +1,112 @@
+"""
+═══════════════════════════════════════════════════════════════════════════════
+LINGUAVERSE - HTTP Caching for Audio Responses
+Strong ETags, conditional requests and byte ranges for generated audio
+═══════════════════════════════════════════════════════════════════════════════
+"""
+
+import re
+import hashlib
+from typing import Optional, Tuple
+from fastapi import Request
+from fastapi.responses import Response
+
+
+# Content-addressed URLs never change, so browsers may keep them forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Responses to POSTs are not reused by browsers; validators still help proxies/clients
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def make_etag(content: bytes) -> str:
+    """Strong ETag derived from the audio content hash."""
+    return f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison (weak comparison, per RFC 9110)."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def _parse_range(header: str, length: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single "bytes=" range into inclusive (start, end).
+
+    Returns None for unsatisfiable or unsupported (multi-range) requests.
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or length == 0:
+        return None
+
+    start_text, end_text = match.groups()
+    if not start_text and not end_text:
+        return None
+
+    if not start_text:
+        # Suffix range: last N bytes
+        suffix = int(end_text)
+        if suffix == 0:
+            return None
+        return max(0, length - suffix), length - 1
+
+    start = int(start_text)
+    end = int(end_text) if end_text else length - 1
+    if start >= length or end < start:
+        return None
+    return start, min(end, length - 1)
+
+
+def audio_response(
+    request: Request,
+    content: bytes,
+    media_type: str,
+    filename: str,
+    cache_control: str = IMMUTABLE_CACHE_CONTROL,
+    headers: Optional[dict] = None
+) -> Response:
+    """
+    Build an audio response honouring If-None-Match and Range.
+
+    - 304 when the client already holds this exact clip
+    - 206 with Content-Range for a satisfiable single byte range
+    - 416 for an unsatisfiable range
+    - 200 with the full body otherwise
+    """
+    etag = make_etag(content)
+    base_headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f"inline; filename={filename}",
+        **(headers or {})
+    }
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=base_headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == etag):
+        byte_range = _parse_range(range_header, len(content))
+        if byte_range is None:
+            return Response(
+                status_code=416,
+                headers={**base_headers, "Content-Range": f"bytes */{len(content)}"}
+            )
+        start, end = byte_range
+        return Response(
+            content=content[start:end + 1],
+            status_code=206,
+            media_type=media_type,
+            headers={**base_headers, "Content-Range": f"bytes {start}-{end}/{len(content)}"}
+        )
+
+    return Response(content=content, media_type=media_type, headers=base_headers)
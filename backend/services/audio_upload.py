@@ -0,0 +1,201 @@
+"""
+═══════════════════════════════════════════════════════════════════════════════
+LINGUAVERSE - Bounded Audio Uploads
+Size limits, header sniffing and spooled handling for STT uploads
+═══════════════════════════════════════════════════════════════════════════════
+"""
+
+import os
+import json
+import hashlib
+from dataclasses import dataclass
+from typing import Optional, BinaryIO, Iterable
+from fastapi import HTTPException, UploadFile
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+MAX_UPLOAD_BYTES = int(os.getenv("STT_MAX_UPLOAD_MB", "25")) * 1024 * 1024
+
+# Allowance for multipart boundaries and form fields around the file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+READ_CHUNK_BYTES = 64 * 1024
+
+
+@dataclass
+class AudioUpload:
+    """A validated upload, still backed by its spooled file"""
+    file: BinaryIO
+    size: int
+    sha256: str
+    format: str
+    content_type: str
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# FORMAT SNIFFING
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def sniff_audio_format(header: bytes) -> Optional[str]:
+    """Identify an audio container from its first bytes, or None."""
+    if len(header) >= 12 and header[:4] == b"RIFF" and header[8:12] == b"WAVE":
+        return "wav"
+    if header[:4] == b"OggS":
+        return "ogg"
+    if header[:4] == b"fLaC":
+        return "flac"
+    if header[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    if len(header) >= 8 and header[4:8] == b"ftyp":
+        return "mp4"
+    if header[:3] == b"ID3":
+        return "mp3"
+    if len(header) >= 2 and header[0] == 0xFF:
+        if header[1] & 0xF6 == 0xF0:
+            return "aac"
+        if header[1] & 0xE0 == 0xE0:
+            return "mp3"
+    return None
+
+
+CONTENT_TYPES = {
+    "wav": "audio/wav",
+    "ogg": "audio/ogg",
+    "flac": "audio/flac",
+    "webm": "audio/webm",
+    "mp4": "audio/mp4",
+    "mp3": "audio/mpeg",
+    "aac": "audio/aac"
+}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# UPLOAD VALIDATION
+# ═══════════════════════════════════════════════════════════════════════════════
+
+async def read_audio_upload(upload: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> AudioUpload:
+    """
+    Validate an uploaded audio file without loading it into memory.
+
+    Reads the spooled upload in chunks to sniff the header, enforce the
+    size cap and hash the payload, then rewinds it so the same spooled
+    file can be streamed upstream.
+
+    Raises:
+        HTTPException 400 for empty uploads, 413 when too large, 415 when
+        the header is not a recognised audio container.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    audio_format = None
+
+    while True:
+        chunk = await upload.read(READ_CHUNK_BYTES)
+        if not chunk:
+            break
+
+        if size == 0:
+            audio_format = sniff_audio_format(chunk[:16])
+            if audio_format is None:
+                raise HTTPException(status_code=415, detail="Unsupported or non-audio upload")
+
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Audio upload exceeds {max_bytes // (1024 * 1024)} MB limit"
+            )
+        digest.update(chunk)
+
+    if size == 0:
+        raise HTTPException(status_code=400, detail="Empty audio upload")
+
+    await upload.seek(0)
+    return AudioUpload(
+        file=upload.file,
+        size=size,
+        sha256=digest.hexdigest(),
+        format=audio_format,
+        content_type=CONTENT_TYPES[audio_format]
+    )
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# REQUEST BODY LIMIT (ASGI middleware)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject oversize request bodies on selected paths before they are buffered.
+
+    A declared Content-Length over the limit is refused immediately; chunked
+    bodies are counted as they stream in and cut off once they pass it (the
+    app then sees a client disconnect and its own response is discarded).
+    """
+
+    def __init__(self, app, paths: Iterable[str], max_bytes: int = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES):
+        self.app = app
+        self.paths = set(paths)
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            await self._reject(send)
+            return
+
+        received = 0
+        rejected = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes and not response_started:
+                    rejected = True
+                    await self._reject(send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if rejected:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            # The app failing on the simulated disconnect is expected
+            if not rejected:
+                raise
+
+    async def _reject(self, send):
+        body = json.dumps({
+            "error": "Payload too large",
+            "detail": f"Request body exceeds {self.max_bytes} bytes"
+        }).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                (b"connection", b"close")
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -8,19 +8,45 @@ Full SDK usage: TTS, STT, Voice Cloning, Pronunciation, Sound Effects, Music
 import os
 import io
 import json
+import time
 import asyncio
 import base64
-from typing import Optional, List, Dict, Any, Generator, Callable, Awaitable
+import hashlib
+from typing import Optional, List, Dict, Any, Generator, AsyncGenerator, Callable, Awaitable, BinaryIO, Union
 from dataclasses import dataclass
 from enum import Enum
+import httpx
 import websockets
 from elevenlabs.client import ElevenLabs
 from elevenlabs import Voice, VoiceSettings, play, stream, save
 from dotenv import load_dotenv
 
+from services.audio_cache_service import AudioCache, audio_cache
+from services.singleflight import SingleFlight
+from services.audio_formats import get_audio_format
+from services.realtime_protocol import encode_audio_message
+from services.realtime_pool import RealtimeSessionPool
+from services.metrics_service import metrics
+
 load_dotenv()
 
 
+ELEVENLABS_API_BASE = "https://api.elevenlabs.io/v1"
+
+# Realtime STT socket; point at fake_realtime_stt.py for local load tests
+ELEVENLABS_REALTIME_URL = os.getenv(
+    "ELEVENLABS_REALTIME_URL",
+    "wss://api.elevenlabs.io/v1/speech-to-text/realtime?model_id=scribe_v1_experimental"
+)
+
+
+def _ws_connect(url: str, headers: Dict[str, str]):
+    """websockets.connect with headers (renamed to additional_headers in websockets 14)."""
+    if int(websockets.__version__.split(".")[0]) >= 14:
+        return websockets.connect(url, additional_headers=headers)
+    return websockets.connect(url, extra_headers=headers)
+
+
 class VoiceStyle(Enum):
     """Voice expression styles for different moods"""
     WARM = "warm"
@@ -78,6 +104,31 @@ class ElevenLabsService:
         
         self.client = ElevenLabs(api_key=self.api_key)
         
+        # Content-addressed cache for synthesized audio
+        self.audio_cache = audio_cache
+        self.tts_characters_billed = 0
+        self.tts_characters_saved = 0
+        
+        # Shared async HTTP client (created lazily inside the event loop)
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self.max_connections = int(os.getenv("ELEVENLABS_MAX_CONNECTIONS", "64"))
+        
+        # Coalesce identical in-flight upstream calls
+        self.tts_flight = SingleFlight("tts")
+        self.stt_flight = SingleFlight("stt")
+        
+        # Pre-connected realtime STT sessions, leased per client socket
+        self.realtime_pool = RealtimeSessionPool(
+            connect=self.open_realtime_session,
+            size=int(os.getenv("REALTIME_POOL_SIZE", "1")),
+            idle_seconds=float(os.getenv("REALTIME_POOL_IDLE_SECONDS", "60")),
+            pinned=[
+                (None if lang.strip() == "auto" else lang.strip(), 16000)
+                for lang in os.getenv("REALTIME_POOL_LANGUAGES", "").split(",")
+                if lang.strip()
+            ]
+        )
+        
         # Voice configurations for different characters and languages
         self.voice_characters = self._initialize_voice_characters()
         
@@ -227,6 +278,54 @@ class ElevenLabsService:
     # TEXT-TO-SPEECH
     # ═══════════════════════════════════════════════════════════════════════════
     
+    def resolve_tts_request(
+        self,
+        text: str,
+        character_id: str,
+        expression: Optional[str] = None,
+        voice_id: Optional[str] = None,
+        audio_format: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Resolve a TTS call into the exact upstream request parameters.
+        
+        Applies the expression tag and snaps stability/style to the values
+        eleven_v3 accepts, so the result fully determines the audio and can
+        be used as a cache key. voice_id overrides the character's voice
+        while keeping its settings (used for game NPCs). audio_format is a
+        name from services.audio_formats; each format is cached separately.
+        """
+        character = self.voice_characters.get(character_id)
+        if not character:
+            character = self.voice_characters["amelie"]  # Default
+        
+        # Add expression tag if provided
+        if expression and expression in self.expression_tags:
+            text = f"{self.expression_tags[expression]} {text}"
+        
+        # Note: eleven_v3 model requires stability (TTD stability) to be 0.0, 0.5, or 1.0
+        # Map both stability and style to nearest valid values
+        valid_ttd_values = [0.0, 0.5, 1.0]
+        stability_value = min(valid_ttd_values, key=lambda x: abs(x - character.stability))
+        style_value = min(valid_ttd_values, key=lambda x: abs(x - character.style_intensity))
+        
+        return {
+            "text": text,
+            "voice_id": voice_id or character.voice_id,
+            "model_id": "eleven_v3",
+            "output_format": get_audio_format(audio_format).upstream,
+            "voice_settings": {
+                "stability": stability_value,
+                "similarity_boost": character.similarity_boost,
+                "style": style_value,
+                "use_speaker_boost": True
+            }
+        }
+
+    def tts_cache_key(self, resolved: Dict[str, Any]) -> str:
+        """Content-addressed cache key for a resolved TTS request."""
+        return AudioCache.make_key(resolved)
+
     def text_to_speech(
         self,
         text: str,
@@ -237,6 +336,8 @@ class ElevenLabsService:
         """
         Convert text to speech with character voice and expression.
         
+        Repeated requests are served from the audio cache.
+        
         Args:
             text: The text to convert
             character_id: ID of the character (e.g., "amelie", "wolfgang")
@@ -246,38 +347,29 @@ class ElevenLabsService:
         Returns:
             Audio bytes (MP3 format)
         """
-        character = self.voice_characters.get(character_id)
-        if not character:
-            character = self.voice_characters["amelie"]  # Default
+        resolved = self.resolve_tts_request(text, character_id, expression)
+        cache_key = self.tts_cache_key(resolved)
         
-        # Add expression tag if provided
-        if expression and expression in self.expression_tags:
-            text = f"{self.expression_tags[expression]} {text}"
+        cached = self.audio_cache.get(cache_key)
+        if cached is not None:
+            self.tts_characters_saved += len(resolved["text"])
+            return cached
         
         try:
             # Generate audio with ElevenLabs
-            # Note: eleven_v3 model requires stability (TTD stability) to be 0.0, 0.5, or 1.0
-            # Map both stability and style to nearest valid values
-            valid_ttd_values = [0.0, 0.5, 1.0]
-            stability_value = min(valid_ttd_values, key=lambda x: abs(x - character.stability))
-            style_value = min(valid_ttd_values, key=lambda x: abs(x - character.style_intensity))
-            
             audio = self.client.text_to_speech.convert(
-                text=text,
-                voice_id=character.voice_id,
-                model_id="eleven_v3",
-                voice_settings=VoiceSettings(
-                    stability=stability_value,
-                    similarity_boost=character.similarity_boost,
-                    style=style_value,
-                    use_speaker_boost=True
-                )
+                text=resolved["text"],
+                voice_id=resolved["voice_id"],
+                model_id=resolved["model_id"],
+                voice_settings=VoiceSettings(**resolved["voice_settings"]),
+                output_format=resolved["output_format"]
             )
             
             # Collect all chunks into bytes
-            audio_bytes = b""
-            for chunk in audio:
-                audio_bytes += chunk
+            audio_bytes = b"".join(audio)
+            
+            self.tts_characters_billed += len(resolved["text"])
+            self.audio_cache.put(cache_key, audio_bytes)
             
             return audio_bytes
             
@@ -294,38 +386,51 @@ class ElevenLabsService:
         """
         Stream text to speech for real-time playback.
         
-        Yields audio chunks as they're generated.
+        Yields audio chunks as they're generated. A cached clip is yielded
+        in one piece; a fully streamed clip is written to the cache.
         """
-        character = self.voice_characters.get(character_id, self.voice_characters["amelie"])
+        resolved = self.resolve_tts_request(text, character_id, expression)
+        cache_key = self.tts_cache_key(resolved)
         
-        if expression and expression in self.expression_tags:
-            text = f"{self.expression_tags[expression]} {text}"
+        cached = self.audio_cache.get(cache_key)
+        if cached is not None:
+            self.tts_characters_saved += len(resolved["text"])
+            yield cached
+            return
         
         try:
-            # Map stability and style to valid TTD values for eleven_v3
-            valid_ttd_values = [0.0, 0.5, 1.0]
-            stability_value = min(valid_ttd_values, key=lambda x: abs(x - character.stability))
-            style_value = min(valid_ttd_values, key=lambda x: abs(x - character.style_intensity))
-            
             audio_stream = self.client.text_to_speech.convert_as_stream(
-                text=text,
-                voice_id=character.voice_id,
-                model_id="eleven_v3",
-                voice_settings=VoiceSettings(
-                    stability=stability_value,
-                    similarity_boost=character.similarity_boost,
-                    style=style_value,
-                    use_speaker_boost=True
-                )
+                text=resolved["text"],
+                voice_id=resolved["voice_id"],
+                model_id=resolved["model_id"],
+                voice_settings=VoiceSettings(**resolved["voice_settings"]),
+                output_format=resolved["output_format"]
             )
             
+            self.tts_characters_billed += len(resolved["text"])
+            chunks = []
             for chunk in audio_stream:
+                chunks.append(chunk)
                 yield chunk
+            
+            self.audio_cache.put(cache_key, b"".join(chunks))
                 
         except Exception as e:
             print(f"TTS Stream Error: {e}")
             raise
 
+    def get_tts_cache_stats(self) -> Dict[str, Any]:
+        """Audio cache counters, upstream character accounting and coalescing."""
+        return {
+            **self.audio_cache.stats(),
+            "characters_billed": self.tts_characters_billed,
+            "characters_saved": self.tts_characters_saved,
+            "coalescing": {
+                "tts": self.tts_flight.stats(),
+                "stt": self.stt_flight.stats()
+            }
+        }
+
     # ═══════════════════════════════════════════════════════════════════════════
     # SPEECH-TO-TEXT
     # ═══════════════════════════════════════════════════════════════════════════
@@ -388,14 +493,14 @@ class ElevenLabsService:
             sample_rate: Audio sample rate (default 16000 Hz)
         """
         # WebSocket URL with query params
-        ws_url = f"wss://api.elevenlabs.io/v1/speech-to-text/realtime?model_id=scribe_v1_experimental"
+        ws_url = ELEVENLABS_REALTIME_URL
         
         headers = {
             "xi-api-key": self.api_key
         }
         
         try:
-            async with websockets.connect(ws_url, extra_headers=headers) as ws:
+            async with _ws_connect(ws_url, headers) as ws:
                 # Send initial configuration
                 config = {
                     "type": "config",
@@ -463,6 +568,33 @@ class ElevenLabsService:
             sample_rate=sample_rate
         )
 
+    async def open_realtime_session(
+        self,
+        language_hint: Optional[str] = None,
+        sample_rate: int = 16000
+    ) -> Optional["RealtimeTranscriptionSession"]:
+        """Create and connect a realtime session; None if the connect fails."""
+        session = await self.create_realtime_transcription_session(
+            language_hint=language_hint,
+            sample_rate=sample_rate
+        )
+        if await session.connect():
+            return session
+        await session.close()
+        return None
+
+    async def lease_realtime_session(
+        self,
+        language_hint: Optional[str] = None,
+        sample_rate: int = 16000
+    ) -> Optional["RealtimeTranscriptionSession"]:
+        """
+        Take a connected realtime session, pre-warmed when the pool has one.
+
+        The caller owns the session and must close() it when done.
+        """
+        return await self.realtime_pool.acquire(language_hint, sample_rate)
+
     # ═══════════════════════════════════════════════════════════════════════════
     # PRONUNCIATION ASSESSMENT
     # ═══════════════════════════════════════════════════════════════════════════
@@ -732,6 +864,226 @@ class ElevenLabsService:
         
         return "warm"
 
+    # ═══════════════════════════════════════════════════════════════════════════
+    # ASYNC REST API (non-blocking, shared connection pool)
+    # ═══════════════════════════════════════════════════════════════════════════
+    
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Return the shared async HTTP client, creating it on first use."""
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(
+                base_url=ELEVENLABS_API_BASE,
+                headers={"xi-api-key": self.api_key},
+                timeout=httpx.Timeout(60.0, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+        return self._http_client
+
+    async def aclose(self):
+        """Close the shared async HTTP client and pooled realtime sessions."""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+        await self.realtime_pool.close()
+
+    @staticmethod
+    async def _raise_for_status(response: httpx.Response):
+        """Raise with the upstream error body attached."""
+        if response.is_success:
+            return
+        body = await response.aread()
+        raise RuntimeError(
+            f"ElevenLabs API error {response.status_code}: {body.decode('utf-8', errors='replace')[:500]}"
+        )
+
+    async def text_to_speech_async(
+        self,
+        text: str,
+        character_id: str,
+        expression: Optional[str] = None,
+        voice_id: Optional[str] = None,
+        audio_format: Optional[str] = None
+    ) -> bytes:
+        """
+        Non-blocking variant of text_to_speech.
+        
+        Shares the audio cache with the sync path.
+        """
+        resolved = self.resolve_tts_request(text, character_id, expression, voice_id, audio_format)
+        cache_key = self.tts_cache_key(resolved)
+        
+        cached = self.audio_cache.get(cache_key)
+        if cached is not None:
+            self.tts_characters_saved += len(resolved["text"])
+            return cached
+        
+        # Identical concurrent requests share one upstream synthesis
+        return await self.tts_flight.do(
+            cache_key,
+            lambda: self._synthesize_async(resolved, cache_key)
+        )
+
+    async def _synthesize_async(self, resolved: Dict[str, Any], cache_key: str) -> bytes:
+        """Run one upstream TTS call and cache the result."""
+        try:
+            response = await self._get_http_client().post(
+                f"/text-to-speech/{resolved['voice_id']}",
+                params={"output_format": resolved["output_format"]},
+                json={
+                    "text": resolved["text"],
+                    "model_id": resolved["model_id"],
+                    "voice_settings": resolved["voice_settings"]
+                }
+            )
+            await self._raise_for_status(response)
+            audio_bytes = response.content
+            
+            self.tts_characters_billed += len(resolved["text"])
+            self.audio_cache.put(cache_key, audio_bytes)
+            
+            return audio_bytes
+            
+        except Exception as e:
+            print(f"TTS Error: {e}")
+            raise
+
+    async def text_to_speech_stream_async(
+        self,
+        text: str,
+        character_id: str,
+        expression: Optional[str] = None,
+        audio_format: Optional[str] = None,
+        voice_id: Optional[str] = None
+    ) -> AsyncGenerator[bytes, None]:
+        """
+        Non-blocking variant of text_to_speech_stream.
+        
+        Yields upstream chunks as they arrive; a fully streamed clip is
+        written to the cache. voice_id overrides the character's voice
+        (game NPCs).
+        """
+        resolved = self.resolve_tts_request(text, character_id, expression, voice_id, audio_format)
+        cache_key = self.tts_cache_key(resolved)
+        
+        cached = self.audio_cache.get(cache_key)
+        if cached is not None:
+            self.tts_characters_saved += len(resolved["text"])
+            yield cached
+            return
+        
+        # Join a full synthesis already in flight rather than starting another
+        pending = self.tts_flight.pending(cache_key)
+        if pending is not None:
+            self.tts_flight.coalesced += 1
+            yield await asyncio.shield(pending)
+            return
+        
+        try:
+            async with self._get_http_client().stream(
+                "POST",
+                f"/text-to-speech/{resolved['voice_id']}/stream",
+                params={"output_format": resolved["output_format"]},
+                json={
+                    "text": resolved["text"],
+                    "model_id": resolved["model_id"],
+                    "voice_settings": resolved["voice_settings"]
+                }
+            ) as response:
+                await self._raise_for_status(response)
+                
+                self.tts_characters_billed += len(resolved["text"])
+                chunks = []
+                async for chunk in response.aiter_bytes():
+                    chunks.append(chunk)
+                    yield chunk
+            
+            self.audio_cache.put(cache_key, b"".join(chunks))
+            
+        except Exception as e:
+            print(f"TTS Stream Error: {e}")
+            raise
+
+    async def speech_to_text_async(
+        self,
+        audio_content: Union[bytes, BinaryIO],
+        language_hint: Optional[str] = None,
+        content_hash: Optional[str] = None,
+        content_type: str = "application/octet-stream"
+    ) -> Dict[str, Any]:
+        """
+        Non-blocking variant of speech_to_text.
+        
+        audio_content may be bytes or a file object (e.g. a spooled
+        upload), which is streamed upstream in chunks rather than copied
+        into memory; pass content_hash for file objects so identical
+        concurrent payloads still share one upstream transcription.
+        Returns the same dict shape, including "error" on failure.
+        """
+        if content_hash is None:
+            if not isinstance(audio_content, (bytes, bytearray)):
+                return await self._transcribe_async(audio_content, language_hint, content_type)
+            content_hash = hashlib.sha256(audio_content).hexdigest()
+        
+        flight_key = f"{content_hash}:{language_hint or ''}"
+        result = await self.stt_flight.do(
+            flight_key,
+            lambda: self._transcribe_async(audio_content, language_hint, content_type)
+        )
+        return dict(result)
+
+    async def _transcribe_async(
+        self,
+        audio_content: Union[bytes, BinaryIO],
+        language_hint: Optional[str] = None,
+        content_type: str = "application/octet-stream"
+    ) -> Dict[str, Any]:
+        """Run one upstream STT call."""
+        try:
+            response = await self._get_http_client().post(
+                "/speech-to-text",
+                data={"model_id": "scribe_v1"},
+                files={"file": ("audio", audio_content, content_type)}
+            )
+            await self._raise_for_status(response)
+            result = response.json()
+            
+            return {
+                "text": result.get("text", ""),
+                "language_detected": result.get("language_code", language_hint),
+                "confidence": result.get("confidence", 1.0)
+            }
+            
+        except Exception as e:
+            print(f"STT Error: {e}")
+            return {
+                "text": "",
+                "error": str(e)
+            }
+
+    async def generate_sound_effect_async(
+        self,
+        description: str,
+        duration_seconds: float = 2.0
+    ) -> bytes:
+        """Non-blocking variant of generate_sound_effect."""
+        try:
+            response = await self._get_http_client().post(
+                "/sound-generation",
+                json={
+                    "text": description,
+                    "duration_seconds": duration_seconds
+                }
+            )
+            await self._raise_for_status(response)
+            return response.content
+            
+        except Exception as e:
+            print(f"Sound Effect Error: {e}")
+            return b""
+
     # ═══════════════════════════════════════════════════════════════════════════
     # UTILITY METHODS
     # ═══════════════════════════════════════════════════════════════════════════
@@ -769,11 +1121,7 @@ class ElevenLabsService:
         expression: Optional[str] = None
     ) -> bytes:
         """Async wrapper for TTS generation."""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            None,
-            lambda: self.text_to_speech(text, character_id, expression)
-        )
+        return await self.text_to_speech_async(text, character_id, expression)
 
 
 class RealtimeTranscriptionSession:
@@ -795,14 +1143,21 @@ class RealtimeTranscriptionSession:
         self.ws = None
         self.is_connected = False
         self._receive_task = None
+        self.connect_seconds: Optional[float] = None
+        
+    @property
+    def is_open(self) -> bool:
+        """True while the upstream socket is connected and not closed."""
+        return self.is_connected and self.ws is not None and getattr(self.ws, "close_code", None) is None
         
     async def connect(self) -> bool:
         """Establish WebSocket connection to ElevenLabs."""
         try:
-            ws_url = "wss://api.elevenlabs.io/v1/speech-to-text/realtime?model_id=scribe_v1_experimental"
+            ws_url = ELEVENLABS_REALTIME_URL
             headers = {"xi-api-key": self.api_key}
             
-            self.ws = await websockets.connect(ws_url, extra_headers=headers)
+            started = time.monotonic()
+            self.ws = await _ws_connect(ws_url, headers)
             self.is_connected = True
             
             # Send configuration
@@ -816,25 +1171,25 @@ class RealtimeTranscriptionSession:
             }
             await self.ws.send(json.dumps(config))
             
+            self.connect_seconds = time.monotonic() - started
+            metrics.observe("realtime.upstream_connect_ms", self.connect_seconds * 1000)
             return True
         except Exception as e:
             print(f"Connect error: {e}")
             self.is_connected = False
             return False
     
-    async def send_audio(self, audio_chunk: bytes):
-        """Send an audio chunk to the transcription service."""
+    async def send_audio(self, audio_chunk: bytes) -> bool:
+        """Send an audio chunk to the transcription service; False if it was not sent."""
         if not self.is_connected or not self.ws:
-            return
+            return False
         
         try:
-            message = {
-                "type": "audio",
-                "audio": base64.b64encode(audio_chunk).decode('utf-8')
-            }
-            await self.ws.send(json.dumps(message))
+            await self.ws.send(encode_audio_message(audio_chunk))
+            return True
         except Exception as e:
             print(f"Send audio error: {e}")
+            return False
     
     async def receive_transcript(self) -> Optional[Dict[str, Any]]:
         """Receive the next transcript message."""
@@ -0,0 +1,129 @@
+"""
+═══════════════════════════════════════════════════════════════════════════════
+LINGUAVERSE - Pre-rendered NPC Greetings
+Warm-up stage that renders every NPC greeting into a local audio store
+═══════════════════════════════════════════════════════════════════════════════
+"""
+
+import os
+import asyncio
+from typing import Optional, Dict, Any, Tuple
+from dotenv import load_dotenv
+
+from services.audio_cache_service import AudioCache, audio_cache
+from services.audio_formats import AudioFormat, format_for_upstream
+from services.elevenlabs_service import elevenlabs_service
+from services.npc_service import npc_service
+
+load_dotenv()
+
+
+DEFAULT_GREETING_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".greeting_audio")
+
+# Voice settings profile used for the Polish village NPCs
+NPC_VOICE_CHARACTER = "kasia"
+
+
+class GreetingService:
+    """
+    Pre-renders NPC greeting audio so walking up to an NPC never waits on TTS.
+
+    Every NPC greeting is resolved into a TTS request and stored under its
+    content hash. /api/conversation/start returns a URL
+    for that hash, which is served straight from the local store.
+    """
+
+    def __init__(self, store: AudioCache):
+        self.store = store
+
+        # clip_id -> resolved TTS request, for every greeting we can serve
+        self.clips: Dict[str, Dict[str, Any]] = {}
+        for npc_id in npc_service.static_greetings:
+            self.get_greeting(npc_id)
+
+    def get_greeting(self, npc_id: str) -> Tuple[str, Optional[str]]:
+        """
+        Return the greeting text and its clip id for an NPC.
+
+        The clip id is None for unknown NPCs, which have no voice.
+        """
+        text = npc_service.get_initial_greeting(npc_id)
+        if npc_id not in npc_service.voice_ids:
+            return text, None
+
+        resolved = elevenlabs_service.resolve_tts_request(
+            text,
+            NPC_VOICE_CHARACTER,
+            voice_id=npc_service.get_voice_id(npc_id)
+        )
+        clip_id = elevenlabs_service.tts_cache_key(resolved)
+        self.clips[clip_id] = resolved
+        return text, clip_id
+
+    @staticmethod
+    def audio_url(clip_id: str, extension: str = "mp3") -> str:
+        """Content-addressed URL for a greeting clip."""
+        return f"/api/conversation/audio/{clip_id}.{extension}"
+
+    def clip_format(self, clip_id: str) -> Optional[AudioFormat]:
+        """Format a known clip is rendered in, or None for unknown ids."""
+        resolved = self.clips.get(clip_id)
+        return format_for_upstream(resolved["output_format"]) if resolved else None
+
+    def get_audio(self, clip_id: str) -> Optional[bytes]:
+        """Look up a known clip in the greeting store, then the shared TTS cache."""
+        if clip_id not in self.clips:
+            return None
+        audio = self.store.get(clip_id)
+        if audio is None:
+            audio = audio_cache.get(clip_id)
+        return audio
+
+    async def render(self, clip_id: str) -> Optional[bytes]:
+        """Synthesize a known greeting clip and keep it in the store."""
+        resolved = self.clips.get(clip_id)
+        if resolved is None:
+            return None
+
+        audio = await elevenlabs_service.text_to_speech_async(
+            text=resolved["text"],
+            character_id=NPC_VOICE_CHARACTER,
+            voice_id=resolved["voice_id"]
+        )
+        self.store.put(clip_id, audio)
+        return audio
+
+    async def prerender(self, concurrency: int = 4) -> Dict[str, int]:
+        """Render every greeting that is not already in the store."""
+        pending = [clip_id for clip_id in self.clips if not self.store.contains(clip_id)]
+        semaphore = asyncio.Semaphore(concurrency)
+        failed = 0
+
+        async def render_one(clip_id: str):
+            nonlocal failed
+            async with semaphore:
+                try:
+                    await self.render(clip_id)
+                except Exception as e:
+                    failed += 1
+                    print(f"Greeting pre-render error ({self.clips[clip_id]['text'][:30]}): {e}")
+
+        await asyncio.gather(*(render_one(clip_id) for clip_id in pending))
+
+        summary = {
+            "total": len(self.clips),
+            "rendered": len(pending) - failed,
+            "already_stored": len(self.clips) - len(pending),
+            "failed": failed
+        }
+        print(f"🔊 Greeting audio ready: {summary}")
+        return summary
+
+
+# Singleton instance
+greeting_service = GreetingService(
+    store=AudioCache(
+        cache_dir=os.getenv("GREETING_AUDIO_DIR", DEFAULT_GREETING_DIR),
+        max_memory_items=64
+    )
+)
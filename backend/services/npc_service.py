@@ -1,12 +1,86 @@
 import os
-from anthropic import Anthropic
+import re
+import asyncio
+from types import MappingProxyType
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple, Union
+from anthropic import Anthropic, AsyncAnthropic
 from dotenv import load_dotenv
 
+from services.metrics_service import metrics
+from services.reply_cache import ReplyCache
+from services.reply_index import NearDuplicateIndex
+from services.singleflight import SingleFlight
+
 load_dotenv()
 
+NPC_MODEL = "claude-3-haiku-20240307"
+NPC_MAX_TOKENS = 150
+
+QUEST_STEPS = range(1, 6)
+DIFFICULTY_LEVELS = range(1, 6)
+
+# Marks the system prompt for upstream prompt caching. On Haiku this is a
+# no-op today: prefixes under 2048 tokens are never cached, and our system
+# prompts are ~400 tokens. The marker only pays off if prompts grow past
+# the minimum; llm.cache_read_input_tokens in /api/metrics shows whether
+# they did.
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# "'kot' (cat)", "Cześć! (Hello!)": up to three words right before a gloss
+GLOSS_PATTERN = re.compile(r"""(['"]?)([^\W\d_][\w'-]*(?:[ ][^\W\d_][\w'-]*){0,2})\1[!?.,]?\s*\(([^()]+)\)""")
+PAREN_PATTERN = re.compile(r"\s*\([^()]*\)")
+SENTENCE_PATTERN = re.compile(r"[^.!?\n]+[.!?]*")
+CORRECTION_CUES = (
+    "we say", "you should say", "you can say", "the correct", "correct form",
+    "instead of", "poprawnie", "mówimy", "mówi się"
+)
+
+
+def parse_reply(text: str) -> Dict[str, Any]:
+    """
+    Pull the teaching fields out of a finished NPC reply.
+
+    NPCs gloss Polish inline ("Cześć! (Hello!)"): the glosses joined form
+    the translation and each glossed phrase becomes a vocabulary item. A
+    sentence with a correction cue ("we say ...", "instead of ...") is
+    returned as the correction.
+    """
+    vocabulary = []
+    glosses = []
+    for match in GLOSS_PATTERN.finditer(text):
+        word, gloss = match.group(2).strip(), match.group(3).strip()
+        glosses.append(gloss)
+        if word.lower() != gloss.strip("!?.,").lower():
+            vocabulary.append({"word": word, "translation": gloss.strip("!?.,")})
+
+    correction = None
+    for sentence in SENTENCE_PATTERN.findall(PAREN_PATTERN.sub("", text)):
+        if any(cue in sentence.lower() for cue in CORRECTION_CUES):
+            correction = sentence.strip()
+            break
+
+    return {
+        "translation": "; ".join(glosses) or None,
+        "correction": correction,
+        "vocabulary": vocabulary
+    }
+
+
+class ReplyAborted(Exception):
+    """The streaming turn that led a shared reply ended before the reply did."""
+
+
 class NPCService:
     def __init__(self):
         self.client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+        # Shared by every request so connections are pooled across turns
+        self.async_client = AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+        
+        # Opt-in (REPLY_CACHE_NPCS) exact-match cache for repeated openers
+        self.reply_cache = ReplyCache()
+        self.reply_flight = SingleFlight("reply")
+        # Same NPCs: near-duplicate inputs ("A gdzie jest kot?") reuse a recent reply
+        self.reply_index = NearDuplicateIndex()
         
         # Base instructions for all NPCs
         self.base_instruction = (
@@ -70,6 +144,9 @@ class NPCService:
             "bird": "MF3mGyEYCl7XYWlgT9FX"  # Callum
         }
 
+        # (npc_id or None, quest step, difficulty) -> system prompt
+        self.system_prompts = self._compile_system_prompts()
+
     def get_difficulty_instruction(self, level: int) -> str:
         levels = {
             1: "Speak mostly in English, but introduce key Polish words (e.g., 'kot', 'tak'). Translate them immediately.",
@@ -134,36 +211,251 @@ class NPCService:
     def get_initial_greeting(self, npc_id: str) -> str:
         return self.static_greetings.get(npc_id, "...")
 
-    def get_response(self, npc_id: str, player_text: str, conversation_history: list, quest_state: int = 1, difficulty_level: int = 1):
+    def _compose_system_prompt(self, npc_id: Optional[str], quest_state: int, difficulty_level: int) -> str:
         persona = self.personas.get(npc_id, "You are a helpful villager.")
         difficulty_instruction = self.get_difficulty_instruction(difficulty_level)
         quest_instruction = self.get_quest_instruction(npc_id, quest_state)
         
-        system_prompt = (
+        return (
             f"{self.base_instruction}\n\n"
             f"Character Profile:\n{persona}\n\n"
             f"Current Situation:\n{quest_instruction}\n\n"
             f"Language Level (Difficulty {difficulty_level}):\n{difficulty_instruction}"
         )
-        
+
+    def _compile_system_prompts(self) -> MappingProxyType:
+        """
+        Build every system prompt the game can ask for, once.
+
+        Unknown NPCs share the None entries (default persona, no quest
+        instruction). The table is read-only so the text sent upstream
+        stays byte-identical across turns.
+        """
+        table = {}
+        for npc_id in [*self.personas, None]:
+            for quest_state in QUEST_STEPS:
+                for difficulty_level in DIFFICULTY_LEVELS:
+                    table[(npc_id, quest_state, difficulty_level)] = self._compose_system_prompt(
+                        npc_id, quest_state, difficulty_level
+                    )
+        return MappingProxyType(table)
+
+    def build_system_prompt(self, npc_id: str, quest_state: int = 1, difficulty_level: int = 1) -> str:
+        key = (npc_id if npc_id in self.personas else None, quest_state, difficulty_level)
+        prompt = self.system_prompts.get(key)
+        if prompt is None:
+            # Quest step or difficulty outside the precompiled range
+            metrics.inc("llm.system_prompt_misses")
+            prompt = self._compose_system_prompt(*key)
+        return prompt
+
+    def build_system(self, npc_id: str, quest_state: int = 1, difficulty_level: int = 1) -> List[Dict[str, Any]]:
+        """System prompt as a text block marked for caching (see CACHE_CONTROL)."""
+        return [{
+            "type": "text",
+            "text": self.build_system_prompt(npc_id, quest_state, difficulty_level),
+            "cache_control": CACHE_CONTROL
+        }]
+
+    @staticmethod
+    def build_messages(player_text: str, conversation_history: list) -> List[Dict[str, Any]]:
+        """
+        Conversation so far plus the new player turn.
+
+        No cache breakpoint here: callers send a sliding window of history
+        (the conversation router keeps the last 10 messages), so the prefix
+        shifts every turn and would never be read back.
+        """
         # Construct messages for Claude
         messages = []
         for msg in conversation_history:
             messages.append({"role": msg["role"], "content": msg["content"]})
         
         # Add current user message
-        messages.append({"role": "user", "content": player_text})
+        messages.append({
+            "role": "user",
+            "content": player_text
+        })
+        return messages
+
+    @staticmethod
+    def record_usage(usage):
+        """Add a response's token usage (including cache hits) to /api/metrics."""
+        if usage is None:
+            return
+        cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+        cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+        uncached = usage.input_tokens or 0
+        metrics.inc("llm.input_tokens", uncached)
+        metrics.inc("llm.cache_read_input_tokens", cache_read)
+        metrics.inc("llm.cache_creation_input_tokens", cache_write)
+        metrics.inc("llm.output_tokens", usage.output_tokens or 0)
+        total = uncached + cache_read + cache_write
+        if total:
+            metrics.observe("llm.cache_read_ratio", cache_read / total)
+
+    def get_response(self, npc_id: str, player_text: str, conversation_history: list, quest_state: int = 1, difficulty_level: int = 1):
+        system = self.build_system(npc_id, quest_state, difficulty_level)
+        messages = self.build_messages(player_text, conversation_history)
 
         try:
             response = self.client.messages.create(
-                model="claude-3-haiku-20240307",
-                max_tokens=150,
-                system=system_prompt,
+                model=NPC_MODEL,
+                max_tokens=NPC_MAX_TOKENS,
+                system=system,
                 messages=messages
             )
+            self.record_usage(response.usage)
             return response.content[0].text
         except Exception as e:
             print(f"Error calling Anthropic API: {e}")
             return f"[{npc_id} nods silently (API Error)]"
 
+    # ═══════════════════════════════════════════════════════════════════════════
+    # ASYNC (conversation router)
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    @staticmethod
+    def _quest_step(quest_state: Union[int, Dict[str, Any], None]) -> int:
+        if isinstance(quest_state, dict):
+            return quest_state.get("step") or 1
+        return quest_state or 1
+
+    def _reply_cache_keys(
+        self,
+        npc_name: str,
+        player_input: str,
+        quest_step: int,
+        difficulty: int,
+        conversation_history: list
+    ) -> Optional[Tuple[str, str]]:
+        """(context key, exact key), or None if the NPC's replies are not cached."""
+        if not self.reply_cache.enabled_for(npc_name):
+            return None
+        return (
+            self.reply_cache.context_key(npc_name, quest_step, difficulty, conversation_history, NPC_MODEL),
+            self.reply_cache.make_key(npc_name, player_input, quest_step, difficulty, conversation_history, NPC_MODEL)
+        )
+
+    def _cached_reply(self, npc_name: str, player_input: str, keys: Tuple[str, str]) -> Optional[str]:
+        context, key = keys
+        text = self.reply_cache.get(key)
+        if text is None and self.reply_index.enabled_for(npc_name):
+            text = self.reply_index.lookup(context, player_input)
+            if text is not None and parse_reply(text)["correction"]:
+                text = None  # corrected someone else's wording
+        return text
+
+    def _store_reply(self, npc_name: str, player_input: str, keys: Tuple[str, str], text: str):
+        context, key = keys
+        self.reply_cache.put(key, text)
+        # A reply that corrects this input is wrong for any other wording
+        if self.reply_index.enabled_for(npc_name) and not parse_reply(text)["correction"]:
+            self.reply_index.add(context, player_input, text)
+
+    async def get_npc_response(
+        self,
+        player_input: str,
+        npc_name: str,
+        conversation_history: list,
+        quest_state: Union[int, Dict[str, Any], None] = None,
+        difficulty: int = 1
+    ) -> Dict[str, Any]:
+        """
+        Whole reply plus its teaching fields; raises on API errors.
+
+        For NPCs with the reply cache on, a repeated turn is answered from
+        the cache (or a recent near-duplicate input's reply, see
+        NearDuplicateIndex) and identical turns in flight share one
+        upstream call.
+        """
+        quest_step = self._quest_step(quest_state)
+        keys = self._reply_cache_keys(npc_name, player_input, quest_step, difficulty, conversation_history)
+
+        async def create() -> str:
+            response = await self.async_client.messages.create(
+                model=NPC_MODEL,
+                max_tokens=NPC_MAX_TOKENS,
+                system=self.build_system(npc_name, quest_step, difficulty),
+                messages=self.build_messages(player_input, conversation_history)
+            )
+            self.record_usage(response.usage)
+            text = response.content[0].text
+            if keys is not None:
+                self._store_reply(npc_name, player_input, keys, text)
+            return text
+
+        if keys is None:
+            text = await create()
+        else:
+            text = self._cached_reply(npc_name, player_input, keys)
+            if text is None:
+                try:
+                    text = await self.reply_flight.do(keys[1], create)
+                except ReplyAborted:
+                    # Joined a streamed turn whose client went away
+                    text = await create()
+        return {"response": text, **parse_reply(text)}
+
+    async def stream_npc_response(
+        self,
+        player_input: str,
+        npc_name: str,
+        conversation_history: list,
+        quest_state: Union[int, Dict[str, Any], None] = None,
+        difficulty: int = 1
+    ) -> AsyncIterator[str]:
+        """
+        Yield reply text as Claude generates it.
+
+        The caller joins the pieces and runs parse_reply() on the result;
+        closing the iterator early aborts the upstream request. A cached
+        reply (see get_npc_response) arrives as a single piece, and so does
+        the reply of an identical turn already in flight: a streamed turn
+        leads the reply flight too, so concurrent callers share its call.
+        """
+        quest_step = self._quest_step(quest_state)
+        keys = self._reply_cache_keys(npc_name, player_input, quest_step, difficulty, conversation_history)
+        if keys is not None:
+            cached = self._cached_reply(npc_name, player_input, keys)
+            pending = self.reply_flight.pending(keys[1]) if cached is None else None
+            if pending is not None:
+                self.reply_flight.coalesced += 1
+                try:
+                    cached = await asyncio.shield(pending)
+                except Exception:
+                    cached = None
+            if cached is not None:
+                yield cached
+                return
+
+        flight = self.reply_flight.lead(keys[1]) if keys is not None else None
+        parts = []
+        try:
+            async with self.async_client.messages.stream(
+                model=NPC_MODEL,
+                max_tokens=NPC_MAX_TOKENS,
+                system=self.build_system(npc_name, quest_step, difficulty),
+                messages=self.build_messages(player_input, conversation_history)
+            ) as stream:
+                async for text in stream.text_stream:
+                    parts.append(text)
+                    yield text
+                self.record_usage((await stream.get_final_message()).usage)
+        except BaseException as e:
+            # Waiters see upstream errors as they are; an abandoned stream
+            # (closed iterator, cancelled task) lets them ask on their own
+            if flight is not None:
+                flight.set_exception(e if isinstance(e, Exception) else ReplyAborted())
+            raise
+
+        text = "".join(parts)
+        if flight is not None:
+            flight.set_result(text)
+        if keys is not None:
+            self._store_reply(npc_name, player_input, keys, text)
+
+    async def aclose(self):
+        await self.async_client.close()
+
 npc_service = NPCService()
@@ -0,0 +1,294 @@
+"""
+═══════════════════════════════════════════════════════════════════════════════
+LINGUAVERSE - Realtime STT Admission Control
+Per-worker and global session caps, a short wait queue, idle reclamation
+═══════════════════════════════════════════════════════════════════════════════
+"""
+
+import os
+import time
+import random
+import asyncio
+import tempfile
+from typing import Optional, Dict, Any, List, Callable, Awaitable
+from dotenv import load_dotenv
+
+from services.metrics_service import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-worker cap
+    fcntl = None
+
+load_dotenv()
+
+
+REALTIME_MAX_SESSIONS = int(os.getenv("REALTIME_MAX_SESSIONS", "50"))  # per worker
+REALTIME_MAX_SESSIONS_GLOBAL = int(os.getenv("REALTIME_MAX_SESSIONS_GLOBAL", "0"))  # 0 = no global cap
+REALTIME_SLOT_DIR = os.getenv("REALTIME_SLOT_DIR", os.path.join(tempfile.gettempdir(), "linguaverse-realtime-slots"))
+REALTIME_QUEUE_MAX = int(os.getenv("REALTIME_QUEUE_MAX", "10"))
+REALTIME_QUEUE_TIMEOUT_SECONDS = float(os.getenv("REALTIME_QUEUE_TIMEOUT_SECONDS", "15"))
+REALTIME_RETRY_AFTER_SECONDS = int(os.getenv("REALTIME_RETRY_AFTER_SECONDS", "10"))
+
+# Reclamation: no frames at all (dead client) / no speech (open mic on silence)
+REALTIME_HEARTBEAT_TIMEOUT_SECONDS = float(os.getenv("REALTIME_HEARTBEAT_TIMEOUT_SECONDS", "20"))
+REALTIME_IDLE_TIMEOUT_SECONDS = float(os.getenv("REALTIME_IDLE_TIMEOUT_SECONDS", "60"))
+# While clients are queued, a session silent this long gives up its slot
+REALTIME_PREEMPT_SILENCE_SECONDS = float(os.getenv("REALTIME_PREEMPT_SILENCE_SECONDS", "10"))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# GLOBAL SLOTS (shared by every worker on the host)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class GlobalSlots:
+    """
+    A fixed set of lock files; holding an exclusive flock on one is a slot.
+
+    The kernel drops the lock when the descriptor is closed, including
+    when a worker crashes, so slots can never leak.
+    """
+
+    def __init__(self, limit: int, directory: str = REALTIME_SLOT_DIR):
+        self.limit = limit if fcntl is not None else 0
+        self.directory = directory
+        if limit and fcntl is None:
+            print("⚠️  REALTIME_MAX_SESSIONS_GLOBAL needs fcntl; only the per-worker cap applies")
+        if self.limit:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit > 0
+
+    def try_acquire(self) -> Optional[int]:
+        """Return a locked descriptor, or None when every slot is taken."""
+        start = random.randrange(self.limit)
+        for i in range(self.limit):
+            path = os.path.join(self.directory, f"slot-{(start + i) % self.limit}.lock")
+            fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except OSError:
+                os.close(fd)
+        return None
+
+    @staticmethod
+    def release(fd: int):
+        os.close(fd)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# TICKETS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class AdmissionTicket:
+    """One admitted session; the relay reports activity on it."""
+
+    def __init__(self, slot_fd: Optional[int] = None):
+        now = time.monotonic()
+        self.admitted_at = now
+        self.last_seen = now
+        self.last_speech = now
+        self.slot_fd = slot_fd
+        self.reason: Optional[str] = None
+        self._reclaimed = asyncio.Event()
+
+    def touch(self):
+        """Any frame from the client (audio, ping, config)."""
+        self.last_seen = time.monotonic()
+
+    def spoke(self):
+        """Voiced audio went upstream."""
+        self.last_speech = self.last_seen = time.monotonic()
+
+    @property
+    def is_reclaimed(self) -> bool:
+        return self._reclaimed.is_set()
+
+    def reclaim(self, reason: str):
+        if not self._reclaimed.is_set():
+            self.reason = reason
+            self._reclaimed.set()
+
+    async def wait_reclaimed(self) -> str:
+        await self._reclaimed.wait()
+        return self.reason
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ADMISSION
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class RealtimeAdmission:
+    """
+    Decides whether a new realtime socket gets a session now, waits, or is
+    told to come back later.
+
+    A session needs a local slot (max_sessions per worker) and, when a
+    global cap is configured, a cross-worker lock-file slot. When both are
+    not free the client joins a FIFO queue of at most queue_max and is
+    sent {"type": "queued", "position": n} whenever its place changes;
+    only the head of the queue tries to admit, so arrivals never jump it.
+    A full queue or a wait past queue_timeout returns None and the caller
+    answers busy with retry_after.
+
+    A background reaper reclaims sessions whose client stopped sending
+    frames (heartbeat_timeout) or has not spoken for idle_timeout. While
+    clients are waiting, the session silent the longest (at least
+    preempt_silence) is reclaimed too, so capacity goes to people talking.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = REALTIME_MAX_SESSIONS,
+        global_slots: Optional[GlobalSlots] = None,
+        queue_max: int = REALTIME_QUEUE_MAX,
+        queue_timeout: float = REALTIME_QUEUE_TIMEOUT_SECONDS,
+        retry_after: int = REALTIME_RETRY_AFTER_SECONDS,
+        heartbeat_timeout: float = REALTIME_HEARTBEAT_TIMEOUT_SECONDS,
+        idle_timeout: float = REALTIME_IDLE_TIMEOUT_SECONDS,
+        preempt_silence: float = REALTIME_PREEMPT_SILENCE_SECONDS,
+        poll_interval: float = 0.25
+    ):
+        self.max_sessions = max_sessions
+        self.global_slots = global_slots or GlobalSlots(0)
+        self.queue_max = queue_max
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.heartbeat_timeout = heartbeat_timeout
+        self.idle_timeout = idle_timeout
+        self.preempt_silence = preempt_silence
+        self.poll_interval = poll_interval
+
+        self.active: List[AdmissionTicket] = []
+        self._waiters: List[object] = []
+        self._reaper: Optional[asyncio.Task] = None
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # ADMIT / RELEASE
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    async def admit(self, notify: Callable[[Dict[str, Any]], Awaitable[None]]) -> Optional[AdmissionTicket]:
+        """Admit now, after queueing, or return None (busy)."""
+        if not self._waiters:
+            ticket = self._try_admit()
+            if ticket is not None:
+                return ticket
+
+        if len(self._waiters) >= self.queue_max:
+            metrics.inc("realtime.admission_rejected")
+            return None
+
+        waiter = object()
+        self._waiters.append(waiter)
+        metrics.inc("realtime.admission_queued")
+        started = time.monotonic()
+        last_position = None
+        try:
+            while time.monotonic() - started < self.queue_timeout:
+                position = self._waiters.index(waiter) + 1
+                if position != last_position:
+                    await notify({"type": "queued", "position": position, "queue_length": len(self._waiters)})
+                    last_position = position
+
+                if position == 1:
+                    ticket = self._try_admit()
+                    if ticket is not None:
+                        metrics.observe("realtime.admission_wait_ms", (time.monotonic() - started) * 1000)
+                        return ticket
+                    self._preempt_silent()
+
+                await asyncio.sleep(self.poll_interval)
+
+            metrics.inc("realtime.admission_timed_out")
+            return None
+        finally:
+            self._waiters.remove(waiter)
+
+    def _try_admit(self) -> Optional[AdmissionTicket]:
+        if len(self.active) >= self.max_sessions:
+            return None
+        slot_fd = None
+        if self.global_slots.enabled:
+            slot_fd = self.global_slots.try_acquire()
+            if slot_fd is None:
+                return None
+        ticket = AdmissionTicket(slot_fd)
+        self.active.append(ticket)
+        metrics.inc("realtime.admission_admitted")
+        return ticket
+
+    def release(self, ticket: AdmissionTicket):
+        if ticket in self.active:
+            self.active.remove(ticket)
+            if ticket.slot_fd is not None:
+                self.global_slots.release(ticket.slot_fd)
+                ticket.slot_fd = None
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # RECLAMATION
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def _preempt_silent(self):
+        """Free the longest-silent session for a waiting client."""
+        if any(t.is_reclaimed for t in self.active):
+            return  # one is already on its way out
+        now = time.monotonic()
+        silent = [t for t in self.active if now - t.last_speech >= self.preempt_silence]
+        if silent:
+            min(silent, key=lambda t: t.last_speech).reclaim("preempted")
+            metrics.inc("realtime.reclaimed_preempted")
+
+    def reap(self):
+        """Reclaim dead and idle sessions."""
+        now = time.monotonic()
+        for ticket in self.active:
+            if ticket.is_reclaimed:
+                continue
+            if now - ticket.last_seen > self.heartbeat_timeout:
+                ticket.reclaim("heartbeat_timeout")
+                metrics.inc("realtime.reclaimed_heartbeat")
+            elif now - ticket.last_speech > self.idle_timeout:
+                ticket.reclaim("idle_timeout")
+                metrics.inc("realtime.reclaimed_idle")
+
+    def start(self, interval: float = 1.0):
+        """Begin background reclamation (call from a running event loop)."""
+        if self._reaper is not None:
+            return
+
+        async def loop():
+            while True:
+                try:
+                    self.reap()
+                except Exception as e:
+                    print(f"Realtime admission reaper error: {e}")
+                await asyncio.sleep(interval)
+
+        self._reaper = asyncio.create_task(loop())
+
+    async def close(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+            try:
+                await self._reaper
+            except asyncio.CancelledError:
+                pass
+            self._reaper = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": len(self.active),
+            "max_sessions": self.max_sessions,
+            "global_max_sessions": self.global_slots.limit,
+            "queued": len(self._waiters),
+            "queue_max": self.queue_max
+        }
+
+
+# Singleton instance
+realtime_admission = RealtimeAdmission(
+    global_slots=GlobalSlots(REALTIME_MAX_SESSIONS_GLOBAL)
+)
@@ -0,0 +1,205 @@
+"""
+═══════════════════════════════════════════════════════════════════════════════
+LINGUAVERSE - Pre-warmed Realtime STT Sessions
+Keeps connected, configured upstream sessions ready to lease
+═══════════════════════════════════════════════════════════════════════════════
+"""
+
+import time
+import asyncio
+from collections import deque
+from typing import Optional, Dict, Any, Tuple, Callable, Awaitable, Iterable, Deque
+
+PoolKey = Tuple[Optional[str], int]  # (language, sample_rate)
+
+
+class RealtimeSessionPool:
+    """
+    Pool of pre-connected upstream realtime transcription sessions.
+
+    Sessions are keyed by (language, sample_rate) and leased once: a client
+    takes one, and it is closed when the client is done (upstream keeps
+    transcript context per socket, so sessions are never handed back).
+    Every lease schedules a background refill for its key. Idle sessions
+    older than idle_seconds are closed and replaced, since the upstream
+    drops sockets that carry no audio. Keys learned from client demand stop
+    being kept warm after demand_seconds without a lease; pinned keys are
+    always kept warm (each one holds upstream sockets open even with no
+    users, so pinning is opt-in).
+
+    connect(language, sample_rate) must return a connected session (with
+    is_open and close()) or None when the upstream is unreachable.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[Optional[str], int], Awaitable[Any]],
+        size: int = 1,
+        idle_seconds: float = 60.0,
+        demand_seconds: float = 300.0,
+        pinned: Iterable[PoolKey] = ()
+    ):
+        self._connect = connect
+        self.size = size
+        self.idle_seconds = idle_seconds
+        self.demand_seconds = demand_seconds
+        self.pinned = set(pinned)
+
+        self._idle: Dict[PoolKey, Deque[Tuple[float, Any]]] = {}
+        self._last_lease: Dict[PoolKey, float] = {}
+        self._refills: Dict[PoolKey, asyncio.Task] = {}
+        self._maintainer: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.connect_failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # LEASING
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    async def acquire(self, language: Optional[str], sample_rate: int):
+        """
+        Lease a connected session, or None if the upstream is unreachable.
+
+        Returns a warm session when one is available; otherwise connects
+        a fresh one inline.
+        """
+        key = (language, sample_rate)
+        if not self.enabled:
+            return await self._open(key)
+
+        self._last_lease[key] = time.monotonic()
+        session = await self._take_idle(key)
+        self._schedule_refill(key)
+
+        if session is not None:
+            self.hits += 1
+            return session
+
+        self.misses += 1
+        return await self._open(key)
+
+    async def _take_idle(self, key: PoolKey):
+        idle = self._idle.get(key)
+        now = time.monotonic()
+        while idle:
+            created, session = idle.popleft()
+            if session.is_open and now - created < self.idle_seconds:
+                return session
+            self.expired += 1
+            await session.close()
+        return None
+
+    async def _open(self, key: PoolKey):
+        try:
+            session = await self._connect(*key)
+        except Exception as e:
+            print(f"Realtime pool connect error: {e}")
+            session = None
+        if session is None:
+            self.connect_failures += 1
+        return session
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # REPLENISHMENT & EXPIRY
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def wanted_keys(self) -> set:
+        """Keys to keep warm: pinned ones plus recently leased ones."""
+        now = time.monotonic()
+        recent = {key for key, at in self._last_lease.items() if now - at < self.demand_seconds}
+        return self.pinned | recent
+
+    def _schedule_refill(self, key: PoolKey):
+        task = self._refills.get(key)
+        if task is None or task.done():
+            self._refills[key] = asyncio.create_task(self._refill(key))
+
+    async def _refill(self, key: PoolKey):
+        # Look the deque up again after every connect: maintain() may have
+        # dropped the key while we were waiting on the upstream
+        while len(self._idle.setdefault(key, deque())) < self.size:
+            session = await self._open(key)
+            if session is None:
+                return  # try again on the next maintenance pass
+            if key not in self.wanted_keys():
+                await session.close()
+                return
+            self._idle.setdefault(key, deque()).append((time.monotonic(), session))
+
+    async def maintain(self):
+        """Close stale sessions, forget cold keys and top up the rest."""
+        wanted = self.wanted_keys()
+        now = time.monotonic()
+
+        # Sort sessions without awaiting, so refills and leases never see a
+        # half-filtered deque; closing happens afterwards
+        stale = []
+        for key in list(self._idle):
+            idle = self._idle[key]
+            for _ in range(len(idle)):
+                created, session = idle.popleft()
+                if key in wanted and session.is_open and now - created < self.idle_seconds:
+                    idle.append((created, session))
+                else:
+                    stale.append(session)
+            if not idle and key not in wanted:
+                del self._idle[key]
+
+        for session in stale:
+            self.expired += 1
+            await session.close()
+
+        for key in list(self._last_lease):
+            if key not in wanted:
+                del self._last_lease[key]
+
+        for key in wanted:
+            self._schedule_refill(key)
+
+    def start(self, interval: float = 5.0):
+        """Begin background maintenance (call from a running event loop)."""
+        if not self.enabled or self._maintainer is not None:
+            return
+
+        async def loop():
+            while True:
+                try:
+                    await self.maintain()
+                except Exception as e:
+                    print(f"Realtime pool maintenance error: {e}")
+                await asyncio.sleep(interval)
+
+        self._maintainer = asyncio.create_task(loop())
+
+    async def close(self):
+        """Stop maintenance and close every idle session."""
+        tasks = list(self._refills.values())
+        if self._maintainer is not None:
+            tasks.append(self._maintainer)
+            self._maintainer = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._refills.clear()
+
+        for idle in self._idle.values():
+            for _, session in idle:
+                await session.close()
+        self._idle.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "idle": {f"{lang or 'auto'}@{rate}": len(idle) for (lang, rate), idle in self._idle.items()},
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "connect_failures": self.connect_failures
+        }
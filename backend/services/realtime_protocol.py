@@ -0,0 +1,137 @@
+"""
+═══════════════════════════════════════════════════════════════════════════════
+LINGUAVERSE - Realtime STT Wire Protocol
+Client frame parsing, upstream audio messages and delta-encoded partials
+═══════════════════════════════════════════════════════════════════════════════
+"""
+
+import os
+import json
+import base64
+from typing import Optional, Dict, Any, List, Tuple
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CLIENT FRAMES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def parse_client_frame(message: Dict[str, Any]) -> Tuple[str, Any]:
+    """
+    Classify one ASGI websocket.receive message from a realtime client.
+
+    Returns ("audio", bytes) for binary frames (raw pcm_s16le) and for the
+    legacy {"type": "audio", "data": "<base64>"} text frame, or
+    ("control", dict) for any other JSON text frame.
+
+    Raises:
+        ValueError if a text frame is not a JSON object.
+    """
+    payload = message.get("bytes")
+    if payload is not None:
+        return "audio", payload
+
+    data = json.loads(message.get("text") or "")
+    if not isinstance(data, dict):
+        raise ValueError("Control frames must be JSON objects")
+
+    if data.get("type") == "audio":
+        return "audio", base64.b64decode(data.get("data") or "")
+    return "control", data
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# UPSTREAM AUDIO MESSAGES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def encode_audio_message(chunk: bytes) -> str:
+    """
+    Upstream {"type": "audio", "audio": "<base64>"} text frame for a PCM chunk.
+
+    The upstream protocol only accepts base64 inside JSON text frames. The
+    envelope is fixed and base64 needs no JSON escaping, so an f-string
+    replaces the per-chunk dict and json.dumps.
+    """
+    return f'{{"type":"audio","audio":"{base64.b64encode(chunk).decode("ascii")}"}}'
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# DELTA-ENCODED PARTIALS (opt-in: {"type": "config", "partials": "delta"})
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def utf16_length(text: str) -> int:
+    """Length as JavaScript counts it ("😀" is 2)."""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _common_prefix(a: List[Any], b: List[Any]) -> int:
+    n = min(len(a), len(b))
+    for i in range(n):
+        if a[i] != b[i]:
+            return i
+    return n
+
+
+class PartialDeltaEncoder:
+    """
+    Rewrites cumulative partials as deltas against the last one sent.
+
+    A partial becomes
+        {"type": "partial_delta", "keep_words": k, "words": [...],
+         "keep_chars": c, "text": "..."}
+    meaning: keep the first k words and c characters of the previous
+    partial, then append these words / this text (revised words show up
+    as a shorter keep). c counts UTF-16 code units, i.e. what JavaScript's
+    String.length and slice() count, so emoji and other astral characters
+    survive the client's text.slice(0, keep_chars). Every snapshot_every
+    partials, and at the start of each utterance, a normal full "partial"
+    is sent instead so clients can resynchronise. Finals and utterance
+    ends pass through untouched and reset the baseline.
+
+    Must see messages in the order the client receives them, i.e. after
+    any partials have been dropped from the send queue.
+    """
+
+    def __init__(self, snapshot_every: int = 20):
+        self.snapshot_every = snapshot_every
+        self._words: Optional[List[Any]] = None
+        self._text = ""
+        self._since_snapshot = 0
+
+        self.snapshots = 0
+        self.deltas = 0
+
+    def reset(self):
+        self._words = None
+        self._text = ""
+        self._since_snapshot = 0
+
+    def encode(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        kind = message.get("type")
+        if kind in ("final", "utterance_end"):
+            self.reset()
+            return message
+        if kind != "partial":
+            return message
+
+        words = message.get("words") or []
+        text = message.get("text") or ""
+
+        if self._words is None or self._since_snapshot >= self.snapshot_every:
+            self._words, self._text = words, text
+            self._since_snapshot = 0
+            self.snapshots += 1
+            return message
+
+        keep_words = _common_prefix(self._words, words)
+        kept_text = os.path.commonprefix([self._text, text])
+        self._words, self._text = words, text
+        self._since_snapshot += 1
+        self.deltas += 1
+        return {
+            "type": "partial_delta",
+            "keep_words": keep_words,
+            "words": words[keep_words:],
+            "keep_chars": utf16_length(kept_text),
+            "text": text[len(kept_text):]
+        }
+
@@ -0,0 +1,534 @@
+"""
+═══════════════════════════════════════════════════════════════════════════════
+LINGUAVERSE - Realtime Transcription Relay
+Bounded, policy-driven queues between the client socket and upstream STT
+═══════════════════════════════════════════════════════════════════════════════
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+from collections import deque
+from typing import Optional, Dict, Any, Callable, Awaitable, Deque
+from dotenv import load_dotenv
+
+from services.metrics_service import metrics
+from services.realtime_protocol import PartialDeltaEncoder
+from services.realtime_stats import RealtimeSessionStats
+
+load_dotenv()
+
+
+# Upstream direction: "coalesce" merges queued chunks into larger frames and
+# drops the oldest audio past the cap; "block" stops reading the client.
+REALTIME_AUDIO_POLICY = os.getenv("REALTIME_AUDIO_POLICY", "coalesce")
+REALTIME_AUDIO_QUEUE_BYTES = int(os.getenv("REALTIME_AUDIO_QUEUE_BYTES", str(5 * 32000)))  # 5 s at 16 kHz
+REALTIME_AUDIO_FRAME_BYTES = int(os.getenv("REALTIME_AUDIO_FRAME_BYTES", str(32000 // 2)))  # 0.5 s
+
+# Client direction: "drop_partials" keeps only the newest queued partial;
+# "block" stops reading upstream.
+REALTIME_CLIENT_POLICY = os.getenv("REALTIME_CLIENT_POLICY", "drop_partials")
+REALTIME_CLIENT_QUEUE_MESSAGES = int(os.getenv("REALTIME_CLIENT_QUEUE_MESSAGES", "32"))
+
+# Upstream reconnects after a dropped session (full-jitter exponential backoff)
+REALTIME_RECONNECT_ATTEMPTS = int(os.getenv("REALTIME_RECONNECT_ATTEMPTS", "5"))
+REALTIME_RECONNECT_BASE_SECONDS = float(os.getenv("REALTIME_RECONNECT_BASE_SECONDS", "0.25"))
+REALTIME_RECONNECT_MAX_SECONDS = float(os.getenv("REALTIME_RECONNECT_MAX_SECONDS", "4"))
+
+# Delta-mode partials: send a full snapshot every N partials
+REALTIME_DELTA_SNAPSHOT_EVERY = int(os.getenv("REALTIME_DELTA_SNAPSHOT_EVERY", "20"))
+
+# How long a replaced session may keep delivering finals before it is closed
+REALTIME_RETIRE_SECONDS = float(os.getenv("REALTIME_RETIRE_SECONDS", "1.5"))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# UPSTREAM AUDIO QUEUE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class AudioQueue:
+    """
+    Byte-bounded queue of PCM chunks waiting to go upstream.
+
+    With the "coalesce" policy, a sender that fell behind takes every
+    queued chunk (up to max_frame_bytes) as one frame, and when the queue
+    is full the oldest audio is dropped so latency stays bounded. With
+    "block", put() waits for room instead.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = REALTIME_AUDIO_QUEUE_BYTES,
+        max_frame_bytes: int = REALTIME_AUDIO_FRAME_BYTES,
+        policy: str = REALTIME_AUDIO_POLICY
+    ):
+        self.max_bytes = max_bytes
+        self.max_frame_bytes = max_frame_bytes
+        self.policy = policy
+
+        self._chunks: Deque[bytes] = deque()
+        self._bytes = 0
+        self._closed = False
+        self._ready = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+
+        self.max_depth_bytes = 0
+        self.chunks_coalesced = 0
+        self.bytes_dropped = 0
+
+    @property
+    def depth_bytes(self) -> int:
+        return self._bytes
+
+    async def put(self, chunk: bytes):
+        if self.policy == "block":
+            while self._bytes and self._bytes + len(chunk) > self.max_bytes:
+                self._space.clear()
+                await self._space.wait()
+        else:
+            while self._chunks and self._bytes + len(chunk) > self.max_bytes:
+                dropped = self._chunks.popleft()
+                self._bytes -= len(dropped)
+                self.bytes_dropped += len(dropped)
+
+        self._chunks.append(chunk)
+        self._bytes += len(chunk)
+        self.max_depth_bytes = max(self.max_depth_bytes, self._bytes)
+        self._ready.set()
+
+    def requeue(self, frame: bytes):
+        """Put a frame that could not be sent back at the head of the queue."""
+        self._chunks.appendleft(frame)
+        self._bytes += len(frame)
+        self._ready.set()
+
+    async def get(self) -> Optional[bytes]:
+        """Next frame to send, or None once closed and drained."""
+        while not self._chunks:
+            if self._closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+
+        frame = self._chunks.popleft()
+        if self.policy == "coalesce" and self._chunks and len(frame) + len(self._chunks[0]) <= self.max_frame_bytes:
+            merged = bytearray(frame)
+            while self._chunks and len(merged) + len(self._chunks[0]) <= self.max_frame_bytes:
+                merged += self._chunks.popleft()
+                self.chunks_coalesced += 1
+            frame = bytes(merged)
+
+        self._bytes -= len(frame)
+        self._space.set()
+        return frame
+
+    def close(self):
+        """No more audio; get() returns None after the backlog drains."""
+        self._closed = True
+        self._ready.set()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CLIENT MESSAGE QUEUE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class ClientMessageQueue:
+    """
+    Bounded queue of JSON messages waiting to go to the client.
+
+    Partials are cumulative, so with the "drop_partials" policy a new
+    partial replaces one still queued behind it, and a full queue sheds
+    its oldest partial. Finals, errors and status messages are never
+    dropped; when only those fill the queue, put() waits for room.
+    """
+
+    def __init__(self, max_messages: int = REALTIME_CLIENT_QUEUE_MESSAGES, policy: str = REALTIME_CLIENT_POLICY):
+        self.max_messages = max_messages
+        self.policy = policy
+
+        self._messages: Deque[Dict[str, Any]] = deque()
+        self._closed = False
+        self._ready = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+
+        self.max_depth = 0
+        self.partials_superseded = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._messages)
+
+    async def put(self, message: Dict[str, Any]):
+        droppable = self.policy == "drop_partials"
+
+        if droppable and message.get("type") == "partial" and self._messages and self._messages[-1].get("type") == "partial":
+            self._messages[-1] = message
+            self.partials_superseded += 1
+            return
+
+        while len(self._messages) >= self.max_messages:
+            if droppable and self._drop_oldest_partial():
+                continue
+            self._space.clear()
+            await self._space.wait()
+
+        self._messages.append(message)
+        self.max_depth = max(self.max_depth, len(self._messages))
+        self._ready.set()
+
+    def _drop_oldest_partial(self) -> bool:
+        for index, queued in enumerate(self._messages):
+            if queued.get("type") == "partial":
+                del self._messages[index]
+                self.partials_superseded += 1
+                return True
+        return False
+
+    async def get(self) -> Optional[Dict[str, Any]]:
+        """Next message to send, or None once closed and drained."""
+        while not self._messages:
+            if self._closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+
+        message = self._messages.popleft()
+        self._space.set()
+        return message
+
+    def close(self):
+        self._closed = True
+        self._ready.set()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# RELAY
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def client_message(transcript: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Translate an upstream transcript event into the client protocol."""
+    msg_type = transcript.get("type", "unknown")
+
+    if msg_type == "transcript":
+        # Word-level transcription update
+        return {
+            "type": "partial" if not transcript.get("is_final") else "final",
+            "text": transcript.get("text", ""),
+            "words": transcript.get("words", []),
+            "language": transcript.get("language"),
+            "is_final": transcript.get("is_final", False)
+        }
+    if msg_type == "utterance_end":
+        return {"type": "utterance_end"}
+    if msg_type == "error":
+        return {"type": "error", "message": transcript.get("message", "Unknown error")}
+    return None
+
+
+class RealtimeRelay:
+    """
+    Moves audio and transcripts between one client socket and one upstream
+    session through bounded queues, so neither side can stall the other.
+
+    Three tasks run per relay: the upstream sender drains the audio queue,
+    the upstream receiver turns transcript events into client messages,
+    and the client sender drains the message queue. Every client-bound
+    message (including status replies) goes through the one queue, so the
+    socket has a single writer and ordering is preserved.
+
+    Switching upstream sessions (a language change, or reconnecting after
+    the upstream dropped) never loses audio: the sender is paused while
+    the replacement connects in the background, incoming audio keeps
+    accumulating in the bounded audio queue (which sheds its oldest audio
+    like a ring buffer if the switch takes too long), and once the new
+    session is in place the queued audio is replayed into it. The old
+    session gets an end-of-stream and a short grace period to deliver its
+    last finals.
+    """
+
+    def __init__(
+        self,
+        session,
+        send_text: Callable[[str], Awaitable[None]],
+        connect: Optional[Callable[[Optional[str]], Awaitable[Any]]] = None,
+        language: Optional[str] = None,
+        audio_queue: Optional[AudioQueue] = None,
+        client_queue: Optional[ClientMessageQueue] = None,
+        session_stats: Optional[RealtimeSessionStats] = None,
+        on_transcript: Optional[Callable[[Dict[str, Any]], None]] = None
+    ):
+        self.session = session
+        self.language = language
+        self._send_text = send_text
+        self._connect = connect
+        self.audio = audio_queue or AudioQueue()
+        self.outbox = client_queue or ClientMessageQueue()
+
+        self.session_stats = session_stats or RealtimeSessionStats()
+        self.on_transcript = on_transcript  # sees every client-bound transcript message
+
+        # Set when the client opted into delta-encoded partials
+        self.partial_encoder: Optional[PartialDeltaEncoder] = None
+
+        # Cleared while a replacement session is connecting
+        self._live = asyncio.Event()
+        self._live.set()
+        self._finishing = False
+        self.failed = False
+        self.closed = False
+
+        self._upstream_sender: Optional[asyncio.Task] = None
+        self._upstream_receiver: Optional[asyncio.Task] = None
+        self._client_sender: Optional[asyncio.Task] = None
+        self._switch_task: Optional[asyncio.Task] = None
+        self._retiring: set = set()
+
+        self.reconnects = 0
+        self.switches = 0
+
+    def start(self):
+        metrics.add_gauge("realtime.sessions_active", 1)
+        self._upstream_sender = asyncio.create_task(self._send_upstream())
+        self._upstream_receiver = asyncio.create_task(self._receive_upstream(self.session))
+        self._client_sender = asyncio.create_task(self._send_client())
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # INPUTS
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    async def send_audio(self, chunk: bytes):
+        """Queue normalized PCM for upstream."""
+        await self.audio.put(chunk)
+
+    async def notify(self, message: Dict[str, Any]):
+        """Queue a status or error message for the client."""
+        await self.outbox.put(message)
+
+    def set_partials_mode(self, mode: str):
+        """"delta" sends partials as deltas; anything else sends them in full."""
+        if mode == "delta":
+            if self.partial_encoder is None:
+                self.partial_encoder = PartialDeltaEncoder(REALTIME_DELTA_SNAPSHOT_EVERY)
+        else:
+            self._record_partial_encoding()
+            self.partial_encoder = None
+
+    def reconfigure(self, language: Optional[str]):
+        """Move to a new upstream session for language, in the background."""
+        self._begin_switch(language, reconnect=False)
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # SESSION SWITCHING
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def _begin_switch(self, language: Optional[str], reconnect: bool):
+        self._live.clear()
+        if self._switch_task and not self._switch_task.done():
+            self._switch_task.cancel()
+        self._switch_task = asyncio.create_task(self._switch(language, reconnect))
+
+    async def _switch(self, language: Optional[str], reconnect: bool):
+        started = time.monotonic()
+        session = await self._connect_with_backoff(language)
+        if session is None:
+            self.failed = True
+            self.audio.close()
+            self._live.set()
+            await self.outbox.put({
+                "type": "error",
+                "message": "Lost connection to transcription service"
+            })
+            return
+
+        old, old_receiver = self.session, self._upstream_receiver
+        self.session = session
+        self.language = language
+        self.session_stats.on_lease(time.monotonic() - started, session)
+        self._upstream_receiver = asyncio.create_task(self._receive_upstream(session))
+        self._live.set()
+
+        if reconnect:
+            self.reconnects += 1
+            await self.outbox.put({"type": "reconnected"})
+        else:
+            self.switches += 1
+
+        retire = asyncio.create_task(self._retire(old, old_receiver))
+        self._retiring.add(retire)
+        retire.add_done_callback(self._retiring.discard)
+
+    async def _connect_with_backoff(self, language: Optional[str]):
+        if self._connect is None:
+            return None
+        for attempt in range(REALTIME_RECONNECT_ATTEMPTS):
+            if attempt:
+                ceiling = min(REALTIME_RECONNECT_MAX_SECONDS, REALTIME_RECONNECT_BASE_SECONDS * 2 ** attempt)
+                await asyncio.sleep(random.uniform(0, ceiling))
+            session = await self._connect(language)
+            if session is not None:
+                return session
+        return None
+
+    async def _retire(self, session, receiver: Optional[asyncio.Task]):
+        """Let a replaced session flush its finals, then close it."""
+        if session.is_connected:
+            await session.end_stream()
+        if receiver is not None:
+            try:
+                await asyncio.wait_for(receiver, REALTIME_RETIRE_SECONDS)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                pass
+        await session.close()
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # TASKS
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    async def _send_upstream(self):
+        while True:
+            frame = await self.audio.get()
+            if frame is None:
+                return
+            await self._live.wait()
+            if self.failed:
+                return
+            if await self.session.send_audio(frame) is False:
+                if self._on_upstream_lost(self.session):
+                    # Keep the frame for the replacement session
+                    self.audio.requeue(frame)
+                else:
+                    self.audio.bytes_dropped += len(frame)
+            else:
+                self.session_stats.on_upstream_frame(len(frame))
+
+    async def _receive_upstream(self, session):
+        try:
+            while session.is_connected:
+                transcript = await session.receive_transcript()
+                if transcript is None:
+                    break
+                message = client_message(transcript)
+                if message is not None:
+                    if session is self.session:
+                        self.session_stats.on_transcript(message)
+                    if self.on_transcript is not None:
+                        self.on_transcript(message)
+                    await self.outbox.put(message)
+                    if message["type"] == "error":
+                        return
+        except Exception as e:
+            print(f"Forward transcripts error: {e}")
+        self._on_upstream_lost(session)
+
+    def _on_upstream_lost(self, session) -> bool:
+        """
+        Reconnect when the current session drops without us closing it.
+
+        Returns True while a replacement session is on its way.
+        """
+        if session is not self.session or self._finishing:
+            return False
+        if self._live.is_set():
+            print(f"Realtime upstream dropped, reconnecting ({self.language or 'auto'})")
+            self._begin_switch(self.language, reconnect=True)
+        return True
+
+    async def _send_client(self):
+        try:
+            while True:
+                message = await self.outbox.get()
+                if message is None:
+                    return
+                if self.partial_encoder is not None:
+                    message = self.partial_encoder.encode(message)
+                text = json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+                self.session_stats.on_client_send(len(text.encode("utf-8")), self.outbox.depth)
+                await self._send_text(text)
+        except Exception as e:
+            print(f"Client send error: {e}")
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # SHUTDOWN
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    async def finish(self, grace_seconds: float = 0.5):
+        """
+        End of stream: flush queued audio upstream, signal EOS, then give
+        the upstream grace_seconds to deliver final transcripts.
+        """
+        self.audio.close()
+        if self._upstream_sender:
+            await self._upstream_sender
+        self._finishing = True
+        await self.session.end_stream()
+        await self.notify({"type": "eos_received"})
+        await asyncio.sleep(grace_seconds)
+
+    async def close(self, drain_seconds: float = 1.0):
+        """Stop all tasks, deliver what the client can still take, close upstream."""
+        if self.closed:
+            return
+        self.closed = True
+        self._finishing = True
+        self.audio.close()
+        await self._cancel(self._switch_task)
+        await self._cancel(self._upstream_sender)
+        await self._cancel(self._upstream_receiver)
+        for retire in list(self._retiring):
+            await self._cancel(retire)
+
+        self.outbox.close()
+        if self._client_sender:
+            try:
+                await asyncio.wait_for(self._client_sender, drain_seconds)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                pass
+
+        await self.session.close()
+        metrics.add_gauge("realtime.sessions_active", -1)
+        self._record_metrics()
+        self.session_stats.record()
+        print(f"🎙️ Realtime session summary: {json.dumps(self.session_stats.summary())}")
+
+    @staticmethod
+    async def _cancel(task: Optional[asyncio.Task]):
+        if task is None or task.done():
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def _record_metrics(self):
+        metrics.inc("realtime.audio_chunks_coalesced", self.audio.chunks_coalesced)
+        metrics.inc("realtime.audio_bytes_dropped", self.audio.bytes_dropped)
+        metrics.inc("realtime.partials_superseded", self.outbox.partials_superseded)
+        metrics.inc("realtime.session_switches", self.switches)
+        metrics.inc("realtime.upstream_reconnects", self.reconnects)
+        metrics.observe("realtime.audio_queue_max_bytes", self.audio.max_depth_bytes)
+        metrics.observe("realtime.client_queue_max_messages", self.outbox.max_depth)
+        self._record_partial_encoding()
+
+    def _record_partial_encoding(self):
+        if self.partial_encoder is not None:
+            metrics.inc("realtime.partial_deltas", self.partial_encoder.deltas)
+            metrics.inc("realtime.partial_snapshots", self.partial_encoder.snapshots)
+            self.partial_encoder.deltas = self.partial_encoder.snapshots = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "audio_queue_bytes": self.audio.depth_bytes,
+            "audio_queue_max_bytes": self.audio.max_depth_bytes,
+            "audio_chunks_coalesced": self.audio.chunks_coalesced,
+            "audio_bytes_dropped": self.audio.bytes_dropped,
+            "client_queue_messages": self.outbox.depth,
+            "client_queue_max_messages": self.outbox.max_depth,
+            "partials_superseded": self.outbox.partials_superseded,
+            "session_switches": self.switches,
+            "upstream_reconnects": self.reconnects
+        }
@@ -0,0 +1,154 @@
+"""
+═══════════════════════════════════════════════════════════════════════════════
+LINGUAVERSE - Realtime STT Latency Stats
+Per-session timings for /api/transcribe/realtime, rolled up into metrics
+═══════════════════════════════════════════════════════════════════════════════
+"""
+
+import time
+from collections import deque
+from typing import Optional, Dict, Any, List, Callable
+
+from services.metrics_service import metrics, Summary
+
+# Upstream audio is 16 kHz mono pcm_s16le
+UPSTREAM_BYTES_PER_SECOND = 16000 * 2
+
+
+class RealtimeSessionStats:
+    """
+    Timings and byte counts for one realtime transcription socket.
+
+    The relay reports events as they happen; each one also feeds the
+    process-wide summaries under "realtime.*" in /api/metrics, and
+    summary() is logged when the socket closes.
+
+    Chunk-to-partial lag maps the end time of a transcript's last word
+    (seconds into the upstream stream) back to the moment the frame
+    holding that audio was sent, so it measures model + network latency
+    rather than how long the user spoke. Transcripts without word
+    timings fall back to the most recent frame.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self.started = clock()
+
+        self.lease_ms: Optional[float] = None
+        self.connect_ms: Optional[float] = None
+        self.first_partial_ms: Optional[float] = None
+        self.partial_lag = Summary()
+        self.final_lag = Summary()
+        self.client_queue = Summary()
+
+        self.bytes_in = 0
+        self.bytes_upstream = 0
+        self.bytes_out = 0
+        self.partials = 0
+        self.finals = 0
+
+        self._first_audio_at: Optional[float] = None
+        self._utterance_started: Optional[float] = None
+        self._sent_seconds = 0.0
+        self._marks: deque = deque(maxlen=1024)  # (stream seconds at frame end, sent at)
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # EVENTS
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def on_lease(self, seconds: float, session):
+        """An upstream session was leased (seconds = wait seen by the client)."""
+        self.lease_ms = seconds * 1000
+        metrics.observe("realtime.lease_ms", self.lease_ms)
+        connect_seconds = getattr(session, "connect_seconds", None)
+        if connect_seconds is not None:
+            self.connect_ms = connect_seconds * 1000
+
+        # A new upstream stream starts its word timings from zero
+        self._sent_seconds = 0.0
+        self._marks.clear()
+
+    def on_audio_in(self, size: int):
+        if self._first_audio_at is None and size:
+            self._first_audio_at = self._clock()
+        self.bytes_in += size
+
+    def on_upstream_frame(self, size: int):
+        self.bytes_upstream += size
+        self._sent_seconds += size / UPSTREAM_BYTES_PER_SECOND
+        self._marks.append((self._sent_seconds, self._clock()))
+
+    def on_transcript(self, message: Dict[str, Any]):
+        kind = message.get("type")
+        if kind not in ("partial", "final"):
+            return
+        now = self._clock()
+
+        if self.first_partial_ms is None and self._first_audio_at is not None:
+            self.first_partial_ms = (now - self._first_audio_at) * 1000
+            metrics.observe("realtime.first_partial_ms", self.first_partial_ms)
+
+        lag = self._audio_lag_ms(message.get("words") or [], now)
+        if lag is not None:
+            self.partial_lag.observe(lag)
+            metrics.observe("realtime.partial_lag_ms", lag)
+
+        if kind == "partial":
+            self.partials += 1
+            if self._utterance_started is None:
+                self._utterance_started = now
+        else:
+            self.finals += 1
+            if self._utterance_started is not None:
+                final_lag = (now - self._utterance_started) * 1000
+                self.final_lag.observe(final_lag)
+                metrics.observe("realtime.partial_to_final_ms", final_lag)
+            self._utterance_started = None
+
+    def on_client_send(self, size: int, queue_depth: int):
+        self.bytes_out += size
+        self.client_queue.observe(queue_depth)
+        metrics.observe("realtime.client_queue_depth", queue_depth)
+
+    def _audio_lag_ms(self, words: List[Any], now: float) -> Optional[float]:
+        if not self._marks:
+            return None
+        end = words[-1].get("end") if words and isinstance(words[-1], dict) else None
+        sent_at = self._marks[-1][1]
+        if isinstance(end, (int, float)):
+            for seconds, at in reversed(self._marks):
+                if seconds < end:
+                    break
+                sent_at = at
+        return (now - sent_at) * 1000
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # REPORTING
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "duration_s": round(self._clock() - self.started, 2),
+            "lease_ms": _round(self.lease_ms),
+            "connect_ms": _round(self.connect_ms),
+            "first_partial_ms": _round(self.first_partial_ms),
+            "partial_lag_ms": {"p50": _round(self.partial_lag.percentile(0.5)), "p95": _round(self.partial_lag.percentile(0.95))},
+            "partial_to_final_ms": {"p50": _round(self.final_lag.percentile(0.5)), "p95": _round(self.final_lag.percentile(0.95))},
+            "client_queue_max": self.client_queue.max or 0,
+            "partials": self.partials,
+            "finals": self.finals,
+            "bytes_in": self.bytes_in,
+            "bytes_upstream": self.bytes_upstream,
+            "bytes_out": self.bytes_out
+        }
+
+    def record(self):
+        """Add this session's byte counts to the process totals."""
+        metrics.inc("realtime.sessions", 1)
+        metrics.inc("realtime.bytes_in", self.bytes_in)
+        metrics.inc("realtime.bytes_upstream", self.bytes_upstream)
+        metrics.inc("realtime.bytes_out", self.bytes_out)
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 1)
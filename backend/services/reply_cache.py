@@ -0,0 +1,180 @@
+"""
+═══════════════════════════════════════════════════════════════════════════════
+LINGUAVERSE - NPC Reply Cache
+Exact-match cache for repeated player openers, opt-in per NPC
+═══════════════════════════════════════════════════════════════════════════════
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Iterable, Callable
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+# Comma-separated NPC ids, or "*" for every NPC; empty disables the cache
+REPLY_CACHE_NPCS = os.getenv("REPLY_CACHE_NPCS", "")
+REPLY_CACHE_MAX_ITEMS = int(os.getenv("REPLY_CACHE_MAX_ITEMS", "1024"))
+REPLY_CACHE_TTL_SECONDS = float(os.getenv("REPLY_CACHE_TTL_SECONDS", "3600"))
+# Trailing history messages that are part of the key
+REPLY_CACHE_HISTORY_MESSAGES = int(os.getenv("REPLY_CACHE_HISTORY_MESSAGES", "2"))
+
+EDGE_PUNCTUATION = " \t\n.,!?¡¿;:…\"'"
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+class ReplyCache:
+    """
+    Exact-match cache of NPC reply text.
+
+    The key is the normalized player input (case, surrounding punctuation
+    and whitespace ignored) plus everything else that shapes the reply:
+    NPC, quest step, difficulty, model and a hash of the last few history
+    messages. Entries expire after ttl_seconds; past max_items the least
+    recently used entry is evicted.
+
+    Only NPCs that opted in are cached, since a cached turn always gets the
+    same wording back.
+    """
+
+    def __init__(
+        self,
+        npcs: Optional[Iterable[str]] = None,
+        max_items: int = REPLY_CACHE_MAX_ITEMS,
+        ttl_seconds: float = REPLY_CACHE_TTL_SECONDS,
+        history_messages: int = REPLY_CACHE_HISTORY_MESSAGES,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        if npcs is None:
+            npcs = REPLY_CACHE_NPCS.split(",")
+        self.npcs = {npc.strip().lower() for npc in npcs if npc.strip()}
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self.history_messages = history_messages
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        # key -> (expires_at, reply text), least recently used first
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "expired": 0,
+            "evictions": 0
+        }
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # FLAGS
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def enabled_for(self, npc_id: str) -> bool:
+        return self.max_items > 0 and ("*" in self.npcs or npc_id in self.npcs)
+
+    def set_enabled(self, npc_id: str, enabled: bool):
+        if enabled:
+            self.npcs.add(npc_id)
+        else:
+            self.npcs.discard(npc_id)
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # KEYS
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """'  Gdzie jest KOT? ' -> 'gdzie jest kot'"""
+        text = unicodedata.normalize("NFC", text).casefold()
+        return WHITESPACE_PATTERN.sub(" ", text).strip(EDGE_PUNCTUATION)
+
+    def make_key(
+        self,
+        npc_id: str,
+        player_input: str,
+        quest_state: int,
+        difficulty: int,
+        history: List[Dict[str, Any]],
+        model: str = ""
+    ) -> str:
+        return self._digest({
+            "context": self.context_key(npc_id, quest_state, difficulty, history, model),
+            "input": self.normalize(player_input)
+        })
+
+    def context_key(
+        self,
+        npc_id: str,
+        quest_state: int,
+        difficulty: int,
+        history: List[Dict[str, Any]],
+        model: str = ""
+    ) -> str:
+        """Everything in the key except the player input."""
+        recent = history[-self.history_messages:] if self.history_messages > 0 else []
+        return self._digest({
+            "npc": npc_id,
+            "quest_state": quest_state,
+            "difficulty": difficulty,
+            "model": model,
+            "history": [[m.get("role"), self.normalize(m.get("content") or "")] for m in recent]
+        })
+
+    @staticmethod
+    def _digest(payload: Dict[str, Any]) -> str:
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # PUBLIC API
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            expires_at, text = entry
+            if self._clock() >= expires_at:
+                del self._entries[key]
+                self._counters["expired"] += 1
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return text
+
+    def put(self, key: str, text: str):
+        if not text or self.max_items <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_seconds, text)
+            self._entries.move_to_end(key)
+            self._counters["writes"] += 1
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "items": len(self._entries),
+                "max_items": self.max_items,
+                "ttl_seconds": self.ttl_seconds,
+                "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+                "npcs": sorted(self.npcs)
+            }
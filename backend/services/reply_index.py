@@ -0,0 +1,280 @@
+"""
+═══════════════════════════════════════════════════════════════════════════════
+LINGUAVERSE - Near-Duplicate Reply Index
+MinHash/LSH over recent player inputs, so small variations reuse a reply
+═══════════════════════════════════════════════════════════════════════════════
+"""
+
+import os
+import re
+import time
+import zlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Set, Tuple, Iterable, Callable
+
+import numpy as np
+from dotenv import load_dotenv
+
+from services.metrics_service import metrics
+from services.reply_cache import ReplyCache, EDGE_PUNCTUATION, REPLY_CACHE_TTL_SECONDS
+
+load_dotenv()
+
+
+# Estimated Jaccard similarity (character trigrams) needed to reuse a reply
+REPLY_SIMILARITY_THRESHOLD = float(os.getenv("REPLY_SIMILARITY_THRESHOLD", "0.8"))
+# Comma-separated NPC ids (or "*") that must never get a near-duplicate reply
+REPLY_SIMILARITY_KILL_NPCS = os.getenv("REPLY_SIMILARITY_KILL_NPCS", "")
+REPLY_SIMILARITY_MAX_ENTRIES = int(os.getenv("REPLY_SIMILARITY_MAX_ENTRIES", "64"))  # per context
+REPLY_SIMILARITY_MAX_CONTEXTS = int(os.getenv("REPLY_SIMILARITY_MAX_CONTEXTS", "512"))
+
+SHINGLE_SIZE = 3
+STEM_CHARS = 3  # shared leading characters that make two words one stem
+NUM_PERM = 64
+BANDS = 16  # 16 bands x 4 rows: pairs around 0.5 similarity start colliding
+
+MERSENNE_PRIME = (1 << 31) - 1
+NON_WORD_PATTERN = re.compile(r"[^\w\s]")
+
+
+class MinHasher:
+    """
+    MinHash signatures over hashed character shingles.
+
+    Uses NUM_PERM universal hashes (a*x + b) mod 2^31-1 evaluated with
+    numpy, so a signature is one vectorized min over the shingle set.
+    """
+
+    def __init__(self, num_perm: int = NUM_PERM, shingle_size: int = SHINGLE_SIZE, seed: int = 7):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._a = rng.integers(1, MERSENNE_PRIME, size=num_perm, dtype=np.int64)
+        self._b = rng.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.int64)
+
+    def shingles(self, text: str) -> Set[int]:
+        """Hashed character shingles of the normalized text ("kot" -> " ko", "kot", "ot ")."""
+        text = NON_WORD_PATTERN.sub("", ReplyCache.normalize(text))
+        text = f" {' '.join(text.split())} "
+        size = self.shingle_size
+        return {
+            zlib.crc32(text[i:i + size].encode("utf-8")) & MERSENNE_PRIME
+            for i in range(max(1, len(text) - size + 1))
+        }
+
+    def signature(self, shingles: Set[int]) -> np.ndarray:
+        x = np.fromiter(shingles, dtype=np.int64, count=len(shingles))
+        # (num_perm, 1) x (1, n): products stay below 2^62
+        return ((self._a[:, None] * x[None, :] + self._b[:, None]) % MERSENNE_PRIME).min(axis=1)
+
+
+def word_tokens(text: str) -> Tuple[str, ...]:
+    """'Gdzie, jest  KOT?!' -> ('gdzie', 'jest', 'kot')"""
+    words = (word.strip(EDGE_PUNCTUATION) for word in ReplyCache.normalize(text).split())
+    return tuple(word for word in words if word)
+
+
+def same_stem(a: str, b: str) -> bool:
+    """
+    Whether two different words look like forms of one word.
+
+    'kot'/'kota', 'kot'/'kocie' and 'ten'/'tego' do; 'mój'/'twój' and
+    'jest'/'jset' do not. A crude prefix rule that errs towards a fresh
+    reply: a false match only costs one Claude call.
+    """
+    shared = len(os.path.commonprefix([a, b]))
+    return shared >= max(1, min(STEM_CHARS, min(len(a), len(b)) - 1))
+
+
+def changes_word_form(tokens: Tuple[str, ...], other: Tuple[str, ...]) -> bool:
+    """True if a word of one input was swapped for another form of it."""
+    added, removed = set(tokens) - set(other), set(other) - set(tokens)
+    return any(same_stem(a, b) for a in added for b in removed)
+
+
+class _Entry:
+    __slots__ = ("tokens", "shingles", "signature", "reply", "expires_at")
+
+    def __init__(
+        self,
+        tokens: Tuple[str, ...],
+        shingles: Set[int],
+        signature: np.ndarray,
+        reply: str,
+        expires_at: float
+    ):
+        self.tokens = tokens
+        self.shingles = shingles
+        self.signature = signature
+        self.reply = reply
+        self.expires_at = expires_at
+
+
+class _Context:
+    """Recent entries for one (NPC, quest step, difficulty, history) context."""
+
+    def __init__(self, bands: int):
+        self.entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self.buckets: List[Dict[bytes, Set[int]]] = [{} for _ in range(bands)]
+
+
+class NearDuplicateIndex:
+    """
+    Serves a recent reply when the new input is nearly the same.
+
+    Each context (NPC, quest step, difficulty and recent history, as in
+    ReplyCache.context_key) keeps its last max_entries inputs. LSH buckets
+    on MinHash band slices find candidates; the candidate with the highest
+    exact Jaccard similarity of the shingle sets is reused if it reaches
+    the threshold ("A gdzie jest kot?" reuses "Gdzie jest kot").
+
+    Candidates where a word changed form ("Gdzie jest kota?") are skipped
+    whatever their score: for a learner that is usually the grammar
+    mistake the NPC should correct, and it scores as high as a harmless
+    extra word.
+
+    Reuse follows the reply cache opt-in; kill_npcs (or set_enabled)
+    switches it off for an NPC whose replies must stay fresh.
+    """
+
+    def __init__(
+        self,
+        threshold: float = REPLY_SIMILARITY_THRESHOLD,
+        kill_npcs: Optional[Iterable[str]] = None,
+        max_entries: int = REPLY_SIMILARITY_MAX_ENTRIES,
+        max_contexts: int = REPLY_SIMILARITY_MAX_CONTEXTS,
+        ttl_seconds: float = REPLY_CACHE_TTL_SECONDS,
+        bands: int = BANDS,
+        hasher: Optional[MinHasher] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        if kill_npcs is None:
+            kill_npcs = REPLY_SIMILARITY_KILL_NPCS.split(",")
+        self.killed = {npc.strip().lower() for npc in kill_npcs if npc.strip()}
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_contexts = max_contexts
+        self.ttl_seconds = ttl_seconds
+        self.hasher = hasher or MinHasher()
+        self.bands = bands
+        self.rows = self.hasher.num_perm // bands
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._contexts: "OrderedDict[str, _Context]" = OrderedDict()
+        self._next_id = 0
+
+        self._counters = {
+            "lookups": 0,
+            "reuses": 0,
+            "candidates": 0,
+            "inserts": 0,
+            "evictions": 0
+        }
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # FLAGS
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def enabled_for(self, npc_id: str) -> bool:
+        return self.threshold > 0 and "*" not in self.killed and npc_id not in self.killed
+
+    def set_enabled(self, npc_id: str, enabled: bool):
+        if enabled:
+            self.killed.discard(npc_id)
+        else:
+            self.killed.add(npc_id)
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # PUBLIC API
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def lookup(self, context_key: str, text: str) -> Optional[str]:
+        """Reply of the most similar recent input, if similar enough."""
+        tokens = word_tokens(text)
+        shingles = self.hasher.shingles(text)
+        signature = self.hasher.signature(shingles)
+        now = self._clock()
+
+        with self._lock:
+            self._counters["lookups"] += 1
+            context = self._contexts.get(context_key)
+            if context is None:
+                return None
+            self._contexts.move_to_end(context_key)
+
+            candidates = set()
+            for band, key in enumerate(self._band_keys(signature)):
+                candidates |= context.buckets[band].get(key, set())
+            self._counters["candidates"] += len(candidates)
+
+            best, best_similarity = None, 0.0
+            for entry_id in candidates:
+                entry = context.entries[entry_id]
+                if entry.expires_at <= now or changes_word_form(tokens, entry.tokens):
+                    continue
+                similarity = len(shingles & entry.shingles) / len(shingles | entry.shingles)
+                if similarity > best_similarity:
+                    best, best_similarity = entry, similarity
+
+            if best is None or best_similarity < self.threshold:
+                return None
+            self._counters["reuses"] += 1
+
+        metrics.observe("reply_index.reused_similarity", best_similarity)
+        return best.reply
+
+    def add(self, context_key: str, text: str, reply: str):
+        if not reply or self.max_entries <= 0:
+            return
+        shingles = self.hasher.shingles(text)
+        entry = _Entry(
+            word_tokens(text), shingles, self.hasher.signature(shingles), reply, self._clock() + self.ttl_seconds
+        )
+
+        with self._lock:
+            context = self._contexts.get(context_key)
+            if context is None:
+                context = self._contexts[context_key] = _Context(self.bands)
+                while len(self._contexts) > self.max_contexts:
+                    _, dropped = self._contexts.popitem(last=False)
+                    self._counters["evictions"] += len(dropped.entries)
+            self._contexts.move_to_end(context_key)
+
+            entry_id = self._next_id
+            self._next_id += 1
+            context.entries[entry_id] = entry
+            for band, key in enumerate(self._band_keys(entry.signature)):
+                context.buckets[band].setdefault(key, set()).add(entry_id)
+            self._counters["inserts"] += 1
+
+            while len(context.entries) > self.max_entries:
+                old_id, old = context.entries.popitem(last=False)
+                for band, key in enumerate(self._band_keys(old.signature)):
+                    bucket = context.buckets[band].get(key)
+                    if bucket is not None:
+                        bucket.discard(old_id)
+                        if not bucket:
+                            del context.buckets[band][key]
+                self._counters["evictions"] += 1
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        rows = self.rows
+        return [signature[band * rows:(band + 1) * rows].tobytes() for band in range(self.bands)]
+
+    def clear(self):
+        with self._lock:
+            self._contexts.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["lookups"]
+            return {
+                **self._counters,
+                "contexts": len(self._contexts),
+                "entries": sum(len(c.entries) for c in self._contexts.values()),
+                "threshold": self.threshold,
+                "reuse_rate": round(self._counters["reuses"] / lookups, 4) if lookups else 0.0,
+                "killed_npcs": sorted(self.killed)
+            }
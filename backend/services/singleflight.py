@@ -0,0 +1,73 @@
+"""
+═══════════════════════════════════════════════════════════════════════════════
+LINGUAVERSE - Single-Flight Request Coalescing
+Concurrent identical upstream calls share one in-flight request
+═══════════════════════════════════════════════════════════════════════════════
+"""
+
+import asyncio
+from typing import Dict, Any, Callable, Awaitable, Optional
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one upstream call.
+
+    The first caller for a key starts the work as a task; callers arriving
+    while it runs await the same task. The task is shielded, so one
+    caller disconnecting does not cancel the call for the others. Once it
+    finishes the key is released and the next call starts fresh.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() for key, or join the call already running for it."""
+        task = self._in_flight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t, k=key: self._release(k, t))
+        else:
+            self.coalesced += 1
+
+        return await asyncio.shield(task)
+
+    def lead(self, key: str) -> Optional[asyncio.Future]:
+        """
+        Claim key for a call the caller runs itself (e.g. a stream it relays).
+
+        Returns a future for the caller to resolve with the result, which
+        do() and pending() callers for key wait on; None if a call for key
+        is already in flight.
+        """
+        if key in self._in_flight:
+            return None
+        self.leaders += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        future.add_done_callback(lambda f, k=key: self._release(k, f))
+        return future
+
+    def pending(self, key: str) -> Optional[asyncio.Future]:
+        """Return the in-flight task (or led future) for key, if any."""
+        return self._in_flight.get(key)
+
+    def _release(self, key: str, task: asyncio.Future):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the exception retrieved even if every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._in_flight),
+            "upstream_calls": self.leaders,
+            "coalesced": self.coalesced
+        }
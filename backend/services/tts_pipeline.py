@@ -0,0 +1,104 @@
+"""
+═══════════════════════════════════════════════════════════════════════════════
+LINGUAVERSE - Sentence-Pipelined TTS
+Split NPC replies into speakable segments and synthesize them concurrently
+═══════════════════════════════════════════════════════════════════════════════
+"""
+
+import re
+import asyncio
+from typing import Optional, List, AsyncGenerator, Callable, Awaitable
+
+
+# Voice tags the NPC prompt allows, e.g. "[sadly]", "[excited]"
+TAG_PATTERN = re.compile(r"\[([A-Za-z][A-Za-z ]*)\]")
+
+# Sentence end: terminal punctuation (optionally closed by a quote/bracket) then whitespace
+SENTENCE_END_PATTERN = re.compile(r"[.!?…]+['\")]*\s+")
+
+# Markers that steer game logic and must never be spoken
+CONTROL_TAGS = {"DONE"}
+
+
+class SegmentSplitter:
+    """
+    Incrementally split text into speakable segments.
+
+    Segments end at sentence boundaries and at voice tags. The active voice
+    tag is carried onto every following segment so each one keeps the tone
+    it had in the full reply. Text can be fed in arbitrary pieces (e.g. LLM
+    tokens); only complete segments are emitted until flush().
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._tag: Optional[str] = None
+
+    def feed(self, text: str) -> List[str]:
+        """Add text and return any segments that are now complete."""
+        self._buffer += text
+        segments = []
+
+        while True:
+            tag_match = TAG_PATTERN.search(self._buffer)
+            end_match = SENTENCE_END_PATTERN.search(self._buffer)
+
+            if tag_match and (not end_match or tag_match.start() < end_match.end()):
+                self._emit(self._buffer[:tag_match.start()], segments)
+                if tag_match.group(1).upper() not in CONTROL_TAGS:
+                    self._tag = tag_match.group(0)
+                self._buffer = self._buffer[tag_match.end():]
+            elif end_match:
+                self._emit(self._buffer[:end_match.end()], segments)
+                self._buffer = self._buffer[end_match.end():]
+            else:
+                break
+
+        return segments
+
+    def flush(self) -> List[str]:
+        """Return whatever text remains as a final segment."""
+        segments = []
+        self._emit(self._buffer, segments)
+        self._buffer = ""
+        return segments
+
+    def _emit(self, text: str, segments: List[str]):
+        text = text.strip()
+        if not text:
+            return
+        segments.append(f"{self._tag} {text}" if self._tag else text)
+
+
+def split_reply(text: str) -> List[str]:
+    """Split a complete NPC reply into speakable segments."""
+    splitter = SegmentSplitter()
+    return splitter.feed(text) + splitter.flush()
+
+
+async def synthesize_segments(
+    segments: List[str],
+    synthesize: Callable[[str], Awaitable[bytes]],
+    max_concurrency: int = 3
+) -> AsyncGenerator[bytes, None]:
+    """
+    Synthesize segments concurrently and yield their audio in order.
+
+    At most max_concurrency upstream calls run at once. Earlier segments
+    acquire the semaphore first, so the first clip is ready as early as
+    possible; later clips render while it plays.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def render(segment: str) -> bytes:
+        async with semaphore:
+            return await synthesize(segment)
+
+    tasks = [asyncio.create_task(render(segment)) for segment in segments]
+    try:
+        for task in tasks:
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,198 @@
+"""
+═══════════════════════════════════════════════════════════════════════════════
+LINGUAVERSE - Full-Duplex Voice Turns
+Final transcript → streamed NPC reply → sentence-chunked TTS on one socket
+═══════════════════════════════════════════════════════════════════════════════
+"""
+
+import os
+import json
+import time
+import asyncio
+from typing import Optional, Dict, Any, List, Callable, Awaitable, AsyncIterator
+from dotenv import load_dotenv
+
+from services.tts_pipeline import SegmentSplitter
+from services.metrics_service import metrics
+
+load_dotenv()
+
+# Segments rendering at once; the head segment streams while the next ones render
+VOICE_TTS_CONCURRENCY = int(os.getenv("VOICE_TTS_CONCURRENCY", "2"))
+
+
+class VoiceTurnPipeline:
+    """
+    Runs NPC turns for one voice conversation socket.
+
+    Each final transcript starts a turn that overlaps three stages: reply
+    tokens stream from the LLM (and are forwarded as "npc_token"), every
+    complete sentence goes to TTS as soon as the splitter emits it, and
+    audio is written to the socket as binary frames in sentence order
+    while later sentences are still generating or rendering. Up to
+    tts_concurrency sentences render at once; each one streams, so the
+    first audible syllable only waits for the first sentence's first
+    upstream chunk.
+
+    A new final while a turn is running interrupts it (barge-in). If the
+    interrupted reply had not finished, the user's words are merged into
+    the new turn so nothing they said is lost.
+
+    Messages per turn, in order: turn_start, npc_token*, npc_reply (the
+    structured /respond payload), turn_end; audio frames interleave after
+    turn_start. All writes go through one lock so the relay's transcript
+    messages and the turn's frames never interleave mid-send.
+    """
+
+    def __init__(
+        self,
+        send_text: Callable[[str], Awaitable[None]],
+        send_bytes: Callable[[bytes], Awaitable[None]],
+        reply_stream: Callable[[str], AsyncIterator[str]],
+        synthesize: Callable[[str], AsyncIterator[bytes]],
+        on_reply: Callable[[str, str], Dict[str, Any]],
+        tts_concurrency: int = VOICE_TTS_CONCURRENCY,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self._send_text = send_text
+        self._send_bytes = send_bytes
+        self._reply_stream = reply_stream
+        self._synthesize = synthesize
+        self._on_reply = on_reply
+        self.tts_concurrency = max(1, tts_concurrency)
+        self._clock = clock
+        self._lock = asyncio.Lock()
+
+        self.turns = 0
+        self.interrupted = 0
+        self._task: Optional[asyncio.Task] = None
+        self._pending_text: Optional[str] = None  # user text of an unfinished reply
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # SOCKET WRITES
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    async def send_text(self, text: str):
+        """Serialized text write; also handed to the relay for transcripts."""
+        async with self._lock:
+            await self._send_text(text)
+
+    async def send_json(self, message: Dict[str, Any]):
+        await self.send_text(json.dumps(message, ensure_ascii=False, separators=(",", ":")))
+
+    async def send_bytes(self, data: bytes):
+        async with self._lock:
+            await self._send_bytes(data)
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # TURNS
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def on_transcript(self, message: Dict[str, Any]):
+        """Relay hook: a non-empty final transcript starts a turn."""
+        if message.get("type") == "final" and (message.get("text") or "").strip():
+            self.start_turn(message["text"].strip())
+
+    def start_turn(self, text: str):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            self.interrupted += 1
+            metrics.inc("voice.turns_interrupted")
+        if self._pending_text:
+            text = f"{self._pending_text} {text}"
+
+        self.turns += 1
+        self._pending_text = text
+        self._task = asyncio.create_task(self._run_turn(self.turns, text, self._clock()))
+
+    async def _run_turn(self, turn: int, text: str, heard_at: float):
+        semaphore = asyncio.Semaphore(self.tts_concurrency)
+        order: asyncio.Queue = asyncio.Queue()  # one chunk queue per segment, in order
+        renders: List[asyncio.Task] = []
+        splitter = SegmentSplitter()
+
+        async def render(segment: str, out: asyncio.Queue):
+            try:
+                async with semaphore:
+                    async for chunk in self._synthesize(segment):
+                        if chunk:
+                            out.put_nowait(chunk)
+            except Exception as e:
+                print(f"Voice turn TTS error: {e}")
+                metrics.inc("voice.tts_errors")
+            finally:
+                out.put_nowait(None)
+
+        def schedule(segment: str):
+            out: asyncio.Queue = asyncio.Queue()
+            renders.append(asyncio.create_task(render(segment, out)))
+            order.put_nowait(out)
+
+        async def speak():
+            first = True
+            while True:
+                out = await order.get()
+                if out is None:
+                    return
+                while True:
+                    chunk = await out.get()
+                    if chunk is None:
+                        break
+                    if first:
+                        metrics.observe("voice.first_audio_ms", (self._clock() - heard_at) * 1000)
+                        first = False
+                    await self.send_bytes(chunk)
+
+        speaker = asyncio.create_task(speak())
+        try:
+            await self.send_json({"type": "turn_start", "turn": turn, "transcript": text})
+
+            parts: List[str] = []
+            try:
+                async for token in self._reply_stream(text):
+                    if not parts:
+                        metrics.observe("voice.first_token_ms", (self._clock() - heard_at) * 1000)
+                    parts.append(token)
+                    await self.send_json({"type": "npc_token", "turn": turn, "text": token})
+                    for segment in splitter.feed(token):
+                        schedule(segment)
+            except Exception as e:
+                print(f"Voice turn reply error: {e}")
+                metrics.inc("voice.reply_errors")
+                order.put_nowait(None)
+                await self.send_json({"type": "error", "turn": turn, "message": str(e)})
+                return
+
+            for segment in splitter.flush():
+                schedule(segment)
+            order.put_nowait(None)
+
+            payload = self._on_reply(text, "".join(parts))
+            self._pending_text = None
+            await self.send_json({"type": "npc_reply", "turn": turn, **payload})
+
+            await speaker
+            metrics.observe("voice.turn_ms", (self._clock() - heard_at) * 1000)
+            await self.send_json({"type": "turn_end", "turn": turn})
+        except Exception as e:
+            # Usually the client went away mid-turn
+            print(f"Voice turn error: {e}")
+        finally:
+            speaker.cancel()
+            for task in renders:
+                task.cancel()
+            await asyncio.gather(speaker, *renders, return_exceptions=True)
+
+    async def wait(self, timeout: Optional[float] = None):
+        """Let the current turn finish (e.g. after the client's eos)."""
+        if self._task is not None and not self._task.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(self._task), timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                pass
+
+    async def close(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
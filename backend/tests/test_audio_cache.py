@@ -0,0 +1,42 @@
+from services.audio_cache_service import AudioCache
+
+
+def test_key_is_order_independent():
+    a = AudioCache.make_key({"text": "Cześć", "voice_id": "abc", "voice_settings": {"stability": 0.5, "style": 0.5}})
+    b = AudioCache.make_key({"voice_settings": {"style": 0.5, "stability": 0.5}, "voice_id": "abc", "text": "Cześć"})
+    assert a == b
+
+def test_memory_hit_and_miss(tmp_path):
+    cache = AudioCache(cache_dir=str(tmp_path))
+    assert cache.get("missing") is None
+    cache.put("k1", b"audio")
+    assert cache.get("k1") == b"audio"
+
+    stats = cache.stats()
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 1
+
+def test_memory_lru_eviction_falls_back_to_disk(tmp_path):
+    cache = AudioCache(cache_dir=str(tmp_path), max_memory_items=2)
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    cache.put("c", b"3")
+
+    assert cache.stats()["memory_evictions"] == 1
+    assert cache.get("a") == b"1"
+    assert cache.stats()["disk_hits"] == 1
+
+def test_disk_cap_evicts_oldest(tmp_path):
+    cache = AudioCache(cache_dir=str(tmp_path), max_memory_items=1, max_disk_bytes=10)
+    cache.put("a", b"x" * 6)
+    cache.put("b", b"y" * 6)
+
+    stats = cache.stats()
+    assert stats["disk_evictions"] == 1
+    assert stats["disk_bytes"] <= 10
+    assert cache.get("a") is None
+
+def test_disk_index_survives_restart(tmp_path):
+    AudioCache(cache_dir=str(tmp_path)).put("greeting", b"mp3")
+    cache = AudioCache(cache_dir=str(tmp_path))
+    assert cache.get("greeting") == b"mp3"
@@ -0,0 +1,24 @@
+import pytest
+
+from services.audio_formats import negotiate_audio_format
+
+
+def test_default_is_mp3():
+    assert negotiate_audio_format().name == "mp3_128"
+    assert negotiate_audio_format(accept="*/*").name == "mp3_128"
+
+def test_explicit_format_wins_over_accept():
+    assert negotiate_audio_format("opus_32", "audio/mpeg").name == "opus_32"
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        negotiate_audio_format("flac")
+
+def test_accept_header_respects_quality():
+    fmt = negotiate_audio_format(accept="audio/mpeg;q=0.5, audio/ogg")
+    assert fmt.name == "opus_64"
+    assert fmt.media_type == "audio/ogg"
+
+def test_pcm_rate_from_accept():
+    assert negotiate_audio_format(accept="audio/pcm;rate=16000").name == "pcm_16000"
+    assert negotiate_audio_format(accept="audio/pcm").name == "pcm_24000"
@@ -0,0 +1,203 @@
+import io
+import wave
+
+import numpy as np
+
+import pytest
+
+from services.audio_processing import (
+    StreamingResampler, StreamingVAD, frame_speech_mask, parse_input_format, prepare_wav_for_stt
+)
+
+RATE = 16000
+
+
+def tone(seconds, amplitude=8000, freq=220):
+    t = np.arange(int(RATE * seconds)) / RATE
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.int16)
+
+def silence(seconds):
+    return np.zeros(int(RATE * seconds), dtype=np.int16)
+
+def to_wav(samples, rate=RATE, channels=1):
+    out = io.BytesIO()
+    with wave.open(out, "wb") as writer:
+        writer.setnchannels(channels)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes(samples.tobytes())
+    return out.getvalue()
+
+
+def test_frame_mask_separates_tone_from_silence():
+    mask = frame_speech_mask(np.concatenate([silence(0.1), tone(0.1)]), RATE)
+    assert not mask[:5].any()
+    assert mask[5:].all()
+
+def test_prepare_wav_trims_leading_and_trailing_silence():
+    wav = to_wav(np.concatenate([silence(1.0), tone(0.5), silence(1.0)]))
+    trimmed, info = prepare_wav_for_stt(wav)
+    assert len(trimmed) < len(wav)
+    assert 1.4 < info["seconds_trimmed"] < 1.7
+
+def test_all_silent_16k_mono_wav_is_left_alone():
+    wav = to_wav(silence(0.5))
+    prepared, info = prepare_wav_for_stt(wav)
+    assert prepared is wav
+    assert info["seconds_trimmed"] == 0.0
+
+def test_prepare_wav_downmixes_and_resamples():
+    stereo = np.repeat(tone(1.0), 2)  # identical L/R, treated as 48 kHz below
+    prepared, info = prepare_wav_for_stt(to_wav(stereo, rate=48000, channels=2), trim=False)
+    with wave.open(io.BytesIO(prepared), "rb") as reader:
+        assert reader.getnchannels() == 1
+        assert reader.getframerate() == 16000
+        assert abs(reader.getnframes() - 16000 // 3) <= 2
+    assert info["resampled"] and info["downmixed"]
+
+def test_resampler_output_is_independent_of_chunking():
+    source = tone(0.5, freq=440)
+    source = (source[:len(source) // 3 * 3]).tobytes()  # 48 kHz input, 3:1
+
+    whole = StreamingResampler(48000, 16000)
+    expected = whole.process(source) + whole.flush()
+
+    chunked = StreamingResampler(48000, 16000)
+    pieces = [source[i:i + 999] for i in range(0, len(source), 999)]  # splits mid-sample too
+    actual = b"".join(chunked.process(p) for p in pieces) + chunked.flush()
+
+    assert actual == expected
+    assert abs(len(expected) // 2 - len(source) // 6) <= 1
+
+def test_streaming_vad_suppresses_silence_with_hangover():
+    vad = StreamingVAD(RATE, hangover_ms=128, preroll_ms=64)
+    chunk = 1024
+    quiet = silence(chunk / RATE).tobytes()
+    loud = tone(chunk / RATE).tobytes()
+
+    assert vad.process(quiet) == []
+    assert vad.process(quiet) == []
+    # Onset releases one pre-roll chunk ahead of the voiced chunk
+    assert vad.process(loud) == [quiet, loud]
+    # Hangover keeps two silent chunks flowing, then the gate closes
+    assert vad.process(quiet) == [quiet]
+    assert vad.process(quiet) == [quiet]
+    assert vad.process(quiet) == []
+    assert vad.bytes_suppressed == len(quiet)
+
+def test_prepare_wav_reads_file_objects_in_chunks():
+    wav = to_wav(np.concatenate([silence(1.0), tone(2.0), silence(1.0)]))
+    expected, _ = prepare_wav_for_stt(wav)
+
+    class ChunkedFile(io.BytesIO):
+        largest = 0
+
+        def read(self, size=-1):
+            data = super().read(size)
+            ChunkedFile.largest = max(ChunkedFile.largest, len(data))
+            return data
+
+    prepared, info = prepare_wav_for_stt(ChunkedFile(wav))
+    assert prepared == expected
+    assert ChunkedFile.largest < len(wav) // 2
+
+    untouched = io.BytesIO(to_wav(silence(0.5)))
+    assert prepare_wav_for_stt(untouched)[0] is untouched
+
+def test_transcribe_sends_trimmed_wav_upstream(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from main import app
+    from services.elevenlabs_service import elevenlabs_service
+
+    sent = []
+
+    async def fake_stt(audio_content, **kwargs):
+        sent.append(audio_content)
+        return {"text": "cześć", "language_detected": "pl"}
+
+    monkeypatch.setattr(elevenlabs_service, "speech_to_text_async", fake_stt)
+    wav = to_wav(np.concatenate([silence(1.0), tone(0.5), silence(1.0)]))
+
+    response = TestClient(app).post("/api/transcribe", files={"audio": ("clip.wav", wav, "audio/wav")})
+    assert response.status_code == 200
+    assert response.json()["text"] == "cześć"
+    assert isinstance(sent[0], bytes) and len(sent[0]) < len(wav)
+
+def test_upsampled_upload_counts_only_trimmed_bytes(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from main import app
+    from services.elevenlabs_service import elevenlabs_service
+    from services.metrics_service import metrics
+
+    async def fake_stt(audio_content, **kwargs):
+        return {"text": ""}
+
+    monkeypatch.setattr(elevenlabs_service, "speech_to_text_async", fake_stt)
+    counted = []
+    monkeypatch.setattr(metrics, "inc", lambda name, value=1: counted.append((name, value)))
+
+    # 8 kHz audio grows when upsampled; only the trimmed silence is a saving
+    samples = np.concatenate([silence(1.0), tone(1.0), silence(1.0)])[::2]
+    wav = to_wav(samples, rate=8000)
+    TestClient(app).post("/api/transcribe", files={"audio": ("clip.wav", wav, "audio/wav")})
+
+    saved = dict(counted)["vad.upload_bytes_saved"]
+    assert abs(saved - 1.6 * RATE * 2) < 0.2 * RATE * 2
+
+def test_input_format_is_range_checked():
+    assert parse_input_format(48000, 2) == (48000, 2)
+    assert parse_input_format("44100", 1.0) == (44100, 1)
+    for rate, channels in [(0, 1), (-16000, 1), (10 ** 9, 1), ("fast", 1), (None, 1), (16000.5, 1),
+                           (16000, 0), (16000, 64), (16000, True)]:
+        with pytest.raises(ValueError):
+            parse_input_format(rate, channels)
+    with pytest.raises(ValueError):
+        StreamingResampler(0)
+
+def test_bad_realtime_config_keeps_the_session_and_its_format(monkeypatch):
+    import asyncio
+
+    from fastapi.testclient import TestClient
+
+    from main import app
+    from services.elevenlabs_service import elevenlabs_service
+
+    class SilentSession:
+        is_connected = is_open = True
+
+        async def send_audio(self, chunk):
+            return True
+
+        async def receive_transcript(self):
+            await asyncio.sleep(3600)
+
+        async def end_stream(self):
+            pass
+
+        async def close(self):
+            self.is_connected = False
+
+    async def lease(language_hint=None, sample_rate=16000):
+        return SilentSession()
+
+    monkeypatch.setattr(elevenlabs_service, "lease_realtime_session", lease)
+
+    def next_reply(ws):
+        while True:
+            message = ws.receive_json()
+            if message["type"] in ("error", "config_updated"):
+                return message
+
+    with TestClient(app).websocket_connect("/api/transcribe/realtime") as ws:
+        ws.send_json({"type": "config", "sample_rate": 48000, "channels": 2})
+        assert next_reply(ws)["sample_rate"] == 48000
+        for bad in [{"sample_rate": 0}, {"sample_rate": "fast"}, {"channels": -1}, {"sample_rate": 10 ** 9}]:
+            ws.send_json({"type": "config", **bad})
+            assert next_reply(ws)["type"] == "error"
+        ws.send_bytes(b"\x00\x00" * 480)
+        ws.send_json({"type": "config", "sample_rate": 48000, "channels": 2})
+        updated = next_reply(ws)
+        assert (updated["sample_rate"], updated["channels"]) == (48000, 2)
+        ws.send_json({"type": "eos"})
@@ -0,0 +1,42 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from services.audio_response import audio_response, make_etag
+
+CLIP = bytes(range(100))
+
+app = FastAPI()
+
+@app.get("/clip")
+async def clip(request: Request):
+    return audio_response(request, CLIP, media_type="audio/mpeg", filename="clip.mp3")
+
+client = TestClient(app)
+
+
+def test_full_response_has_validators():
+    response = client.get("/clip")
+    assert response.status_code == 200
+    assert response.content == CLIP
+    assert response.headers["etag"] == make_etag(CLIP)
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["accept-ranges"] == "bytes"
+
+def test_if_none_match_returns_304():
+    response = client.get("/clip", headers={"If-None-Match": make_etag(CLIP)})
+    assert response.status_code == 304
+    assert response.content == b""
+
+def test_byte_ranges():
+    response = client.get("/clip", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == CLIP[10:20]
+    assert response.headers["content-range"] == "bytes 10-19/100"
+
+    response = client.get("/clip", headers={"Range": "bytes=-5"})
+    assert response.content == CLIP[-5:]
+
+def test_unsatisfiable_range():
+    response = client.get("/clip", headers={"Range": "bytes=500-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */100"
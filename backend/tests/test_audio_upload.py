@@ -0,0 +1,99 @@
+import asyncio
+import hashlib
+import io
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from fastapi.testclient import TestClient
+
+from main import app
+from services.audio_upload import UploadSizeLimitMiddleware, read_audio_upload, sniff_audio_format
+
+WAV_HEADER = b"RIFF\x24\x00\x00\x00WAVEfmt "
+
+
+def read(data, max_bytes=1024):
+    return asyncio.run(read_audio_upload(UploadFile(io.BytesIO(data), filename="clip"), max_bytes=max_bytes))
+
+def test_sniffs_common_containers():
+    headers = {
+        WAV_HEADER: "wav",
+        b"OggS\x00\x02": "ogg",
+        b"fLaC\x00\x00": "flac",
+        b"\x1a\x45\xdf\xa3\x01": "webm",
+        b"\x00\x00\x00\x20ftypM4A ": "mp4",
+        b"ID3\x04\x00": "mp3",
+        b"\xff\xfb\x90\x00": "mp3",
+        b"\xff\xf1\x50\x80": "aac"
+    }
+    for header, audio_format in headers.items():
+        assert sniff_audio_format(header) == audio_format
+    assert sniff_audio_format(b"RIFF\x24\x00\x00\x00AVI ") is None
+    assert sniff_audio_format(b"<html>") is None
+    assert sniff_audio_format(b"") is None
+
+def test_valid_upload_is_hashed_and_rewound():
+    data = WAV_HEADER + bytes(200)
+    upload = read(data)
+    assert (upload.format, upload.content_type, upload.size) == ("wav", "audio/wav", len(data))
+    assert upload.sha256 == hashlib.sha256(data).hexdigest()
+    assert upload.file.read() == data
+
+def test_rejected_uploads_get_their_status():
+    for data, status in [(b"", 400), (WAV_HEADER + bytes(2000), 413), (b"not audio at all", 415)]:
+        with pytest.raises(HTTPException) as error:
+            read(data)
+        assert error.value.status_code == status
+
+def test_transcribe_endpoint_reports_upload_errors():
+    client = TestClient(app)
+    empty = client.post("/api/transcribe", files={"audio": ("clip.wav", b"", "audio/wav")})
+    text = client.post("/api/transcribe", files={"audio": ("clip.wav", b"hello", "audio/wav")})
+    assert (empty.status_code, text.status_code) == (400, 415)
+
+def test_chunked_body_is_cut_off_at_the_limit():
+    seen = []
+
+    async def app(scope, receive, send):
+        while True:
+            message = await receive()
+            seen.append(message["type"])
+            if message["type"] == "http.disconnect":
+                raise RuntimeError("client went away")
+            if not message.get("more_body"):
+                break
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def run(path):
+        middleware = UploadSizeLimitMiddleware(app, paths=["/api/transcribe"], max_bytes=100)
+        chunks = [{"type": "http.request", "body": bytes(40), "more_body": True} for _ in range(5)]
+        chunks.append({"type": "http.request", "body": b"", "more_body": False})
+        sent = []
+
+        async def receive():
+            return chunks.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        # No Content-Length: only counting the stream can catch it
+        await middleware({"type": "http", "path": path, "headers": []}, receive, send)
+        return sent
+
+    sent = asyncio.run(run("/api/transcribe"))
+    assert [m.get("status") for m in sent if m["type"] == "http.response.start"] == [413]
+    assert seen == ["http.request", "http.request", "http.disconnect"]
+
+    seen.clear()
+    sent = asyncio.run(run("/api/other"))
+    assert sent[0]["status"] == 200 and len(seen) == 6
+
+def test_oversize_upload_413_carries_cors_headers():
+    response = TestClient(app).post(
+        "/api/transcribe",
+        content=b"x",
+        headers={"Origin": "http://localhost:3000", "Content-Length": str(1 << 40)}
+    )
+    assert response.status_code == 413
+    assert response.headers["access-control-allow-origin"]
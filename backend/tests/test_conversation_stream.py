@@ -0,0 +1,73 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from main import app
+from routers import conversation
+from services.npc_service import npc_service, parse_reply
+
+client = TestClient(app)
+
+
+def sse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+def test_parse_reply_collects_glosses_and_corrections():
+    parsed = parse_reply("Cześć! (Hello!) Instead of 'kota jest', we say 'kot jest'. Say 'tak' (yes).")
+    assert parsed["translation"] == "Hello!; yes"
+    assert parsed["vocabulary"] == [
+        {"word": "Cześć", "translation": "Hello"},
+        {"word": "tak", "translation": "yes"}
+    ]
+    assert parsed["correction"] == "Instead of 'kota jest', we say 'kot jest'."
+
+def test_parse_reply_without_teaching_fields():
+    assert parse_reply("Meow...") == {"translation": None, "correction": None, "vocabulary": []}
+
+def test_stream_sends_tokens_then_structured_done(monkeypatch):
+    async def fake_stream(**kwargs):
+        assert kwargs["player_input"] == "Gdzie jest kot?"
+        for piece in ["Kot (cat) ", "jest w ", "ogrodzie."]:
+            yield piece
+
+    learned = []
+    monkeypatch.setattr(npc_service, "stream_npc_response", fake_stream)
+    monkeypatch.setattr(conversation.lesson_service, "add_vocabulary_word", lambda *args: learned.append(args[2]))
+
+    response = client.post("/api/conversation/respond/stream", json={
+        "language": "pl",
+        "userInput": "Gdzie jest kot?",
+        "sessionId": "stream-test"
+    })
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = sse_events(response.text)
+    assert [e for e, _ in events] == ["token", "token", "token", "done"]
+    done = events[-1][1]
+    assert done["response"] == "Kot (cat) jest w ogrodzie."
+    assert done["translation"] == "cat"
+    assert done["new_vocabulary"] == [{"word": "Kot", "translation": "cat"}]
+    assert done["turn_count"] == 1
+    assert learned == [{"word": "Kot", "translation": "cat"}]
+
+def test_stream_failure_ends_with_error_event_and_no_turn(monkeypatch):
+    async def failing_stream(**kwargs):
+        raise RuntimeError("overloaded")
+        yield
+
+    monkeypatch.setattr(npc_service, "stream_npc_response", failing_stream)
+
+    response = client.post("/api/conversation/respond/stream", json={
+        "language": "pl",
+        "user_input": "Cześć",
+        "session_id": "stream-error-test"
+    })
+    (event, data), = sse_events(response.text)
+    assert event == "error"
+    assert data["error"] == "overloaded"
+    assert conversation.active_sessions["stream-error-test"]["turn_count"] == 0
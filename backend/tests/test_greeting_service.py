@@ -0,0 +1,79 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from main import app
+from routers import conversation
+from services.audio_cache_service import AudioCache
+from services.elevenlabs_service import elevenlabs_service
+from services.greeting_service import GreetingService
+from services.npc_service import npc_service
+
+client = TestClient(app)
+
+
+def fake_tts(calls, fail_on=None):
+    async def render(text, character_id, voice_id=None, **kwargs):
+        calls.append((text, voice_id))
+        if text == fail_on:
+            raise RuntimeError("quota exceeded")
+        return f"audio:{text}".encode()
+    return render
+
+def test_every_npc_greeting_is_a_known_clip(tmp_path):
+    service = GreetingService(store=AudioCache(cache_dir=str(tmp_path)))
+    text, clip_id = service.get_greeting("mati")
+    assert text == npc_service.get_initial_greeting("mati")
+    assert service.clips[clip_id]["voice_id"] == npc_service.get_voice_id("mati")
+    assert len(service.clips) == len(npc_service.static_greetings)
+    assert service.get_greeting("stranger") == ("...", None)
+
+def test_audio_url_is_content_addressed():
+    assert GreetingService.audio_url("abc123") == "/api/conversation/audio/abc123.mp3"
+    assert GreetingService.audio_url("abc123", "ogg") == "/api/conversation/audio/abc123.ogg"
+
+def test_prerender_fills_the_store_once(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(elevenlabs_service, "text_to_speech_async", fake_tts(calls, fail_on="Meow..."))
+    service = GreetingService(store=AudioCache(cache_dir=str(tmp_path)))
+
+    summary = asyncio.run(service.prerender())
+    assert summary == {"total": 5, "rendered": 4, "already_stored": 0, "failed": 1}
+    _, clip_id = service.get_greeting("jade")
+    assert service.get_audio(clip_id) == f"audio:{npc_service.get_initial_greeting('jade')}".encode()
+
+    calls.clear()
+    summary = asyncio.run(service.prerender())
+    assert summary["already_stored"] == 4 and calls == [("Meow...", npc_service.get_voice_id("kitty"))]
+
+def test_start_returns_greeting_audio_url_served_on_demand(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(elevenlabs_service, "text_to_speech_async", fake_tts(calls))
+    service = GreetingService(store=AudioCache(cache_dir=str(tmp_path)))
+    monkeypatch.setattr(conversation, "greeting_service", service)
+
+    started = client.post("/api/conversation/start", json={"npc_id": "child"}).json()
+    assert started["greeting"] == npc_service.get_initial_greeting("child")
+
+    # Not pre-rendered yet: the first GET renders it, the second is served from the store
+    for _ in range(2):
+        response = client.get(started["audio_url"])
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "audio/mpeg"
+        assert response.content == f"audio:{started['greeting']}".encode()
+    assert len(calls) == 1
+
+def test_unknown_audio_id_is_404(tmp_path, monkeypatch):
+    monkeypatch.setattr(conversation, "greeting_service", GreetingService(store=AudioCache(cache_dir=str(tmp_path))))
+    assert client.get("/api/conversation/audio/" + "0" * 64 + ".mp3").status_code == 404
+    assert client.get("/api/conversation/audio/whatever.wav").status_code == 404
+
+def test_extension_must_match_the_stored_format(tmp_path, monkeypatch):
+    monkeypatch.setattr(elevenlabs_service, "text_to_speech_async", fake_tts([]))
+    service = GreetingService(store=AudioCache(cache_dir=str(tmp_path)))
+    monkeypatch.setattr(conversation, "greeting_service", service)
+    _, clip_id = service.get_greeting("bird")
+
+    assert service.clip_format(clip_id).extension == "mp3"
+    assert client.get(f"/api/conversation/audio/{clip_id}.ogg").status_code == 404
+    assert client.get(f"/api/conversation/audio/{clip_id}").headers["content-type"] == "audio/mpeg"
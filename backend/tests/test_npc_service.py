@@ -0,0 +1,51 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from services.metrics_service import metrics
+from services.npc_service import npc_service, CACHE_CONTROL
+
+
+def test_every_prompt_combination_is_precompiled_and_read_only():
+    assert len(npc_service.system_prompts) == (len(npc_service.personas) + 1) * 5 * 5
+    with pytest.raises(TypeError):
+        npc_service.system_prompts[("mati", 1, 1)] = "changed"
+
+def test_lookup_matches_the_composed_prompt():
+    prompt = npc_service.build_system_prompt("mati", 2, 3)
+    assert prompt is npc_service.system_prompts[("mati", 2, 3)]
+    assert prompt == npc_service._compose_system_prompt("mati", 2, 3)
+    assert "saw the cat run towards the Alley" in prompt
+    # Unknown NPCs share the default-persona entries
+    assert npc_service.build_system_prompt("amélie", 1, 1) is npc_service.system_prompts[(None, 1, 1)]
+
+def test_out_of_range_difficulty_is_composed_on_demand():
+    assert "Difficulty 7" in npc_service.build_system_prompt("jade", 1, 7)
+
+def test_only_the_system_prompt_carries_a_cache_breakpoint():
+    (block,) = npc_service.build_system("kitty", 4, 1)
+    assert block["cache_control"] == CACHE_CONTROL
+    messages = npc_service.build_messages("Kici kici", [
+        {"role": "user", "content": "Cześć"},
+        {"role": "assistant", "content": "Miau?", "translation": "Meow?"}
+    ])
+    assert messages[:2] == [{"role": "user", "content": "Cześć"}, {"role": "assistant", "content": "Miau?"}]
+    assert messages[-1] == {"role": "user", "content": "Kici kici"}
+
+def test_cache_usage_is_recorded(monkeypatch):
+    usage = SimpleNamespace(input_tokens=20, cache_read_input_tokens=400, cache_creation_input_tokens=0, output_tokens=30)
+    sent = {}
+
+    async def create(**kwargs):
+        sent.update(kwargs)
+        return SimpleNamespace(content=[SimpleNamespace(text="Tak (yes).")], usage=usage)
+
+    monkeypatch.setattr(npc_service.async_client.messages, "create", create)
+    before = metrics.snapshot()["counters"].get("llm.cache_read_input_tokens", 0)
+
+    reply = asyncio.run(npc_service.get_npc_response("Czy to kot?", "child", [], {"step": 1}, 1))
+
+    assert reply["translation"] == "yes"
+    assert sent["system"][0]["text"] is npc_service.system_prompts[("child", 1, 1)]
+    assert metrics.snapshot()["counters"]["llm.cache_read_input_tokens"] - before == 400
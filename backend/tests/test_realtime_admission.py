@@ -0,0 +1,117 @@
+import asyncio
+import time
+
+from services.realtime_admission import GlobalSlots, RealtimeAdmission
+
+
+async def ignore(message):
+    pass
+
+
+def test_admits_up_to_the_cap_then_rejects_when_queue_is_full():
+    async def run():
+        admission = RealtimeAdmission(max_sessions=2, queue_max=0)
+        tickets = [await admission.admit(ignore) for _ in range(3)]
+        return admission, tickets
+
+    admission, tickets = asyncio.run(run())
+    assert tickets[0] and tickets[1] and tickets[2] is None
+    assert admission.stats()["active"] == 2
+
+def test_queued_client_sees_its_position_and_gets_the_freed_slot():
+    async def run():
+        admission = RealtimeAdmission(max_sessions=1, queue_max=2, queue_timeout=2, preempt_silence=60, poll_interval=0.01)
+        first = await admission.admit(ignore)
+        updates = []
+
+        async def notify(message):
+            updates.append(message)
+
+        waiting = asyncio.create_task(admission.admit(notify))
+        await asyncio.sleep(0.05)
+        admission.release(first)
+        return await waiting, updates
+
+    ticket, updates = asyncio.run(run())
+    assert ticket is not None
+    assert updates == [{"type": "queued", "position": 1, "queue_length": 1}]
+
+def test_queue_timeout_returns_busy():
+    async def run():
+        admission = RealtimeAdmission(max_sessions=1, queue_max=1, queue_timeout=0.05, preempt_silence=60, poll_interval=0.01)
+        await admission.admit(ignore)
+        return await admission.admit(ignore)
+
+    assert asyncio.run(run()) is None
+
+def test_waiting_client_preempts_the_longest_silent_session():
+    async def run():
+        admission = RealtimeAdmission(max_sessions=2, queue_max=1, queue_timeout=0.2, preempt_silence=5, poll_interval=0.01)
+        talker = await admission.admit(ignore)
+        silent = await admission.admit(ignore)
+        silent.last_speech = time.monotonic() - 30
+        waiting = asyncio.create_task(admission.admit(ignore))
+        reason = await asyncio.wait_for(silent.wait_reclaimed(), 1)
+        admission.release(silent)
+        return talker, reason, await waiting
+
+    talker, reason, ticket = asyncio.run(run())
+    assert reason == "preempted"
+    assert not talker.is_reclaimed
+    assert ticket is not None
+
+def test_reaper_reclaims_dead_and_idle_sessions():
+    async def run():
+        admission = RealtimeAdmission(max_sessions=3, heartbeat_timeout=10, idle_timeout=30)
+        dead, idle, active = [await admission.admit(ignore) for _ in range(3)]
+        dead.last_seen = dead.last_speech = time.monotonic() - 11
+        idle.last_speech = time.monotonic() - 31
+        admission.reap()
+        return dead, idle, active
+
+    dead, idle, active = asyncio.run(run())
+    assert dead.reason == "heartbeat_timeout"
+    assert idle.reason == "idle_timeout"
+    assert not active.is_reclaimed
+
+def test_global_slots_are_shared_through_lock_files(tmp_path):
+    slots = GlobalSlots(2, str(tmp_path))
+    if not slots.enabled:
+        return  # no fcntl on this platform
+    a, b = slots.try_acquire(), slots.try_acquire()
+    assert a is not None and b is not None
+    assert slots.try_acquire() is None
+    slots.release(a)
+    assert slots.try_acquire() is not None
+
+def test_client_that_leaves_the_queue_is_never_admitted(monkeypatch):
+    import threading
+
+    from fastapi.testclient import TestClient
+
+    from main import app
+    from routers import voice
+    from services.elevenlabs_service import elevenlabs_service
+
+    admission = RealtimeAdmission(max_sessions=1, queue_max=2, queue_timeout=2, preempt_silence=60, poll_interval=0.01)
+    holder = admission._try_admit()
+    leased = []
+
+    async def lease(**kwargs):
+        leased.append(kwargs)
+        return None
+
+    monkeypatch.setattr(voice, "realtime_admission", admission)
+    monkeypatch.setattr(elevenlabs_service, "lease_realtime_session", lease)
+
+    # The slot frees up just after the queued client has gone
+    release = threading.Timer(0.2, admission.release, [holder])
+    with TestClient(app).websocket_connect("/api/transcribe/realtime") as ws:
+        assert ws.receive_json()["type"] == "queued"
+        ws.close(1001)  # only queues a disconnect; the handler keeps running
+        release.start()
+        release.join()
+        time.sleep(0.1)
+
+        assert leased == []
+        assert admission.stats()["active"] == 0 and admission.stats()["queued"] == 0
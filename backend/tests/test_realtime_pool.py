@@ -0,0 +1,114 @@
+import asyncio
+from collections import deque
+
+from services.realtime_pool import RealtimeSessionPool
+
+
+class FakeSession:
+    def __init__(self, key):
+        self.key = key
+        self.is_open = True
+
+    async def close(self):
+        self.is_open = False
+
+
+def make_pool(**kwargs):
+    opened = []
+
+    async def connect(language, sample_rate):
+        session = FakeSession((language, sample_rate))
+        opened.append(session)
+        return session
+
+    return RealtimeSessionPool(connect=connect, **kwargs), opened
+
+
+def test_pinned_keys_are_warm_before_first_lease():
+    async def run():
+        pool, opened = make_pool(size=2, pinned=[(None, 16000)])
+        await pool.maintain()
+        await asyncio.sleep(0)
+        session = await pool.acquire(None, 16000)
+        await pool.close()
+        return pool, opened, session
+
+    pool, opened, session = asyncio.run(run())
+    assert session is opened[0]
+    assert pool.hits == 1 and pool.misses == 0
+
+def test_cold_key_connects_inline_then_refills():
+    async def run():
+        pool, opened = make_pool(size=1)
+        first = await pool.acquire("pl", 16000)
+        await asyncio.sleep(0)
+        second = await pool.acquire("pl", 16000)
+        await pool.close()
+        return pool, first, second
+
+    pool, first, second = asyncio.run(run())
+    assert first is not second
+    assert (pool.hits, pool.misses) == (1, 1)
+
+def test_idle_and_dead_sessions_are_replaced():
+    async def run():
+        pool, opened = make_pool(size=1, idle_seconds=0.0, pinned=[("fr", 16000)])
+        await pool.maintain()
+        await asyncio.sleep(0)
+        stale = opened[0]
+        await pool.maintain()
+        await asyncio.sleep(0)
+        await pool.close()
+        return pool, stale, opened
+
+    pool, stale, opened = asyncio.run(run())
+    assert not stale.is_open
+    assert pool.expired >= 1
+    assert len(opened) >= 2
+
+def test_failed_connect_returns_none():
+    async def connect(language, sample_rate):
+        return None
+
+    async def run():
+        pool = RealtimeSessionPool(connect=connect, size=1)
+        session = await pool.acquire(None, 16000)
+        await pool.close()
+        return pool, session
+
+    pool, session = asyncio.run(run())
+    assert session is None
+    assert pool.connect_failures >= 1
+
+def test_refill_racing_maintenance_keeps_every_open_session_pooled():
+    key = ("pl", 16000)
+    opened = []
+
+    class SlowSession(FakeSession):
+        async def close(self):
+            await asyncio.sleep(0.01)
+            self.is_open = False
+
+    async def connect(language, sample_rate):
+        await asyncio.sleep(0.005)
+        session = SlowSession((language, sample_rate))
+        opened.append(session)
+        return session
+
+    async def run():
+        pool = RealtimeSessionPool(connect=connect, size=3, pinned=[key])
+        stale = [SlowSession(key), SlowSession(key)]
+        pool._idle[key] = deque((0.0, session) for session in stale)
+        # A refill finishes its connect while maintain() is closing stale sessions
+        pool._schedule_refill(key)
+        await pool.maintain()
+        await asyncio.gather(*pool._refills.values())
+        pooled = {session for _, session in pool._idle[key]}
+        live = {session for session in opened + stale if session.is_open}
+        await pool.close()
+        return pool, stale, pooled, live
+
+    pool, stale, pooled, live = asyncio.run(run())
+    assert not any(session.is_open for session in stale)
+    assert pooled == live and len(pooled) == 3
+    assert not any(session.is_open for session in opened)
@@ -0,0 +1,85 @@
+import base64
+import json
+
+import pytest
+
+from services.realtime_protocol import (
+    PartialDeltaEncoder, encode_audio_message, parse_client_frame
+)
+
+
+def decode_audio_message(message):
+    """Inverse of encode_audio_message (None for non-audio messages)."""
+    data = json.loads(message)
+    if data.get("type") != "audio":
+        return None
+    return base64.b64decode(data["audio"])
+
+def apply_partial_delta(previous, delta):
+    """What realtime-transcription.js does: keep_chars slices UTF-16 code units, like JS slice()."""
+    kept = (previous.get("text") or "").encode("utf-16-le")[:2 * delta["keep_chars"]].decode("utf-16-le")
+    return {
+        "type": "partial",
+        "words": (previous.get("words") or [])[:delta["keep_words"]] + delta["words"],
+        "text": kept + delta["text"]
+    }
+
+def test_binary_frames_are_audio():
+    assert parse_client_frame({"type": "websocket.receive", "bytes": b"\x01\x02"}) == ("audio", b"\x01\x02")
+
+def test_legacy_base64_audio_frame_still_decodes():
+    text = json.dumps({"type": "audio", "data": base64.b64encode(b"pcm").decode()})
+    assert parse_client_frame({"type": "websocket.receive", "text": text}) == ("audio", b"pcm")
+
+def test_text_frames_are_control_messages():
+    kind, data = parse_client_frame({"type": "websocket.receive", "text": '{"type": "eos"}'})
+    assert kind == "control"
+    assert data == {"type": "eos"}
+
+def test_non_object_control_frame_is_rejected():
+    with pytest.raises(ValueError):
+        parse_client_frame({"type": "websocket.receive", "text": "[1, 2]"})
+
+def test_audio_message_matches_json_dumps():
+    for chunk in [b"\x00" * 16, b"ab", b"\xff" * 2048, b"", b"xyz"]:
+        message = encode_audio_message(chunk)
+        assert json.loads(message) == {"type": "audio", "audio": base64.b64encode(chunk).decode()}
+        assert decode_audio_message(message) == chunk
+
+def partial(text):
+    return {"type": "partial", "text": text, "words": [{"text": w} for w in text.split()]}
+
+def test_partial_deltas_rebuild_every_partial():
+    encoder = PartialDeltaEncoder(snapshot_every=3)
+    texts = ["Dzień", "Dzień dobry", "Dzień dobry pani", "Dzień dobry panie", "Dzień dobry panie Janie"]
+    client = None
+    kinds = []
+    for text in texts:
+        message = encoder.encode(partial(text))
+        kinds.append(message["type"])
+        client = message if message["type"] == "partial" else apply_partial_delta(client, message)
+        assert client["text"] == text
+        assert client["words"] == partial(text)["words"]
+    assert kinds == ["partial", "partial_delta", "partial_delta", "partial_delta", "partial"]
+
+def test_revised_word_shrinks_the_kept_prefix():
+    encoder = PartialDeltaEncoder()
+    encoder.encode(partial("jak sie masz"))
+    delta = encoder.encode(partial("jak się masz"))
+    assert delta["keep_words"] == 1
+    assert delta["keep_chars"] == len("jak si")
+    assert [w["text"] for w in delta["words"]] == ["się", "masz"]
+
+def test_keep_chars_counts_utf16_units_for_astral_characters():
+    encoder = PartialDeltaEncoder()
+    previous = encoder.encode(partial("Cześć 😀 jak"))
+    delta = encoder.encode(partial("Cześć 😀 jak się masz"))
+    assert delta["keep_chars"] == len("Cześć  jak") + 2  # the emoji is a surrogate pair in JS
+    assert apply_partial_delta(previous, delta)["text"] == "Cześć 😀 jak się masz"
+
+def test_final_passes_through_and_restarts_with_a_snapshot():
+    encoder = PartialDeltaEncoder()
+    encoder.encode(partial("tak"))
+    final = {"type": "final", "text": "Tak.", "words": []}
+    assert encoder.encode(final) is final
+    assert encoder.encode(partial("nie"))["type"] == "partial"
@@ -0,0 +1,146 @@
+import asyncio
+import json
+
+from services.realtime_relay import AudioQueue, ClientMessageQueue, RealtimeRelay
+
+
+class FakeSession:
+    def __init__(self, transcripts=()):
+        self.sent = []
+        self.transcripts = list(transcripts)
+        self.is_connected = True
+        self.ended = False
+
+    async def send_audio(self, chunk):
+        self.sent.append(chunk)
+
+    async def receive_transcript(self):
+        if self.transcripts:
+            return self.transcripts.pop(0)
+        await asyncio.sleep(3600)
+
+    async def end_stream(self):
+        self.ended = True
+
+    async def close(self):
+        self.is_connected = False
+
+
+def test_lagging_sender_gets_coalesced_frames():
+    async def run():
+        queue = AudioQueue(max_bytes=1000, max_frame_bytes=300, policy="coalesce")
+        for _ in range(5):
+            await queue.put(b"\x00" * 100)
+        return [len(await queue.get()), len(await queue.get())], queue
+
+    sizes, queue = asyncio.run(run())
+    assert sizes == [300, 200]
+    assert queue.chunks_coalesced == 3
+    assert queue.depth_bytes == 0
+
+def test_full_audio_queue_drops_oldest_audio():
+    async def run():
+        queue = AudioQueue(max_bytes=300, max_frame_bytes=1000, policy="coalesce")
+        for value in range(5):
+            await queue.put(bytes([value]) * 100)
+        return await queue.get(), queue
+
+    frame, queue = asyncio.run(run())
+    assert frame == bytes([2]) * 100 + bytes([3]) * 100 + bytes([4]) * 100
+    assert queue.bytes_dropped == 200
+
+def test_queued_partial_is_superseded_but_finals_are_kept():
+    async def run():
+        queue = ClientMessageQueue(max_messages=8, policy="drop_partials")
+        await queue.put({"type": "partial", "text": "dzień"})
+        await queue.put({"type": "partial", "text": "dzień dobry"})
+        await queue.put({"type": "final", "text": "Dzień dobry."})
+        await queue.put({"type": "partial", "text": "jak"})
+        queue.close()
+        out = []
+        while (message := await queue.get()) is not None:
+            out.append(message["text"])
+        return out, queue
+
+    out, queue = asyncio.run(run())
+    assert out == ["dzień dobry", "Dzień dobry.", "jak"]
+    assert queue.partials_superseded == 1
+
+def test_relay_forwards_both_ways_and_flushes_on_finish():
+    session = FakeSession([
+        {"type": "transcript", "text": "cześć", "is_final": True},
+    ])
+    received = []
+
+    async def send_text(text):
+        received.append(json.loads(text))
+
+    async def run():
+        relay = RealtimeRelay(session, send_text)
+        relay.start()
+        await relay.send_audio(b"\x01\x00" * 10)
+        await relay.finish(grace_seconds=0.01)
+        await relay.close()
+
+    asyncio.run(run())
+    assert b"".join(session.sent) == b"\x01\x00" * 10
+    assert session.ended and not session.is_connected
+    assert [m["type"] for m in received] == ["final", "eos_received"]
+
+def test_language_switch_replays_audio_queued_while_connecting():
+    old, new = FakeSession(), FakeSession()
+    connected = asyncio.Event()
+
+    async def connect(language):
+        await connected.wait()
+        return new
+
+    async def send_text(text):
+        pass
+
+    async def run():
+        relay = RealtimeRelay(old, send_text, connect=connect)
+        relay.start()
+        relay.reconfigure("pl")
+        await relay.send_audio(b"a" * 10)
+        await relay.send_audio(b"b" * 10)
+        await asyncio.sleep(0.01)
+        assert old.sent == [] and new.sent == []
+        connected.set()
+        await relay.finish(grace_seconds=0.01)
+        await relay.close()
+        return relay
+
+    relay = asyncio.run(run())
+    assert b"".join(new.sent) == b"a" * 10 + b"b" * 10
+    assert old.ended and not old.is_connected
+    assert relay.language == "pl" and relay.switches == 1
+
+def test_dropped_upstream_reconnects_without_losing_audio():
+    class FlakySession(FakeSession):
+        async def send_audio(self, chunk):
+            self.is_connected = False
+            return False
+
+    flaky, replacement = FlakySession(), FakeSession()
+    received = []
+
+    async def connect(language):
+        return replacement
+
+    async def send_text(text):
+        received.append(json.loads(text)["type"])
+
+    async def run():
+        relay = RealtimeRelay(flaky, send_text, connect=connect)
+        relay.start()
+        await relay.send_audio(b"x" * 10)
+        await asyncio.sleep(0.01)
+        await relay.finish(grace_seconds=0.01)
+        await relay.close()
+        return relay
+
+    relay = asyncio.run(run())
+    assert replacement.sent == [b"x" * 10]
+    assert relay.reconnects == 1
+    assert "reconnected" in received
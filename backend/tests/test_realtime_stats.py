@@ -0,0 +1,56 @@
+import pytest
+
+from services.realtime_stats import RealtimeSessionStats, UPSTREAM_BYTES_PER_SECOND
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_first_partial_and_final_latency():
+    clock = FakeClock()
+    stats = RealtimeSessionStats(clock=clock)
+
+    stats.on_audio_in(640)
+    clock.now = 0.3
+    stats.on_transcript({"type": "partial", "words": []})
+    clock.now = 1.3
+    stats.on_transcript({"type": "final", "words": []})
+
+    summary = stats.summary()
+    assert summary["first_partial_ms"] == 300.0
+    assert summary["partial_to_final_ms"]["p50"] == 1000.0
+    assert (summary["partials"], summary["finals"]) == (1, 1)
+
+def test_partial_lag_maps_word_end_to_the_frame_that_carried_it():
+    clock = FakeClock()
+    stats = RealtimeSessionStats(clock=clock)
+
+    # Three half-second frames sent at t=0, 0.5 and 1.0
+    for sent_at in (0.0, 0.5, 1.0):
+        clock.now = sent_at
+        stats.on_upstream_frame(UPSTREAM_BYTES_PER_SECOND // 2)
+
+    # A word ending 0.7 s into the stream was in the second frame
+    clock.now = 1.2
+    stats.on_transcript({"type": "partial", "words": [{"text": "tak", "end": 0.7}]})
+    assert stats.partial_lag.max == pytest.approx(700.0)
+
+    # Without word timings, lag is measured from the latest frame
+    stats.on_transcript({"type": "partial", "words": []})
+    assert stats.partial_lag.min == pytest.approx(200.0)
+
+def test_bytes_and_client_queue_depth_are_counted():
+    stats = RealtimeSessionStats()
+    stats.on_audio_in(4096)
+    stats.on_upstream_frame(1024)
+    stats.on_client_send(80, queue_depth=3)
+    stats.on_client_send(40, queue_depth=0)
+
+    summary = stats.summary()
+    assert (summary["bytes_in"], summary["bytes_upstream"], summary["bytes_out"]) == (4096, 1024, 120)
+    assert summary["client_queue_max"] == 3
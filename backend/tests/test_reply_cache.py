@@ -0,0 +1,135 @@
+import asyncio
+from types import SimpleNamespace
+
+from services.npc_service import npc_service
+from services.reply_cache import ReplyCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_key_ignores_case_spacing_and_edge_punctuation():
+    cache = ReplyCache(npcs=["mati"])
+    key = cache.make_key("mati", "Gdzie jest kot?", 2, 1, [])
+    assert cache.make_key("mati", "  gdzie  jest KOT ", 2, 1, []) == key
+    assert cache.make_key("mati", "Gdzie jest pies?", 2, 1, []) != key
+    assert cache.make_key("mati", "Gdzie jest kot?", 3, 1, []) != key
+    assert cache.make_key("jade", "Gdzie jest kot?", 2, 1, []) != key
+
+def test_only_recent_history_is_part_of_the_key():
+    cache = ReplyCache(npcs=["mati"], history_messages=2)
+    recent = [{"role": "user", "content": "Cześć"}, {"role": "assistant", "content": "Dzień dobry!"}]
+    older = [{"role": "user", "content": "Hej"}, {"role": "assistant", "content": "Hej hej"}]
+    assert cache.make_key("mati", "Tak", 2, 1, older + recent) == cache.make_key("mati", "Tak", 2, 1, recent)
+    assert cache.make_key("mati", "Tak", 2, 1, recent) != cache.make_key("mati", "Tak", 2, 1, [])
+
+def test_entries_expire_and_least_recently_used_is_evicted():
+    clock = FakeClock()
+    cache = ReplyCache(npcs=["*"], max_items=2, ttl_seconds=10, clock=clock)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"
+    cache.put("c", "C")  # evicts b, the least recently used
+    assert cache.get("b") is None
+    clock.now = 11
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["expired"] == 1 and stats["hits"] == 1
+
+def test_cache_is_opt_in_per_npc():
+    cache = ReplyCache(npcs=[])
+    assert not cache.enabled_for("mati")
+    cache.set_enabled("mati", True)
+    assert cache.enabled_for("mati") and not cache.enabled_for("jade")
+    assert ReplyCache(npcs=["*"]).enabled_for("jade")
+
+def test_repeated_opener_skips_the_llm(monkeypatch):
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        await asyncio.sleep(0.01)
+        return SimpleNamespace(content=[SimpleNamespace(text="Dzień dobry! (Good morning!)")], usage=None)
+
+    monkeypatch.setattr(npc_service.async_client.messages, "create", create)
+    monkeypatch.setattr(npc_service, "reply_cache", ReplyCache(npcs=["mati"]))
+
+    async def run():
+        # Two identical turns at once share one call; later ones hit the cache
+        first = await asyncio.gather(*(npc_service.get_npc_response("Dzień dobry", "mati", [], {"step": 2}, 1) for _ in range(2)))
+        again = await npc_service.get_npc_response("dzień dobry!", "mati", [], {"step": 2}, 1)
+        streamed = [t async for t in npc_service.stream_npc_response("Dzień dobry.", "mati", [], {"step": 2}, 1)]
+        other = await npc_service.get_npc_response("Dzień dobry", "jade", [], {"step": 2}, 1)
+        return first, again, streamed, other
+
+    first, again, streamed, other = asyncio.run(run())
+    assert len(calls) == 2  # one for mati, one for jade (not opted in)
+    assert again == first[0] == first[1]
+    assert again["vocabulary"] == [{"word": "Dzień dobry", "translation": "Good morning"}]
+    assert streamed == ["Dzień dobry! (Good morning!)"]
+    assert npc_service.reply_cache.stats()["hits"] == 2
+
+def test_concurrent_streamed_turns_share_one_call(monkeypatch):
+    calls = []
+
+    class FakeStream:
+        def __init__(self, pieces):
+            self.pieces = pieces
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        @property
+        async def text_stream(self):
+            for piece in self.pieces:
+                await asyncio.sleep(0.01)
+                yield piece
+
+        async def get_final_message(self):
+            return SimpleNamespace(usage=None)
+
+    def stream(**kwargs):
+        calls.append(kwargs["messages"][-1]["content"])
+        return FakeStream(["Kot jest ", "w ogrodzie."])
+
+    async def create(**kwargs):
+        calls.append(kwargs["messages"][-1]["content"])
+        return SimpleNamespace(content=[SimpleNamespace(text="Pies śpi.")], usage=None)
+
+    monkeypatch.setattr(npc_service.async_client.messages, "stream", stream)
+    monkeypatch.setattr(npc_service.async_client.messages, "create", create)
+    monkeypatch.setattr(npc_service, "reply_cache", ReplyCache(npcs=["mati"]))
+
+    async def collect(text):
+        return "".join([t async for t in npc_service.stream_npc_response(text, "mati", [], {"step": 2}, 1)])
+
+    async def abandon(text):
+        replies = npc_service.stream_npc_response(text, "mati", [], {"step": 2}, 1)
+        await replies.__anext__()
+        await replies.aclose()
+
+    async def run():
+        shared = await asyncio.gather(
+            collect("Gdzie jest kot?"),
+            collect("gdzie jest kot"),
+            npc_service.get_npc_response("Gdzie jest kot", "mati", [], {"step": 2}, 1)
+        )
+        # A leader whose client leaves does not strand the turns that joined it
+        leader = asyncio.ensure_future(abandon("Gdzie jest pies?"))
+        await asyncio.sleep(0)
+        joined = await asyncio.gather(npc_service.get_npc_response("Gdzie jest pies", "mati", [], {"step": 2}, 1), leader)
+        return shared, joined[0]
+
+    shared, joined = asyncio.run(run())
+    assert shared[:2] == ["Kot jest w ogrodzie."] * 2
+    assert shared[2]["response"] == "Kot jest w ogrodzie."
+    assert joined["response"] == "Pies śpi."
+    assert calls == ["Gdzie jest kot?", "Gdzie jest pies?", "Gdzie jest pies"]
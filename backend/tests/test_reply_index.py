@@ -0,0 +1,101 @@
+import asyncio
+from types import SimpleNamespace
+
+from services.npc_service import npc_service
+from services.reply_cache import ReplyCache
+from services.reply_index import MinHasher, NearDuplicateIndex, word_tokens, same_stem
+
+
+def test_repunctuated_input_reuses_reply():
+    index = NearDuplicateIndex(threshold=0.8)
+    index.add("ctx", "Cześć, jak się masz?", "Dobrze, dziękuję!")
+    assert index.lookup("ctx", "cześć jak się masz!!") == "Dobrze, dziękuję!"
+    assert index.lookup("ctx", "Cześć... jak  się masz") == "Dobrze, dziękuję!"
+    assert index.lookup("ctx", "Cześć, jak się macie?") is None
+    assert index.lookup("other-ctx", "Cześć, jak się masz?") is None
+    stats = index.stats()
+    assert stats["reuses"] == 2 and stats["lookups"] == 4 and stats["reuse_rate"] == 0.5
+
+def test_threshold_decides_reuse():
+    loose, strict = NearDuplicateIndex(threshold=0.8), NearDuplicateIndex(threshold=0.9)
+    for index in (loose, strict):
+        index.add("ctx", "Gdzie jest kot?", "W ogrodzie.")
+    # An extra word scores ~0.88 on character trigrams
+    assert loose.lookup("ctx", "A gdzie jest kot?") == "W ogrodzie."
+    assert strict.lookup("ctx", "A gdzie jest kot?") is None
+    assert loose.stats()["reuses"] == 1
+
+def test_inflection_error_is_not_a_duplicate():
+    index = NearDuplicateIndex(threshold=0.8)
+    index.add("ctx", "Gdzie jest kot?", "W ogrodzie.")
+    index.add("ctx", "Czy masz chleb?", "Tak, mam chleb.")
+    # Both score ~0.81 on character trigrams, but the learner's form differs
+    assert index.lookup("ctx", "Gdzie jest kota?") is None
+    assert index.lookup("ctx", "Czy masz chleba?") is None
+    assert word_tokens("Gdzie, jest  KOT?!") == ("gdzie", "jest", "kot")
+    assert same_stem("kot", "kocie") and same_stem("ten", "tego")
+    assert not same_stem("mój", "twój") and not same_stem("jest", "jset")
+
+def test_minhash_agrees_with_shingle_jaccard():
+    hasher = MinHasher(num_perm=256)
+    a, b = hasher.shingles("gdzie jest mój kot"), hasher.shingles("gdzie jest twój kot")
+    exact = len(a & b) / len(a | b)
+    estimate = (hasher.signature(a) == hasher.signature(b)).mean()
+    assert abs(estimate - exact) < 0.15
+
+def test_entries_are_bounded_and_expire():
+    now = [0.0]
+    index = NearDuplicateIndex(threshold=0.8, max_entries=2, ttl_seconds=10, clock=lambda: now[0])
+    for text in ["Dzień dobry", "Jak się masz", "Ile to kosztuje"]:
+        index.add("ctx", text, text.upper())
+    assert index.lookup("ctx", "Dzień dobry") is None  # evicted
+    assert index.lookup("ctx", "Jak się masz?") == "JAK SIĘ MASZ"
+    now[0] = 11
+    assert index.lookup("ctx", "Jak się masz?") is None
+    assert index.stats()["entries"] == 2 and index.stats()["evictions"] == 1
+
+def test_kill_switch_per_npc():
+    index = NearDuplicateIndex(kill_npcs=["jade"])
+    assert index.enabled_for("mati") and not index.enabled_for("jade")
+    index.set_enabled("mati", False)
+    assert not index.enabled_for("mati")
+    assert not NearDuplicateIndex(kill_npcs=["*"]).enabled_for("mati")
+    assert not NearDuplicateIndex(threshold=0, kill_npcs=[]).enabled_for("mati")
+
+def test_npc_service_reuses_only_uncorrected_replies(monkeypatch):
+    replies = {
+        "Gdzie, jest kot?": "Kot jest w ogrodzie.",
+        "Gdzie jest kota?": "We say 'kot', not 'kota'. Kot jest w ogrodzie.",
+        "gdzie jest kot": "Kot śpi.",
+        "Gdzie jest kot": "Kot je."
+    }
+    calls = []
+
+    async def create(**kwargs):
+        content = kwargs["messages"][-1]["content"]
+        text = content if isinstance(content, str) else content[0]["text"]
+        calls.append(text)
+        return SimpleNamespace(content=[SimpleNamespace(text=replies[text])], usage=None)
+
+    monkeypatch.setattr(npc_service.async_client.messages, "create", create)
+    monkeypatch.setattr(npc_service, "reply_cache", ReplyCache(npcs=["mati"]))
+    monkeypatch.setattr(npc_service, "reply_index", NearDuplicateIndex(threshold=0.8, kill_npcs=[]))
+
+    async def run():
+        first = await npc_service.get_npc_response("Gdzie, jest kot?", "mati", [], {"step": 2}, 1)
+        near = await npc_service.get_npc_response("Gdzie jest kot?!", "mati", [], {"step": 2}, 1)
+        streamed = [t async for t in npc_service.stream_npc_response("gdzie jest, kot", "mati", [], {"step": 2}, 1)]
+        wrong = await npc_service.get_npc_response("Gdzie jest kota?", "mati", [], {"step": 2}, 1)
+        npc_service.reply_index.set_enabled("mati", False)
+        killed = await npc_service.get_npc_response("gdzie jest kot", "mati", [], {"step": 2}, 1)
+        other_step = await npc_service.get_npc_response("Gdzie jest kot", "mati", [], {"step": 3}, 1)
+        return first, near, streamed, wrong, killed, other_step
+
+    first, near, streamed, wrong, killed, other_step = asyncio.run(run())
+    assert near == first
+    assert streamed == ["Kot jest w ogrodzie."]
+    assert wrong["correction"] and wrong["response"] != first["response"]
+    assert killed["response"] == "Kot śpi."
+    assert other_step["response"] == "Kot je."
+    assert calls == ["Gdzie, jest kot?", "Gdzie jest kota?", "gdzie jest kot", "Gdzie jest kot"]
+    assert npc_service.reply_index.stats()["inserts"] == 1  # the correcting reply is not indexed
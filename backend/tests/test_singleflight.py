@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from services.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_upstream_call():
+    flight = SingleFlight("tts")
+    calls = 0
+
+    async def synthesize():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return b"audio"
+
+    async def run():
+        return await asyncio.gather(*(flight.do("kot", synthesize) for _ in range(10)))
+
+    assert asyncio.run(run()) == [b"audio"] * 10
+    assert calls == 1
+    assert flight.stats() == {"in_flight": 0, "upstream_calls": 1, "coalesced": 9}
+
+def test_errors_reach_every_waiter_and_release_the_key():
+    flight = SingleFlight("stt")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def run():
+        return await asyncio.gather(flight.do("a", fail), flight.do("a", fail), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert flight.pending("a") is None
+
+def test_cancelled_caller_does_not_cancel_shared_call():
+    flight = SingleFlight("tts")
+
+    async def synthesize():
+        await asyncio.sleep(0.02)
+        return b"audio"
+
+    async def run():
+        first = asyncio.ensure_future(flight.do("k", synthesize))
+        second = asyncio.ensure_future(flight.do("k", synthesize))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == b"audio"
@@ -0,0 +1,80 @@
+import io
+import json
+import zipfile
+
+from fastapi.testclient import TestClient
+
+from main import app
+from routers import voice
+from services.elevenlabs_service import elevenlabs_service
+
+client = TestClient(app)
+
+
+def fake_render(calls, fail_on=None):
+    async def render(text, character_id, expression=None, audio_format=None, **kwargs):
+        calls.append((text, character_id, expression, audio_format))
+        if text == fail_on:
+            raise RuntimeError("quota exceeded")
+        return f"{text}|{character_id}".encode()
+    return render
+
+def read_zip(response):
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    return archive, json.loads(archive.read("index.json"))
+
+def test_equivalent_items_share_one_clip(monkeypatch):
+    calls = []
+    monkeypatch.setattr(elevenlabs_service, "text_to_speech_async", fake_render(calls))
+
+    response = client.post("/api/speak/batch", json={
+        "character_id": "amelie",
+        "items": [{"text": "kot"}, {"text": "kot", "character_id": "amelie"}, {"text": "pies"}]
+    })
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    assert sorted(call[0] for call in calls) == ["kot", "pies"]
+
+    archive, index = read_zip(response)
+    files = [entry["file"] for entry in index["items"]]
+    assert files[0] == files[1] != files[2]
+    assert index["unique_clips"] == 2 and index["failed"] == 0
+    assert sorted(archive.namelist()) == sorted({*files, "index.json"})
+
+def test_index_maps_every_item_to_its_file(monkeypatch):
+    monkeypatch.setattr(elevenlabs_service, "text_to_speech_async", fake_render([]))
+
+    response = client.post("/api/speak/batch", json={
+        "format": "opus_32",
+        "items": [{"text": "tak"}, {"text": "nie"}, {"text": "tak"}]
+    })
+    archive, index = read_zip(response)
+    items = index["items"]
+    assert [entry["index"] for entry in items] == [0, 1, 2]
+    assert [entry["text"] for entry in items] == ["tak", "nie", "tak"]
+    assert items[0]["file"] == items[2]["file"] != items[1]["file"]
+    assert all(entry["file"] == f"{entry['clip_id']}.ogg" for entry in items)
+    assert index["format"] == "opus_32" and index["media_type"] == "audio/ogg"
+    assert archive.read(items[1]["file"]) == b"nie|amelie"
+
+def test_failed_render_is_reported_per_item(monkeypatch):
+    monkeypatch.setattr(elevenlabs_service, "text_to_speech_async", fake_render([], fail_on="pies"))
+
+    response = client.post("/api/speak/batch", json={"items": [{"text": "kot"}, {"text": "pies"}]})
+    assert response.status_code == 200
+    archive, index = read_zip(response)
+    ok, failed = index["items"]
+    assert "file" in ok and "error" not in ok
+    assert failed["error"] == "quota exceeded" and "file" not in failed
+    assert index["failed"] == 1
+    assert archive.namelist() == [ok["file"], "index.json"]
+
+def test_oversize_batch_is_rejected(monkeypatch):
+    calls = []
+    monkeypatch.setattr(elevenlabs_service, "text_to_speech_async", fake_render(calls))
+    monkeypatch.setattr(voice, "TTS_BATCH_MAX_ITEMS", 2)
+
+    response = client.post("/api/speak/batch", json={"items": [{"text": w} for w in ["a", "b", "c"]]})
+    assert response.status_code == 413
+    assert "max 2" in response.json()["detail"]
+    assert calls == []
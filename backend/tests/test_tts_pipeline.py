@@ -0,0 +1,82 @@
+import asyncio
+
+from services.tts_pipeline import SegmentSplitter, split_reply, synthesize_segments
+
+
+def test_split_on_sentences_and_tags():
+    segments = split_reply("[sadly] I lost my cat. Have you seen her? [excited] I found it! [DONE]")
+    assert segments == [
+        "[sadly] I lost my cat.",
+        "[sadly] Have you seen her?",
+        "[excited] I found it!"
+    ]
+
+def test_untagged_reply_is_split_on_sentences():
+    assert split_reply("Cześć! Jak się masz?") == ["Cześć!", "Jak się masz?"]
+
+def test_incremental_feed_only_emits_complete_segments():
+    splitter = SegmentSplitter()
+    assert splitter.feed("[whis") == []
+    assert splitter.feed("pers] Be qui") == []
+    assert splitter.feed("et. The cat") == ["[whispers] Be quiet."]
+    assert splitter.flush() == ["[whispers] The cat"]
+
+def test_segments_are_yielded_in_order():
+    async def synthesize(segment):
+        # Later segments finish first
+        await asyncio.sleep(0.01 * (3 - int(segment)))
+        return segment.encode()
+
+    async def collect():
+        return [chunk async for chunk in synthesize_segments(["1", "2", "3"], synthesize, max_concurrency=3)]
+
+    assert asyncio.run(collect()) == [b"1", b"2", b"3"]
+
+def test_closing_early_cancels_and_awaits_pending_renders():
+    started = []
+
+    async def synthesize(segment):
+        started.append(asyncio.current_task())
+        await asyncio.sleep(0 if segment == "1" else 10)
+        return segment.encode()
+
+    async def run():
+        stream = synthesize_segments(["1", "2", "3"], synthesize, max_concurrency=3)
+        first = await stream.__anext__()
+        await stream.aclose()
+        return first, [task.done() for task in started]
+
+    first, done = asyncio.run(run())
+    assert first == b"1"
+    assert done == [True, True, True]
+
+def test_streamed_speech_tags_each_segment_once_and_keeps_ogg_whole(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from main import app
+    from services.elevenlabs_service import elevenlabs_service
+
+    calls = []
+
+    async def render(text, character_id, expression=None, audio_format=None, **kwargs):
+        calls.append((text, expression, audio_format))
+        return b"clip"
+
+    async def render_stream(text, character_id, expression=None, audio_format=None, **kwargs):
+        calls.append((text, expression, audio_format))
+        yield b"clip"
+
+    monkeypatch.setattr(elevenlabs_service, "text_to_speech_async", render)
+    monkeypatch.setattr(elevenlabs_service, "text_to_speech_stream_async", render_stream)
+    client = TestClient(app)
+    body = {"text": "Hello there. [sadly] I lost my cat.", "expression": "happy"}
+
+    client.post("/api/speak?stream=true&format=mp3_64", json=body)
+    assert calls == [
+        ("Hello there.", "happy", "mp3_64"),
+        ("[sadly] I lost my cat.", None, "mp3_64")
+    ]
+
+    calls.clear()
+    client.post("/api/speak?stream=true&format=opus_32", json=body)
+    assert calls == [("Hello there. [sadly] I lost my cat.", "happy", "opus_32")]
@@ -0,0 +1,175 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from main import app
+from services.elevenlabs_service import elevenlabs_service
+from services.npc_service import npc_service
+from services.voice_turn import VoiceTurnPipeline
+
+
+def make_pipeline(reply, frames, tts_delay=0.0, reply_delay=0.0):
+    sent = []
+
+    async def send_text(text):
+        sent.append(json.loads(text))
+
+    async def send_bytes(data):
+        sent.append(data)
+
+    async def reply_stream(text):
+        for token in reply:
+            await asyncio.sleep(reply_delay)
+            yield token
+
+    async def synthesize(segment):
+        for frame in frames(segment):
+            await asyncio.sleep(tts_delay(segment) if callable(tts_delay) else tts_delay)
+            yield frame
+
+    replies = []
+
+    def on_reply(text, reply_text):
+        replies.append((text, reply_text))
+        return {"response": reply_text, "turn_count": len(replies)}
+
+    pipeline = VoiceTurnPipeline(send_text, send_bytes, reply_stream, synthesize, on_reply, tts_concurrency=2)
+    return pipeline, sent, replies
+
+
+def test_turn_streams_tokens_then_audio_in_sentence_order():
+    async def run():
+        pipeline, sent, replies = make_pipeline(
+            ["Cześć! ", "Jak się ", "masz? ", "[DONE]"],
+            # The second sentence renders faster but must still play second
+            lambda segment: [segment[:3].encode(), b"|"],
+            tts_delay=lambda segment: 0.05 if segment.startswith("Cze") else 0.0
+        )
+        pipeline.on_transcript({"type": "final", "text": "Dzień dobry"})
+        await pipeline.wait(5)
+        return sent, replies
+
+    sent, replies = asyncio.run(run())
+    kinds = [m["type"] if isinstance(m, dict) else "audio" for m in sent]
+    assert kinds[0] == "turn_start" and kinds[-1] == "turn_end"
+    assert kinds.count("npc_token") == 4
+    assert [m for m in sent if isinstance(m, bytes)] == [b"Cze", b"|", b"Jak", b"|"]
+    assert replies == [("Dzień dobry", "Cześć! Jak się masz? [DONE]")]
+    reply = next(m for m in sent if isinstance(m, dict) and m["type"] == "npc_reply")
+    assert reply["turn"] == 1 and reply["turn_count"] == 1
+
+def test_first_sentence_audio_starts_before_the_reply_finishes():
+    async def run():
+        pipeline, sent, _ = make_pipeline(
+            ["Tak. ", "To ", "jest ", "kot."],
+            lambda segment: [b"x"],
+            reply_delay=0.02
+        )
+        pipeline.on_transcript({"type": "final", "text": "Kot?"})
+        await pipeline.wait(5)
+        return sent
+
+    sent = asyncio.run(run())
+    first_audio = next(i for i, m in enumerate(sent) if isinstance(m, bytes))
+    last_token = max(i for i, m in enumerate(sent) if isinstance(m, dict) and m["type"] == "npc_token")
+    assert first_audio < last_token
+
+def test_speaking_again_interrupts_and_merges_the_unfinished_turn():
+    async def run():
+        pipeline, sent, replies = make_pipeline(["Hmm. "] * 10, lambda segment: [b"x"], reply_delay=0.05)
+        pipeline.on_transcript({"type": "final", "text": "Gdzie jest"})
+        await asyncio.sleep(0.06)
+        pipeline.on_transcript({"type": "partial", "text": "kot"})
+        pipeline.on_transcript({"type": "final", "text": "kot?"})
+        await pipeline.wait(5)
+        return pipeline, sent, replies
+
+    pipeline, sent, replies = asyncio.run(run())
+    assert pipeline.interrupted == 1
+    assert replies == [("Gdzie jest kot?", "Hmm. " * 10)]
+    starts = [m for m in sent if isinstance(m, dict) and m["type"] == "turn_start"]
+    assert [s["turn"] for s in starts] == [1, 2]
+    assert [m["turn"] for m in sent if isinstance(m, dict) and m["type"] == "turn_end"] == [2]
+
+def test_reply_failure_reports_an_error_and_records_nothing():
+    async def run():
+        sent = []
+
+        async def send_text(text):
+            sent.append(json.loads(text))
+
+        async def failing_reply(text):
+            raise RuntimeError("overloaded")
+            yield
+
+        async def synthesize(segment):
+            yield b"x"
+
+        pipeline = VoiceTurnPipeline(send_text, None, failing_reply, synthesize, lambda *args: {})
+        pipeline.start_turn("Cześć")
+        await pipeline.wait(5)
+        return sent
+
+    sent = asyncio.run(run())
+    assert [m["type"] for m in sent] == ["turn_start", "error"]
+    assert sent[-1]["message"] == "overloaded"
+
+class FakeSTTSession:
+    def __init__(self, transcripts):
+        self.transcripts = list(transcripts)
+        self.is_connected = True
+        self.is_open = True
+
+    async def send_audio(self, chunk):
+        return True
+
+    async def receive_transcript(self):
+        if self.transcripts:
+            await asyncio.sleep(0.05)
+            return self.transcripts.pop(0)
+        await asyncio.sleep(3600)
+
+    async def end_stream(self):
+        pass
+
+    async def close(self):
+        self.is_connected = False
+
+def test_voice_socket_runs_a_spoken_turn(monkeypatch):
+    async def lease(language_hint=None, sample_rate=16000):
+        return FakeSTTSession([{"type": "transcript", "text": "Gdzie jest kot?", "is_final": True}])
+
+    async def reply(**kwargs):
+        assert kwargs["npc_name"] == "mati"
+        yield "[excited] W ogrodzie! "
+        yield "Szybko."
+
+    voices = []
+
+    async def speak(text, character_id, expression=None, audio_format=None, voice_id=None):
+        voices.append((text, voice_id, audio_format))
+        yield b"pcm"
+
+    monkeypatch.setattr(elevenlabs_service, "lease_realtime_session", lease)
+    monkeypatch.setattr(npc_service, "stream_npc_response", reply)
+    monkeypatch.setattr(elevenlabs_service, "text_to_speech_stream_async", speak)
+
+    with TestClient(app).websocket_connect("/api/conversation/voice") as ws:
+        ws.send_json({"type": "config", "npc_id": "mati", "session_id": "voice-test"})
+        received = []
+        while not received or received[-1] != {"type": "turn_end", "turn": 1}:
+            message = ws.receive()
+            received.append(json.loads(message["text"]) if message.get("text") else message["bytes"])
+
+    kinds = [m["type"] if isinstance(m, dict) else "audio" for m in received]
+    assert "final" in kinds
+    assert kinds.index("turn_start") < kinds.index("audio")
+    assert received.count(b"pcm") == 2
+    assert voices == [
+        ("[excited] W ogrodzie!", npc_service.get_voice_id("mati"), "pcm_24000"),
+        ("[excited] Szybko.", npc_service.get_voice_id("mati"), "pcm_24000")
+    ]
+    reply_message = next(m for m in received if isinstance(m, dict) and m["type"] == "npc_reply")
+    assert reply_message["session_id"] == "voice-test"
+    assert reply_message["response"] == "[excited] W ogrodzie! Szybko."
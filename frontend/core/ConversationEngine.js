@@ -24,6 +24,7 @@ export class ConversationEngine {
     this.onMessage = null;
     this.onCorrection = null;
     this.onNewVocabulary = null;
+    this.onResponseToken = null; // ({ delta, text }) while the NPC reply streams in, ({ reset: true }) if it broke off
   }
 
   // ═══════════════════════════════════════════════════════════════════════════════
@@ -223,7 +224,7 @@ export class ConversationEngine {
     const character = this.config.character;
     
     try {
-      const response = await this.callBackend('/api/conversation/respond', {
+      const request = {
         language: this.config.code,
         languageName: this.config.name,
         character: {
@@ -240,8 +241,27 @@ export class ConversationEngine {
           targetPercent: difficulty.target,
           grammarFocus: difficulty.grammar,
         },
+      };
+      
+      // Stream tokens as they arrive
+      let partial = '';
+      let response = await this.streamBackend('/api/conversation/respond/stream', request, (delta) => {
+        partial += delta;
+        if (this.onResponseToken) {
+          this.onResponseToken({ delta, text: partial });
+        }
       });
       
+      if (!response || response.error) {
+        if (!partial) {
+          // Nothing shown yet: the one-shot endpoint can still answer
+          response = await this.callBackend('/api/conversation/respond', request) || response;
+        } else if (this.onResponseToken) {
+          // The turn was already billed; drop the half-shown reply, don't re-ask
+          this.onResponseToken({ reset: true });
+        }
+      }
+      
       if (response) {
         return {
           text: response.response || response.text,
@@ -335,6 +355,65 @@ export class ConversationEngine {
     return null;
   }
 
+  /**
+   * POST to a Server-Sent Events endpoint. Calls onToken(text) for each
+   * `token` event and resolves with the `done` payload, the fallback
+   * payload of an `error` event (it has an `error` field), or null when
+   * the request or connection fails.
+   */
+  async streamBackend(endpoint, data, onToken) {
+    try {
+      const response = await fetch(`http://localhost:8000${endpoint}`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+        body: JSON.stringify(data),
+      });
+      
+      if (!response.ok || !response.body) {
+        return null;
+      }
+      
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+          const block = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+          
+          let event = 'message';
+          let payload = '';
+          for (const line of block.split('\n')) {
+            if (line.startsWith('event:')) event = line.slice(6).trim();
+            else if (line.startsWith('data:')) payload += line.slice(5).trim();
+          }
+          if (!payload) continue;
+          
+          const message = JSON.parse(payload);
+          if (event === 'token') {
+            onToken(message.text);
+          } else if (event === 'done') {
+            return message;
+          } else if (event === 'error') {
+            // Carries the server's fallback reply
+            console.error('Conversation stream error:', message.error);
+            return message;
+          }
+        }
+      }
+    } catch (e) {
+      console.error('Streaming backend call failed:', e);
+    }
+    
+    return null;
+  }
+
   // ═══════════════════════════════════════════════════════════════════════════════
   // CLEANUP
   // ═══════════════════════════════════════════════════════════════════════════════
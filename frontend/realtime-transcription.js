@@ -10,6 +10,8 @@ class RealtimeTranscription {
         this.wsUrl = options.wsUrl || 'ws://localhost:8000/api/transcribe/realtime';
         this.language = options.language || null; // Auto-detect if null
         this.sampleRate = options.sampleRate || 16000;
+        this.deltaPartials = options.deltaPartials || false; // Smaller partial updates
+        this._partial = { text: '', words: [] };
         
         this.ws = null;
         this.mediaStream = null;
@@ -113,19 +115,20 @@ class RealtimeTranscription {
     async _connectWebSocket() {
         return new Promise((resolve, reject) => {
             this.ws = new WebSocket(this.wsUrl);
+            this.ws.binaryType = 'arraybuffer';
             
             this.ws.onopen = () => {
                 console.log('📡 WebSocket connected');
                 
                 // Send initial configuration
-                this.ws.send(JSON.stringify({
-                    type: 'config',
-                    language: this.language,
-                    sample_rate: this.sampleRate
-                }));
+                this.ws.send(JSON.stringify(this._configMessage()));
             };
             
             this.ws.onmessage = (event) => {
+                if (typeof event.data !== 'string') {
+                    this._handleBinary(event.data);
+                    return;
+                }
                 const data = JSON.parse(event.data);
                 this._handleMessage(data);
                 
@@ -133,6 +136,8 @@ class RealtimeTranscription {
                 if (data.type === 'connected' || data.type === 'config_updated') {
                     this.onConnected();
                     resolve();
+                } else if (data.type === 'busy') {
+                    reject(new Error(`Transcription busy, retry in ${data.retry_after}s`));
                 }
             };
             
@@ -149,17 +154,46 @@ class RealtimeTranscription {
         });
     }
 
+    _configMessage() {
+        return {
+            type: 'config',
+            language: this.language,
+            sample_rate: this.sampleRate,
+            partials: this.deltaPartials ? 'delta' : 'full'
+        };
+    }
+
+    _handleBinary(buffer) {
+        // Transcription sockets only send JSON; subclasses may receive audio
+    }
+
     _handleMessage(data) {
         switch (data.type) {
             case 'partial':
+                this._partial = { text: data.text || '', words: data.words || [] };
                 this.onPartialTranscript({
-                    text: data.text || '',
-                    words: data.words || [],
+                    text: this._partial.text,
+                    words: this._partial.words,
+                    isFinal: false
+                });
+                break;
+                
+            case 'partial_delta':
+                // Keep the stable prefix of the last partial, append the rest
+                // (keep_chars is in UTF-16 code units, as slice() counts)
+                this._partial = {
+                    text: this._partial.text.slice(0, data.keep_chars) + data.text,
+                    words: this._partial.words.slice(0, data.keep_words).concat(data.words)
+                };
+                this.onPartialTranscript({
+                    text: this._partial.text,
+                    words: this._partial.words,
                     isFinal: false
                 });
                 break;
                 
             case 'final':
+                this._partial = { text: '', words: [] };
                 this.onFinalTranscript({
                     text: data.text || '',
                     words: data.words || [],
@@ -176,9 +210,22 @@ class RealtimeTranscription {
                 this.onError(new Error(data.message || 'Transcription error'));
                 break;
                 
+            case 'queued':
+                console.log(`⏳ Waiting for a transcription slot (position ${data.position})`);
+                break;
+                
+            case 'busy':
+            case 'session_reclaimed': {
+                const error = new Error(data.message || `Transcription ${data.type}: ${data.reason || 'server busy'}`);
+                error.retryAfter = data.retry_after;
+                this.onError(error);
+                break;
+            }
+                
             case 'connected':
             case 'config_updated':
             case 'eos_received':
+            case 'reconnected':
                 // Status messages
                 console.log(`📡 ${data.type}: ${data.message || ''}`);
                 break;
@@ -206,14 +253,8 @@ class RealtimeTranscription {
             // Convert Float32 to Int16 PCM
             const pcmData = this._float32ToInt16(inputData);
             
-            // Convert to base64
-            const base64Audio = this._arrayBufferToBase64(pcmData.buffer);
-            
-            // Send to server
-            this.ws.send(JSON.stringify({
-                type: 'audio',
-                data: base64Audio
-            }));
+            // Send raw PCM as a binary frame (no base64/JSON overhead)
+            this.ws.send(pcmData.buffer);
         };
         
         source.connect(this.processor);
@@ -228,15 +269,6 @@ class RealtimeTranscription {
         }
         return int16Array;
     }
-
-    _arrayBufferToBase64(buffer) {
-        let binary = '';
-        const bytes = new Uint8Array(buffer);
-        for (let i = 0; i < bytes.byteLength; i++) {
-            binary += String.fromCharCode(bytes[i]);
-        }
-        return btoa(binary);
-    }
 }
 
 
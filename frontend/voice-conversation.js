@@ -0,0 +1,174 @@
+/**
+ * ═══════════════════════════════════════════════════════════════════════════════
+ * VOICE CONVERSATION CLIENT
+ * Mic audio in, NPC voice out, over one WebSocket (/api/conversation/voice)
+ * Requires realtime-transcription.js (extends RealtimeTranscription)
+ * ═══════════════════════════════════════════════════════════════════════════════
+ */
+
+const OUTPUT_SAMPLE_RATES = { pcm_16000: 16000, pcm_24000: 24000 };
+
+class VoiceConversation extends RealtimeTranscription {
+    constructor(options = {}) {
+        super({
+            ...options,
+            wsUrl: options.wsUrl || 'ws://localhost:8000/api/conversation/voice'
+        });
+        this.npcId = options.npcId || null;
+        this.sessionId = options.sessionId || null;
+        this.difficulty = options.difficulty || null;
+        this.outputFormat = options.outputFormat || 'pcm_24000'; // raw PCM: no decoder latency
+
+        this.turn = 0;
+        this.playbackContext = null;
+        this._playhead = 0;
+        this._sources = [];
+        this._leftover = null; // odd trailing byte of a split PCM sample
+
+        // Callbacks
+        this.onTurnStart = options.onTurnStart || (() => {});
+        this.onNpcToken = options.onNpcToken || (() => {});
+        this.onNpcReply = options.onNpcReply || (() => {});
+        this.onTurnEnd = options.onTurnEnd || (() => {});
+    }
+
+    async stop() {
+        await super.stop();
+        this._stopPlayback();
+        if (this.playbackContext) {
+            await this.playbackContext.close();
+            this.playbackContext = null;
+        }
+    }
+
+    // ═══════════════════════════════════════════════════════════════════════════
+    // PRIVATE METHODS
+    // ═══════════════════════════════════════════════════════════════════════════
+
+    _configMessage() {
+        return {
+            ...super._configMessage(),
+            npc_id: this.npcId,
+            session_id: this.sessionId,
+            difficulty: this.difficulty,
+            output_format: this.outputFormat
+        };
+    }
+
+    _handleMessage(data) {
+        switch (data.type) {
+            case 'turn_start':
+                // A new turn (possibly interrupting the last) - drop queued audio
+                this._stopPlayback();
+                this.turn = data.turn;
+                this.onTurnStart({ turn: data.turn, transcript: data.transcript });
+                break;
+
+            case 'npc_token':
+                this.onNpcToken({ turn: data.turn, text: data.text });
+                break;
+
+            case 'npc_reply':
+                this.sessionId = data.session_id || this.sessionId;
+                this.onNpcReply(data);
+                break;
+
+            case 'turn_end':
+                this.onTurnEnd({ turn: data.turn });
+                break;
+
+            default:
+                super._handleMessage(data);
+        }
+    }
+
+    _handleBinary(buffer) {
+        const sampleRate = OUTPUT_SAMPLE_RATES[this.outputFormat];
+        if (!sampleRate) {
+            console.warn(`Playback of ${this.outputFormat} frames is not supported`);
+            return;
+        }
+        if (!this.playbackContext) {
+            this.playbackContext = new AudioContext({ sampleRate });
+        }
+
+        let bytes = new Uint8Array(buffer);
+        if (this._leftover !== null) {
+            const joined = new Uint8Array(bytes.length + 1);
+            joined[0] = this._leftover;
+            joined.set(bytes, 1);
+            bytes = joined;
+            this._leftover = null;
+        }
+        if (bytes.length % 2) {
+            this._leftover = bytes[bytes.length - 1];
+            bytes = bytes.subarray(0, bytes.length - 1);
+        }
+        if (!bytes.length) return;
+
+        // s16le -> float32
+        const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.length);
+        const samples = new Float32Array(bytes.length / 2);
+        for (let i = 0; i < samples.length; i++) {
+            samples[i] = view.getInt16(i * 2, true) / 0x8000;
+        }
+
+        const audioBuffer = this.playbackContext.createBuffer(1, samples.length, sampleRate);
+        audioBuffer.copyToChannel(samples, 0);
+
+        // Schedule gaplessly after whatever is already queued
+        const source = this.playbackContext.createBufferSource();
+        source.buffer = audioBuffer;
+        source.connect(this.playbackContext.destination);
+        this._playhead = Math.max(this._playhead, this.playbackContext.currentTime);
+        source.start(this._playhead);
+        this._playhead += audioBuffer.duration;
+
+        this._sources.push(source);
+        source.onended = () => {
+            this._sources = this._sources.filter(s => s !== source);
+        };
+    }
+
+    _stopPlayback() {
+        this._sources.forEach(source => {
+            try { source.stop(); } catch (e) { /* already stopped */ }
+        });
+        this._sources = [];
+        this._leftover = null;
+        this._playhead = 0;
+    }
+}
+
+
+// ═══════════════════════════════════════════════════════════════════════════════
+// USAGE EXAMPLE
+// ═══════════════════════════════════════════════════════════════════════════════
+
+/*
+// Load realtime-transcription.js first
+const conversation = new VoiceConversation({
+    npcId: 'mati',
+    language: 'pl',
+    difficulty: { level: 2 },
+
+    onFinalTranscript: (result) => addBubble('player', result.text),
+    onNpcToken: ({ text }) => appendToNpcBubble(text),
+    onNpcReply: (reply) => showTeaching(reply.translation, reply.correction),
+    onError: (error) => console.error(error)
+});
+
+document.getElementById('talkBtn').onclick = () => conversation.start();
+document.getElementById('hangUpBtn').onclick = () => conversation.stop();
+*/
+
+
+// Export for module usage
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = { VoiceConversation };
+}
+
+// Also attach to window for script tag usage
+if (typeof window !== 'undefined') {
+    window.VoiceConversation = VoiceConversation;
+}